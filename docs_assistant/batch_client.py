@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+批量翻译请求
+把翻译请求收集为 OpenAI Batch 格式的 JSONL，交给可替换的后端提交并轮询结果，
+再把结果交还给等待中的翻译任务，使批量模式复用与实时模式相同的后处理流程
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+BATCH_COMPLETION_WINDOW = '24h'
+OPENAI_PENDING_STATUSES = ('validating', 'in_progress', 'finalizing', 'cancelling')
+
+
+class BatchBackend(NamedTuple):
+    name: str
+    # 提交 JSONL 文件，返回批次 ID
+    submit: Callable[[Path], Awaitable[str]]
+    # 批次完成时返回结果 JSONL 文本，未完成时返回 None，失败时抛出异常
+    poll: Callable[[str], Awaitable[str | None]]
+
+
+class BatchResult(NamedTuple):
+    text: str
+    finish_reason: str | None
+    usage: object
+
+
+_state = {
+    'backend': None,
+    'work_dir': None,
+    'poll_interval': 60.0,
+    'idle_seconds': 2.0,
+    'last_enqueued_at': 0.0,
+}
+# custom_id -> (请求体, 等待结果的 future)
+_pending: dict = {}
+_stats = {
+    'batches': 0,
+    'requests': 0,
+    'failed_requests': 0,
+}
+
+
+def make_openai_backend(client) -> BatchBackend:
+    """Submit batches through the OpenAI Files and Batches APIs of an AsyncOpenAI client."""
+
+    async def submit(input_path: Path) -> str:
+        with input_path.open('rb') as input_file:
+            uploaded = await client.files.create(file=input_file, purpose='batch')
+        batch = await client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        return batch.id
+
+    async def poll(batch_id: str) -> str | None:
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in OPENAI_PENDING_STATUSES:
+            return None
+        if batch.status != 'completed':
+            raise RuntimeError(f"批次 {batch_id} 未成功完成: {batch.status}")
+
+        contents = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                contents.append((await client.files.content(file_id)).text)
+        return '\n'.join(contents)
+
+    return BatchBackend('openai', submit, poll)
+
+
+def make_local_backend(directory: Path) -> BatchBackend:
+    """File-based stand-in: inputs land in directory/<batch_id>/input.jsonl, results are read from output.jsonl."""
+
+    async def submit(input_path: Path) -> str:
+        content = await asyncio.to_thread(input_path.read_bytes)
+        batch_id = f"local-{hashlib.sha256(content).hexdigest()[:12]}"
+        batch_dir = directory / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread((batch_dir / 'input.jsonl').write_bytes, content)
+        return batch_id
+
+    async def poll(batch_id: str) -> str | None:
+        output_path = directory / batch_id / 'output.jsonl'
+        if not output_path.exists():
+            return None
+        return await asyncio.to_thread(output_path.read_text, encoding='utf-8')
+
+    return BatchBackend('local', submit, poll)
+
+
+def configure(backend: BatchBackend, work_dir: Path, poll_interval: float = 60.0, idle_seconds: float = 2.0):
+    """Enable batch mode; requests are queued until the dispatcher submits them."""
+    _state.update(
+        backend=backend,
+        work_dir=work_dir,
+        poll_interval=poll_interval,
+        idle_seconds=idle_seconds,
+        last_enqueued_at=0.0,
+    )
+    _pending.clear()
+    for name in _stats:
+        _stats[name] = 0
+
+
+def close():
+    """Disable batch mode."""
+    _state['backend'] = None
+    _pending.clear()
+
+
+def is_batch_enabled() -> bool:
+    """Return True when requests should be queued for batch submission."""
+    return _state['backend'] is not None
+
+
+def build_batch_line(custom_id: str, body: dict) -> str:
+    """Serialize one request in the OpenAI Batch input format."""
+    return json.dumps(
+        {
+            'custom_id': custom_id,
+            'method': 'POST',
+            'url': BATCH_ENDPOINT,
+            'body': body,
+        },
+        ensure_ascii=False,
+    )
+
+
+def parse_batch_output(content: str) -> dict[str, BatchResult | Exception]:
+    """Parse Batch output/error JSONL into results or exceptions keyed by custom_id."""
+    results = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+
+        record = json.loads(line)
+        custom_id = record.get('custom_id')
+        response = record.get('response') or {}
+        error = record.get('error')
+        if error or response.get('status_code') != 200:
+            message = (error or {}).get('message') or json.dumps(response.get('body'), ensure_ascii=False)
+            results[custom_id] = RuntimeError(f"批量请求失败 {custom_id}: {message}")
+            continue
+
+        body = response['body']
+        choice = body['choices'][0]
+        results[custom_id] = BatchResult(
+            (choice.get('message') or {}).get('content') or '',
+            choice.get('finish_reason'),
+            body.get('usage'),
+        )
+
+    return results
+
+
+async def submit_request(body: dict) -> BatchResult:
+    """Queue a chat completion body for the next batch and wait for its result."""
+    payload = json.dumps(body, ensure_ascii=False, sort_keys=True)
+    custom_id = f"req-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]}"
+
+    # 相同的请求（如相同片段的重复翻译）共享同一条批量记录
+    if custom_id not in _pending:
+        _pending[custom_id] = (body, asyncio.get_running_loop().create_future())
+        _state['last_enqueued_at'] = time.monotonic()
+    return await asyncio.shield(_pending[custom_id][1])
+
+
+async def _run_batch(requests: dict):
+    """Write, submit and poll one batch, then resolve the waiting requests."""
+    backend = _state['backend']
+    work_dir = _state['work_dir']
+    work_dir.mkdir(parents=True, exist_ok=True)
+    input_path = work_dir / f"batch-{int(time.time() * 1000)}.jsonl"
+    await asyncio.to_thread(
+        input_path.write_text,
+        ''.join(build_batch_line(custom_id, body) + '\n' for custom_id, (body, _) in requests.items()),
+        encoding='utf-8',
+    )
+
+    _stats['batches'] += 1
+    _stats['requests'] += len(requests)
+    batch_id = await backend.submit(input_path)
+    logger.info(f"📦 已提交批次 {batch_id}（{backend.name}），包含 {len(requests)} 个请求: {input_path}")
+
+    output = await backend.poll(batch_id)
+    while output is None:
+        logger.info(f"⏳ 批次 {batch_id} 尚未完成，{_state['poll_interval']:.0f} 秒后再次查询")
+        await asyncio.sleep(_state['poll_interval'])
+        output = await backend.poll(batch_id)
+
+    results = parse_batch_output(output)
+    logger.info(f"✅ 批次 {batch_id} 已完成，收到 {len(results)} 个结果")
+    for custom_id, (_, future) in requests.items():
+        result = results.get(custom_id, RuntimeError(f"批次 {batch_id} 缺少请求 {custom_id} 的结果"))
+        if isinstance(result, Exception):
+            _stats['failed_requests'] += 1
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+async def run_dispatcher():
+    """Submit queued requests once no new request has arrived for the idle window; run until cancelled."""
+    while True:
+        await asyncio.sleep(_state['idle_seconds'])
+        if not _pending or time.monotonic() - _state['last_enqueued_at'] < _state['idle_seconds']:
+            continue
+
+        requests = dict(_pending)
+        _pending.clear()
+        try:
+            await _run_batch(requests)
+        except Exception as e:
+            logger.error(f"批量请求失败: {str(e)}")
+            for _, future in requests.values():
+                if not future.done():
+                    future.set_exception(e)
+
+
+def get_stats() -> dict:
+    """Return batch counters for the run summary."""
+    return dict(_stats)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+译文后处理基准测试
+在真实文档语料（中文源文与 en/ja 译文）上比较逐阶段多次正则扫描与单次解析后一次性拼接的耗时
+"""
+
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# 基准测试不发出 API 请求，translate 模块导入时只需要存在一个密钥
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+try:
+    from docs_assistant import markdown_tokens, translate
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import markdown_tokens
+    import translate
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 逐阶段方案使用的正则，与改为单次解析之前的后处理保持一致
+LEGACY_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)\n]+)\)')
+LEGACY_LINK_PATTERN = re.compile(r'(?<!!)\[([^\]]*)\]\(([^)\n]+)\)')
+LEGACY_HTML_PATTERNS = {
+    'src': re.compile(r'(<img\b[^>]*\bsrc=)(["\'])([^"\']+)(\2)', re.IGNORECASE),
+    'href': re.compile(r'(<a\b[^>]*\bhref=)(["\'])([^"\']+)(\2)', re.IGNORECASE),
+    'id': re.compile(r'(<a\b[^>]*\bid=)(["\'])([^"\']+)(\2)', re.IGNORECASE),
+}
+
+
+def legacy_postprocess(source_content: str, translations: list[tuple[str, dict]]) -> list[tuple[str, set]]:
+    """Multi-pass baseline: every stage rescans the source and the translation and rebuilds the string."""
+
+    def restore(pattern: re.Pattern, value_group: int, content: str) -> str:
+        source_values = [match.group(value_group) for match in pattern.finditer(source_content)]
+        if len(source_values) != len(pattern.findall(content)):
+            return content
+        values = iter(source_values)
+        return pattern.sub(
+            lambda match: (
+                content[match.start():match.start(value_group)]
+                + next(values)
+                + content[match.end(value_group):match.end()]
+            ),
+            content,
+        )
+
+    results = []
+    for translated_content, image_url_mapping in translations:
+        # 每个语言收集图片映射时都要再扫描两次源文
+        image_urls = {match.group(2) for match in LEGACY_IMAGE_PATTERN.finditer(source_content)}
+        image_urls |= {match.group(3) for match in LEGACY_HTML_PATTERNS['src'].finditer(source_content)}
+
+        translated_content = restore(LEGACY_LINK_PATTERN, 2, translated_content)
+        translated_content = restore(LEGACY_HTML_PATTERNS['href'], 3, translated_content)
+        translated_content = restore(LEGACY_HTML_PATTERNS['id'], 3, translated_content)
+        translated_content = LEGACY_IMAGE_PATTERN.sub(
+            lambda match: f"![{match.group(1)}]({image_url_mapping.get(match.group(2), match.group(2))})",
+            translated_content,
+        )
+        translated_content = LEGACY_HTML_PATTERNS['src'].sub(
+            lambda match: f"{match.group(1)}{match.group(2)}"
+            f"{image_url_mapping.get(match.group(3), match.group(3))}{match.group(4)}",
+            translated_content,
+        )
+        results.append((translated_content, image_urls))
+
+    return results
+
+
+def tokenized_postprocess(source_content: str, translations: list[tuple[str, dict]]) -> list[tuple[str, set]]:
+    """Single-parse pipeline used by translate.py: the source is tokenized once and shared across languages."""
+    source_tokens = markdown_tokens.tokenize(source_content)
+    results = []
+    for translated_content, image_url_mapping in translations:
+        image_urls = {token.value for token in source_tokens if token.kind in translate.IMAGE_TOKEN_KINDS}
+        translated_content = translate.finalize_translated_content(
+            source_content,
+            translated_content,
+            image_url_mapping,
+            source_tokens,
+        )
+        results.append((translated_content, image_urls))
+
+    return results
+
+
+def load_corpus(docs_dir: Path) -> list[tuple[str, list[tuple[str, dict]]]]:
+    """Pair every source document with its existing translations and their image mappings."""
+    corpus = []
+    translation_dirs = {info['dir'] for info in translate.LANGUAGES.values()}
+    for source_file in sorted(docs_dir.rglob('*.md')):
+        rel_path = source_file.relative_to(docs_dir)
+        if rel_path.parts[0] in translation_dirs:
+            continue
+
+        source_content = source_file.read_text(encoding='utf-8')
+        translations = []
+        for lang_code, lang_info in translate.LANGUAGES.items():
+            target_file = docs_dir / lang_info['dir'] / rel_path
+            if not target_file.exists():
+                continue
+            image_url_mapping = translate.collect_image_url_mapping(
+                source_content,
+                source_file=source_file,
+                target_file=target_file,
+                target_language=lang_code,
+            )
+            translations.append((target_file.read_text(encoding='utf-8'), image_url_mapping))
+        if translations:
+            corpus.append((source_content, translations))
+
+    return corpus
+
+
+def measure(postprocess, corpus: list[tuple[str, list[tuple[str, dict]]]], rounds: int) -> float:
+    """Return the best wall time in seconds over rounds for one pass over the corpus."""
+    best = float('inf')
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        for source_content, translations in corpus:
+            postprocess(source_content, translations)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='译文后处理基准测试')
+    parser.add_argument('--docs-dir', type=Path, default=translate.DOCS_DIR, help='文档根目录')
+    parser.add_argument('--rounds', type=int, default=5, help='重复次数，取最快一次')
+    args = parser.parse_args()
+
+    # 已有译文与源文的链接数量不一致时会输出恢复跳过的警告，基准测试中不需要
+    translate.logger.setLevel(logging.ERROR)
+    corpus = load_corpus(args.docs_dir)
+    if not corpus:
+        logger.error(f"未在 {args.docs_dir} 中找到源文与译文对")
+        sys.exit(1)
+
+    translation_count = sum(len(translations) for _, translations in corpus)
+    total_chars = sum(
+        len(source) + sum(len(translated) for translated, _ in translations)
+        for source, translations in corpus
+    )
+    logger.info(f"语料: {len(corpus)} 篇源文、{translation_count} 篇译文，共 {total_chars} 字符")
+
+    results = {
+        '逐阶段多次扫描': measure(legacy_postprocess, corpus, args.rounds),
+        '单次解析一次拼接': measure(tokenized_postprocess, corpus, args.rounds),
+    }
+    for name, seconds in results.items():
+        logger.info(
+            f"   {name}: 总计 {seconds * 1000:.1f} ms，平均 {seconds * 1000 / translation_count:.3f} ms/篇译文，"
+            f"{total_chars / seconds / 1e6:.1f} M 字符/秒"
+        )
+
+
+if __name__ == '__main__':
+    main()
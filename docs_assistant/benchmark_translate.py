@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+翻译吞吐量基准测试
+启动本地 OpenAI 兼容模拟服务，在 docs/docs 的临时副本上以不同的 MAX_WORKERS 和翻译模式端到端运行 translate.py，
+汇总墙钟时间、每秒请求数和重试开销；配合 cassette 文件可以复现同一组响应
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    from docs_assistant import mock_openai_server, usage_ledger
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import mock_openai_server
+    import usage_ledger
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_ROOT = SCRIPT_DIR.parent
+DOCS_SUBDIR = Path('docs/docs')
+TRANSLATION_DIRS = ('en', 'ja')
+BENCHMARK_MODES = ('full', 'incremental')
+
+# 增量模式下追加到每篇源文末尾的改动
+INCREMENTAL_APPENDIX = "\n\n## 基准测试新增章节\n\n这是基准测试追加的段落，用于触发增量更新。\n"
+
+# 每次运行都使用的环境变量：关闭缓存和运行日志，避免前一次运行的结果影响后一次；
+# 模拟服务原样返回源文，结构校验会把每一节都判为残留中文，因此也关闭校验
+BASE_RUN_ENV = {
+    'OPENAI_API_KEY': 'mock',
+    'OPENAI_MODEL': 'mock-model',
+    'TRANSLATE_CACHE': 'false',
+    'TRANSLATE_JOURNAL_PATH': '',
+    'TRANSLATE_SKIP_MANUAL': 'true',
+    'TRANSLATE_VALIDATE': 'false',
+    'TRANSLATE_ADAPTIVE_CONCURRENCY': 'false',
+    'TRANSLATE_DIFF_BASE': 'HEAD~1',
+    'TRANSLATE_DIFF_HEAD': 'HEAD',
+    'RETRY_DELAY': '1',
+}
+
+
+def git(repo_root: Path, *args: str):
+    subprocess.run(['git', *args], cwd=repo_root, check=True, capture_output=True)
+
+
+def is_source_doc(rel_path: Path) -> bool:
+    return rel_path.suffix == '.md' and rel_path.parts[0] not in TRANSLATION_DIRS
+
+
+def prepare_workspace(workspace: Path, mode: str, file_limit: int | None) -> list[Path]:
+    """Copy the scripts and docs into a fresh git repo, commit the mode's change and return the files to translate."""
+    shutil.copytree(SCRIPT_DIR, workspace / 'docs_assistant', ignore=shutil.ignore_patterns('__pycache__'))
+    shutil.copytree(REPO_ROOT / DOCS_SUBDIR, workspace / DOCS_SUBDIR)
+    docs_dir = workspace / DOCS_SUBDIR
+
+    source_files = sorted(
+        path for path in docs_dir.rglob('*.md') if is_source_doc(path.relative_to(docs_dir))
+    )[:file_limit]
+
+    git(workspace, 'init', '-q')
+    git(workspace, 'config', 'user.email', 'benchmark@example.com')
+    git(workspace, 'config', 'user.name', 'benchmark')
+    git(workspace, 'add', '.')
+    git(workspace, 'commit', '-q', '-m', 'baseline')
+
+    if mode == 'full':
+        # 删除已有译文，所有任务都是整篇翻译
+        for translation_dir in TRANSLATION_DIRS:
+            shutil.rmtree(docs_dir / translation_dir, ignore_errors=True)
+    else:
+        # 修改源文并保留已有译文，任务走翻译记忆与增量更新路径
+        for source_file in source_files:
+            with source_file.open('a', encoding='utf-8') as f:
+                f.write(INCREMENTAL_APPENDIX)
+    git(workspace, 'add', '-A')
+    git(workspace, 'commit', '-q', '-m', f'benchmark {mode}')
+
+    return source_files
+
+
+def run_translate(workspace: Path, files: list[Path], env: dict[str, str]) -> tuple[int, float]:
+    """Run translate.py end to end in the workspace; return (exit code, wall seconds)."""
+    log_path = workspace / 'translate.log'
+    started_at = time.perf_counter()
+    with log_path.open('w', encoding='utf-8') as log_file:
+        result = subprocess.run(
+            [sys.executable, str(workspace / 'docs_assistant' / 'translate.py'), *map(str, files)],
+            cwd=workspace,
+            env={**os.environ, **env},
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+    return result.returncode, time.perf_counter() - started_at
+
+
+def load_ledger(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open('r', encoding='utf-8') as ledger_file:
+        return [json.loads(line) for line in ledger_file if line.strip()]
+
+
+def summarize_run(records: list[dict], server_stats: dict, wall_seconds: float) -> dict:
+    """Combine the run's ledger with the server counters into the reported metrics."""
+    summary = usage_ledger.summarize(records)
+    total_latency = sum(entry['latency_seconds'] for entry in records)
+    # 失败请求、重试与截断后的续写请求都算作重试开销；客户端关闭了 SDK 自动重试，每次请求都记入账本
+    overhead_records = [
+        entry for entry in records
+        if entry.get('status') != 'ok' or entry.get('attempt', 0) > 0 or entry.get('continuation', 0) > 0
+    ]
+    overhead_latency = sum(entry['latency_seconds'] for entry in overhead_records)
+    return {
+        'wall_seconds': wall_seconds,
+        'requests': summary['requests'],
+        'server_requests': server_stats['requests'],
+        'requests_per_second': server_stats['requests'] / wall_seconds if wall_seconds > 0 else 0.0,
+        'errors': summary['errors'],
+        'retries': summary['retries'],
+        'overhead_requests': len(overhead_records),
+        'overhead_latency_ratio': overhead_latency / total_latency if total_latency > 0 else 0.0,
+        'rate_limited': server_stats['rate_limited'],
+        'truncated': server_stats['truncated'],
+        'p50_latency': summary['p50_latency'],
+        'p95_latency': summary['p95_latency'],
+        'tokens_per_second': summary['tokens_per_second'],
+    }
+
+
+def parse_env_overrides(values: list[str]) -> dict[str, str]:
+    overrides = {}
+    for value in values:
+        name, separator, setting = value.partition('=')
+        if not separator:
+            raise argparse.ArgumentTypeError(f"环境变量需写成 KEY=VALUE: {value}")
+        overrides[name] = setting
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description='翻译吞吐量基准测试')
+    parser.add_argument('--workers', type=int, nargs='+', default=[3, 8, 16], help='要比较的 MAX_WORKERS 取值')
+    parser.add_argument('--modes', nargs='+', choices=BENCHMARK_MODES, default=list(BENCHMARK_MODES), help='翻译模式')
+    parser.add_argument('--files', type=int, help='只翻译前 N 篇源文')
+    parser.add_argument('--env', action='append', default=[], help='传给 translate.py 的额外环境变量，格式 KEY=VALUE')
+    parser.add_argument('--latency-median', type=float, default=mock_openai_server.DEFAULT_CONFIG.latency_median, help='首个 token 延迟中位数（秒）')
+    parser.add_argument('--latency-sigma', type=float, default=mock_openai_server.DEFAULT_CONFIG.latency_sigma, help='延迟对数正态分布的 sigma')
+    parser.add_argument('--tokens-per-second', type=float, default=mock_openai_server.DEFAULT_CONFIG.tokens_per_second, help='模拟服务的输出速度')
+    parser.add_argument('--rate-limit-ratio', type=float, default=mock_openai_server.DEFAULT_CONFIG.rate_limit_ratio, help='返回 429 的比例')
+    parser.add_argument('--truncation-ratio', type=float, default=mock_openai_server.DEFAULT_CONFIG.truncation_ratio, help='截断响应的比例')
+    parser.add_argument('--retry-after', type=float, default=mock_openai_server.DEFAULT_CONFIG.retry_after, help='429 响应建议的等待秒数')
+    parser.add_argument('--seed', type=int, default=mock_openai_server.DEFAULT_CONFIG.seed, help='随机种子')
+    parser.add_argument('--cassette', type=Path, help='录制/回放响应的 JSONL 文件，不存在时自动创建')
+    parser.add_argument('--upstream-base-url', help='录制时把未命中的请求转发到真实 API（密钥读取 OPENAI_API_KEY）')
+    parser.add_argument('--output', type=Path, help='把每次运行的指标写入 JSON 文件')
+    args = parser.parse_args()
+
+    mock_openai_server.configure(
+        mock_openai_server.MockConfig(
+            latency_median=args.latency_median,
+            latency_sigma=args.latency_sigma,
+            tokens_per_second=args.tokens_per_second,
+            rate_limit_ratio=args.rate_limit_ratio,
+            truncation_ratio=args.truncation_ratio,
+            retry_after=args.retry_after,
+            seed=args.seed,
+        ),
+        cassette_path=args.cassette.resolve() if args.cassette else None,
+        upstream_base_url=args.upstream_base_url,
+        upstream_api_key=os.environ.get('OPENAI_API_KEY'),
+    )
+    server = mock_openai_server.start_server()
+    host, port = server.server_address[:2]
+    env_overrides = parse_env_overrides(args.env)
+    logger.info(f"模拟服务: http://{host}:{port}/v1")
+
+    results = []
+    try:
+        for mode in args.modes:
+            for workers in args.workers:
+                with tempfile.TemporaryDirectory(prefix='translate-benchmark-') as temp_dir:
+                    workspace = Path(temp_dir)
+                    files = prepare_workspace(workspace, mode, args.files)
+                    ledger_path = workspace / 'ledger.jsonl'
+                    env = {
+                        **BASE_RUN_ENV,
+                        'OPENAI_BASE_URL': f'http://{host}:{port}/v1',
+                        'MAX_WORKERS': str(workers),
+                        'FORCE_TRANSLATE': 'true' if mode == 'incremental' else 'false',
+                        'TRANSLATE_LEDGER_PATH': str(ledger_path),
+                        **env_overrides,
+                    }
+
+                    mock_openai_server.reset_run()
+                    logger.info(f"▶ 模式 {mode}, MAX_WORKERS={workers}, {len(files)} 篇源文")
+                    exit_code, wall_seconds = run_translate(workspace, files, env)
+                    metrics = summarize_run(load_ledger(ledger_path), mock_openai_server.get_stats(), wall_seconds)
+                    if exit_code != 0:
+                        logger.warning(f"   translate.py 退出码 {exit_code}，日志末尾:")
+                        for line in (workspace / 'translate.log').read_text(encoding='utf-8').splitlines()[-10:]:
+                            logger.warning(f"   | {line}")
+
+                results.append({'mode': mode, 'workers': workers, 'files': len(files), 'exit_code': exit_code, **metrics})
+                logger.info(
+                    f"   墙钟 {metrics['wall_seconds']:.1f}s, {metrics['requests_per_second']:.2f} 请求/秒, "
+                    f"请求 {metrics['requests']}（服务端 {metrics['server_requests']}）, "
+                    f"重试开销 {metrics['overhead_requests']} 次请求 / {metrics['overhead_latency_ratio']:.0%} 请求耗时, "
+                    f"429 {metrics['rate_limited']} 次, 截断 {metrics['truncated']} 次, "
+                    f"延迟 p50 {metrics['p50_latency']:.2f}s / p95 {metrics['p95_latency']:.2f}s"
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    cassette_stats = mock_openai_server.get_stats()
+    if args.cassette:
+        logger.info(
+            f"cassette: {args.cassette}（最后一次运行命中 {cassette_stats['cassette_hits']}, "
+            f"新录制 {cassette_stats['cassette_misses']}）"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        logger.info(f"结果已写入 {args.output}")
+
+    if any(result['exit_code'] != 0 for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
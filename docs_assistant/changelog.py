@@ -170,14 +170,14 @@ def format_releases_markdown_en(releases_data):
     return format_releases_markdown(releases_data, is_english=True)
 
 def update_changelog_file(is_english=False):
-    """更新更新日志文件"""
+    """更新更新日志文件，返回 (是否成功, 是否写入了文件)"""
     try:
         # 获取发布数据
         releases_data, success = fetch_github_data(GITHUB_REPO, "releases", 30)
         if not success or not releases_data:
             error_msg = "Failed to fetch release data" if is_english else "无法获取发布数据"
             logger.error(error_msg)
-            return False
+            return False, False
         
         # 格式化为Markdown
         releases_markdown = format_releases_markdown(releases_data, is_english)
@@ -190,8 +190,8 @@ def update_changelog_file(is_english=False):
     except Exception as e:
         error_msg = f"Failed to update changelog: {str(e)}" if is_english else f"更新更新日志失败: {str(e)}"
         logger.error(error_msg)
-        return False
+        return False, False
 
 def update_changelog_file_en():
-    """更新更新日志文件（英文版）"""
+    """更新更新日志文件（英文版），返回 (是否成功, 是否写入了文件)"""
     return update_changelog_file(is_english=True)
\ No newline at end of file
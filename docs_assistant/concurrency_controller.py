@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+自适应并发控制
+按 AIMD（加性增、乘性减）策略调整在途 API 请求数：延迟和错误率正常时逐步提高并发，
+遇到 429/5xx、超时或延迟突增时立即减半
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# 乘性减的系数
+DECREASE_FACTOR = 0.5
+# 单请求延迟（按每千 token 折算）超过基线的倍数时视为延迟突增
+LATENCY_SPIKE_RATIO = 2.0
+# 低于该秒数的请求不判断延迟突增，避免把毫秒级的抖动当成过载
+LATENCY_SPIKE_MIN_SECONDS = 1.0
+# 基线延迟的指数平滑系数
+LATENCY_SMOOTHING = 0.2
+# 积累到该数量的样本后才开始判断延迟突增
+LATENCY_WARMUP_SAMPLES = 3
+
+_state = {
+    'limit': 1,
+    'minimum': 1,
+    'maximum': 1,
+    'in_flight': 0,
+    'saturated': False,
+    'successes': 0,
+    'latency_baseline': None,
+    'latency_samples': 0,
+    'last_decrease_at': 0.0,
+}
+_stats = {
+    'peak_limit': 1,
+    'increases': 0,
+    'decreases': 0,
+}
+# 等待空位的请求按 (-优先级, 到达顺序) 排成小顶堆
+_waiters: list = []
+_arrival_counter = itertools.count()
+
+
+def configure(initial: int, minimum: int = 1, maximum: int | None = None):
+    """Reset the controller; a maximum equal to the initial limit keeps concurrency fixed."""
+    minimum = max(1, minimum)
+    maximum = max(minimum, maximum if maximum is not None else initial)
+    initial = min(max(initial, minimum), maximum)
+
+    _state.update(
+        limit=initial,
+        minimum=minimum,
+        maximum=maximum,
+        in_flight=0,
+        saturated=False,
+        successes=0,
+        latency_baseline=None,
+        latency_samples=0,
+        last_decrease_at=0.0,
+    )
+    _stats.update(peak_limit=initial, increases=0, decreases=0)
+    _waiters.clear()
+
+
+def get_limit() -> int:
+    """Return the current in-flight request limit."""
+    return _state['limit']
+
+
+def _wake_waiters():
+    """Hand free slots to queued requests, highest priority first, then in arrival order."""
+    free_slots = _state['limit'] - _state['in_flight']
+    while free_slots > 0 and _waiters:
+        _, _, waiter = heapq.heappop(_waiters)
+        if not waiter.done():
+            waiter.set_result(None)
+            free_slots -= 1
+
+
+async def acquire(priority: float = 0) -> float:
+    """Wait for a free slot under the current limit; return the start time to pass to release()."""
+    while _state['in_flight'] >= _state['limit']:
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(_waiters, (-priority, next(_arrival_counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已分到的空位转交给下一个等待者
+                _wake_waiters()
+            raise
+
+    _state['in_flight'] += 1
+    if _state['in_flight'] >= _state['limit']:
+        _state['saturated'] = True
+    return time.monotonic()
+
+
+def _increase():
+    """Additively raise the limit by one slot."""
+    previous = _state['limit']
+    _state['limit'] = min(_state['maximum'], previous + 1)
+    _state['successes'] = 0
+    _state['saturated'] = False
+    if _state['limit'] == previous:
+        return
+
+    _stats['increases'] += 1
+    _stats['peak_limit'] = max(_stats['peak_limit'], _state['limit'])
+    logger.info(
+        "📈 延迟与错误率正常，并发从 %s 提高到 %s（基线延迟 %.2f 秒/千 token）",
+        previous,
+        _state['limit'],
+        _state['latency_baseline'] or 0.0,
+    )
+
+
+def _decrease(reason: str, started_at: float):
+    """Multiplicatively cut the limit, at most once per wave of in-flight requests."""
+    # 在上次降并发之前就已发出的请求反映的是旧并发下的情况，不再重复降低
+    if started_at < _state['last_decrease_at']:
+        return
+
+    previous = _state['limit']
+    _state['limit'] = max(_state['minimum'], math.floor(previous * DECREASE_FACTOR))
+    _state['last_decrease_at'] = time.monotonic()
+    _state['successes'] = 0
+    _state['saturated'] = False
+    if _state['limit'] == previous:
+        return
+
+    _stats['decreases'] += 1
+    logger.warning("📉 %s，并发从 %s 降低到 %s", reason, previous, _state['limit'])
+
+
+def release(started_at: float, tokens: int, outcome: str = 'success'):
+    """Free a slot and adjust the limit; outcome is 'success', 'overloaded' or 'failed'."""
+    _state['in_flight'] -= 1
+    latency = time.monotonic() - started_at
+
+    if outcome == 'overloaded':
+        _decrease("服务端过载（429/5xx/超时）", started_at)
+    elif outcome == 'success':
+        normalized_latency = latency * 1000 / max(tokens, 1)
+        baseline = _state['latency_baseline']
+        if (
+            baseline is not None
+            and _state['latency_samples'] >= LATENCY_WARMUP_SAMPLES
+            and latency >= LATENCY_SPIKE_MIN_SECONDS
+            and normalized_latency > baseline * LATENCY_SPIKE_RATIO
+        ):
+            _decrease(f"延迟突增（{latency:.1f} 秒）", started_at)
+        else:
+            _state['latency_baseline'] = (
+                normalized_latency
+                if baseline is None
+                else baseline + LATENCY_SMOOTHING * (normalized_latency - baseline)
+            )
+            _state['latency_samples'] += 1
+            _state['successes'] += 1
+            # 只有当前上限确实被占满过时才提高，否则说明并发并不是瓶颈
+            if _state['saturated'] and _state['successes'] >= _state['limit']:
+                _increase()
+
+    _wake_waiters()
+
+
+def get_stats() -> dict:
+    """Return the final limit and adjustment counters for the run summary."""
+    return {'limit': _state['limit'], **_stats}
@@ -407,7 +407,7 @@ def format_sponsors_markdown_en(sponsors_data):
     return format_sponsors_markdown(sponsors_data, is_english=True)
 
 def update_special_thanks_file():
-    """更新特别感谢文件（中文版）"""
+    """更新特别感谢文件（中文版），返回 (是否成功, 是否写入了文件)"""
     try:
         # 获取贡献者数据
         contributors_data, contributors_success = fetch_github_data(GITHUB_REPO, "contributors", 50)
@@ -418,7 +418,7 @@ def update_special_thanks_file():
         # 如果两者都失败，则返回失败
         if not contributors_success and not sponsors_success:
             logger.error("无法获取贡献者和赞助商数据")
-            return False
+            return False, False
         
         # 获取当前时间
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -466,10 +466,10 @@ New API 的开发离不开社区的支持和贡献。在此特别感谢所有为
     
     except Exception as e:
         logger.error(f"更新贡献者列表失败: {str(e)}")
-        return False
+        return False, False
 
 def update_special_thanks_file_en():
-    """更新特别感谢文件（英文版）"""
+    """更新特别感谢文件（英文版），返回 (是否成功, 是否写入了文件)"""
     try:
         # 获取贡献者数据
         contributors_data, contributors_success = fetch_github_data(GITHUB_REPO, "contributors", 50)
@@ -480,7 +480,7 @@ def update_special_thanks_file_en():
         # 如果两者都失败，则返回失败
         if not contributors_success and not sponsors_success:
             logger.error("Failed to fetch contributors and sponsors data")
-            return False
+            return False, False
         
         # 获取当前时间
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -528,4 +528,4 @@ Below is a list of all developers who have contributed to the project. We thank
     
     except Exception as e:
         logger.error(f"Failed to update contributors list: {str(e)}")
-        return False
\ No newline at end of file
+        return False, False
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+YAML Front matter 的结构化翻译
+用 yaml.compose 解析 Front matter，按路径（如 features[0].title）取出含中文的字符串值单独翻译，
+再把译文以双引号字符串写回原来的位置；键名、缩进、注释、空行和其它值逐字保留
+"""
+
+import json
+from typing import NamedTuple
+
+import yaml
+
+try:
+    from docs_assistant import markdown_blocks
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import markdown_blocks
+
+STRING_TAG = 'tag:yaml.org,2002:str'
+
+
+class FrontMatter(NamedTuple):
+    text: str  # 含首尾 --- 分隔行的完整 Front matter
+    body: str  # Front matter 之后的正文
+    leaves: dict[str, str]  # 路径 -> 需要翻译的字符串值
+    spans: dict[str, tuple[int, int]]  # 路径 -> 值在 text 中的起止位置
+
+
+def _collect_leaves(node, path: str, offset: int, leaves: dict, spans: dict):
+    if isinstance(node, yaml.MappingNode):
+        for key_node, value_node in node.value:
+            key = key_node.value if isinstance(key_node, yaml.ScalarNode) else str(len(leaves))
+            _collect_leaves(value_node, f'{path}.{key}' if path else key, offset, leaves, spans)
+    elif isinstance(node, yaml.SequenceNode):
+        for index, item_node in enumerate(node.value):
+            _collect_leaves(item_node, f'{path}[{index}]', offset, leaves, spans)
+    elif (
+        isinstance(node, yaml.ScalarNode)
+        and node.tag == STRING_TAG
+        and markdown_blocks.CJK_PATTERN.search(node.value)
+    ):
+        leaves[path] = node.value
+        spans[path] = (offset + node.start_mark.index, offset + node.end_mark.index)
+
+
+def parse_front_matter(content: str) -> FrontMatter | None:
+    """Split off the front matter and find its translatable string values; None when absent or not valid YAML."""
+    front_matter_match = markdown_blocks.FRONT_MATTER_PATTERN.match(content)
+    if not front_matter_match:
+        return None
+
+    text = front_matter_match.group(0)
+    # 跳过开头的 --- 分隔行，只把中间部分交给 YAML 解析
+    yaml_start = text.index('\n') + 1
+    yaml_end = text.rstrip().rfind('\n') + 1
+    try:
+        root = yaml.compose(text[yaml_start:yaml_end])
+    except yaml.YAMLError:
+        return None
+
+    leaves = {}
+    spans = {}
+    if root is not None:
+        _collect_leaves(root, '', yaml_start, leaves, spans)
+    return FrontMatter(text, content[front_matter_match.end():], leaves, spans)
+
+
+def rebuild_front_matter(front_matter: FrontMatter, translations: dict[str, str]) -> str:
+    """Write translated values back as double-quoted scalars and check that the result still parses."""
+    parts = []
+    position = 0
+    for path, (start, end) in sorted(front_matter.spans.items(), key=lambda item: item[1]):
+        original = front_matter.text[start:end]
+        parts.append(front_matter.text[position:start])
+        # JSON 字符串同时是合法的 YAML 双引号字符串；块标量的结束位置包含末尾换行，需要保留
+        parts.append(json.dumps(translations.get(path, front_matter.leaves[path]), ensure_ascii=False))
+        parts.append(original[len(original.rstrip()):])
+        position = end
+    parts.append(front_matter.text[position:])
+    rebuilt = ''.join(parts)
+
+    try:
+        yaml.safe_load(rebuilt.strip().strip('-'))
+    except yaml.YAMLError as e:
+        raise ValueError(f"重建后的 Front matter 无法解析: {e}") from e
+    return rebuilt
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+批量 git 访问
+一次 `git diff -z` 读取整个提交范围内的改动并按文件拆分，一次 `git log` 找出一批文件各自最近的提交，
+旧版本文件内容通过常驻的 `git cat-file --batch` 进程读取，避免为每个文件单独启动 git 子进程
+"""
+
+import atexit
+import subprocess
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+EMPTY_BLOB_ID = '0' * 40
+DIFF_HEADER_PREFIX = 'diff --git '
+# git log 输出中标记提交行的前缀，与以 NUL 分隔的文件名区分
+COMMIT_MARKER = '\x01'
+
+
+class FileDiff(NamedTuple):
+    status: str  # git 状态字母：A、M、D、R、C、T 等（已去掉相似度）
+    old_path: str | None
+    new_path: str | None
+    old_blob: str | None  # 范围起点的 blob ID，新增文件为 None
+    patch: str  # 该文件的 unified diff（含 diff --git 头）
+
+
+_lock = threading.Lock()
+# (仓库根目录, base, head, pathspec) -> 按顺序排列的文件改动
+_diff_cache: dict[tuple, list[FileDiff]] = {}
+# (仓库根目录, rev) -> 路径 -> 最近一次修改该路径的提交，从未提交过时为 None
+_last_commit_cache: dict[tuple, dict[str, str | None]] = {}
+# 仓库根目录 -> 常驻的 git cat-file --batch 进程
+_cat_file_processes: dict[Path, subprocess.Popen] = {}
+
+
+def _parse_raw_records(raw: str) -> list[tuple[str, str | None, str | None, str | None]]:
+    """Parse NUL-separated --raw records into (status, old_path, new_path, old_blob)."""
+    fields = raw.split('\0')
+    records = []
+    index = 0
+    while index < len(fields) and fields[index].startswith(':'):
+        _, _, old_blob, _, status = fields[index][1:].split(' ')
+        letter = status[0]
+        if letter in ('R', 'C'):
+            old_path, new_path = fields[index + 1], fields[index + 2]
+            index += 3
+        else:
+            path = fields[index + 1]
+            old_path = None if letter == 'A' else path
+            new_path = None if letter == 'D' else path
+            index += 2
+        records.append((letter, old_path, new_path, None if old_blob == EMPTY_BLOB_ID else old_blob))
+
+    return records
+
+
+def _split_patches(patch_text: str) -> list[str]:
+    """Split combined patch output into one block per file, in output order."""
+    blocks = []
+    for line in patch_text.splitlines(keepends=True):
+        if line.startswith(DIFF_HEADER_PREFIX) or not blocks:
+            blocks.append([])
+        blocks[-1].append(line)
+    return [''.join(block).strip() for block in blocks if block]
+
+
+def load_diff(repo_root: Path, base: str, head: str, pathspec: str) -> list[FileDiff]:
+    """Load every file change between base and head with one git call; results are cached per range."""
+    key = (repo_root, base, head, pathspec)
+    with _lock:
+        if key in _diff_cache:
+            return _diff_cache[key]
+
+        result = subprocess.run(
+            [
+                'git',
+                'diff',
+                '-z',
+                '--raw',
+                '--patch',
+                '--no-abbrev',
+                '--no-color',
+                '--unified=3',
+                '--find-renames',
+                base,
+                head,
+                '--',
+                pathspec,
+            ],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            cwd=repo_root,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"读取 git diff 失败: {result.stderr.strip() or result.returncode}")
+
+        # --raw 部分以 NUL 分隔，与补丁正文之间隔一个空字段；补丁按相同顺序逐个文件输出
+        raw, separator, patch_text = result.stdout.partition('\0\0')
+        if not separator:
+            raw, patch_text = result.stdout, ''
+        records = _parse_raw_records(raw + '\0')
+        patches = _split_patches(patch_text)
+        if len(patches) != len(records):
+            raise RuntimeError(f"git diff 输出无法解析：{len(records)} 个文件对应 {len(patches)} 段补丁")
+
+        _diff_cache[key] = [
+            FileDiff(status, old_path, new_path, old_blob, patch)
+            for (status, old_path, new_path, old_blob), patch in zip(records, patches)
+        ]
+        return _diff_cache[key]
+
+
+def get_file_diff(repo_root: Path, base: str, head: str, pathspec: str, repo_path: str) -> FileDiff | None:
+    """Return the change for repo_path (matched by its new path) or None when it did not change."""
+    for file_diff in load_diff(repo_root, base, head, pathspec):
+        if file_diff.new_path == repo_path:
+            return file_diff
+    return None
+
+
+def load_last_commits(repo_root: Path, rev: str, paths: list[str]) -> dict[str, str | None]:
+    """Find the last commit touching each path with one git log walk; results are cached per revision."""
+    with _lock:
+        known = _last_commit_cache.setdefault((repo_root, rev), {})
+        pending = [path for path in dict.fromkeys(paths) if path not in known]
+        if pending:
+            result = subprocess.run(
+                [
+                    'git',
+                    '--literal-pathspecs',
+                    'log',
+                    '-z',
+                    f'--format={COMMIT_MARKER}%H',
+                    '--name-only',
+                    rev,
+                    '--',
+                    *pending,
+                ],
+                capture_output=True,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                cwd=repo_root,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"读取 git log 失败: {result.stderr.strip() or result.returncode}")
+
+            # 提交按时间倒序输出，每个路径第一次出现时对应的就是最近一次修改它的提交
+            commit = None
+            for field in result.stdout.split('\0'):
+                field = field.strip('\n')
+                if field.startswith(COMMIT_MARKER):
+                    commit = field[len(COMMIT_MARKER):]
+                elif field in pending and field not in known:
+                    known[field] = commit
+            for path in pending:
+                known.setdefault(path, None)
+
+        return {path: known[path] for path in paths}
+
+
+def _get_cat_file_process(repo_root: Path) -> subprocess.Popen:
+    """Start the repository's cat-file process on first use and reuse it afterwards."""
+    process = _cat_file_processes.get(repo_root)
+    if process is None or process.poll() is not None:
+        process = subprocess.Popen(
+            ['git', 'cat-file', '--batch'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=repo_root,
+        )
+        _cat_file_processes[repo_root] = process
+    return process
+
+
+def read_blob(repo_root: Path, object_name: str) -> str | None:
+    """Read an object such as '<commit>:<path>' as text, or None when it does not exist."""
+    if '\n' in object_name:
+        return None
+
+    with _lock:
+        process = _get_cat_file_process(repo_root)
+        process.stdin.write(object_name.encode('utf-8') + b'\n')
+        process.stdin.flush()
+
+        header = process.stdout.readline().decode('utf-8', errors='replace').split()
+        # 不存在或有歧义的对象只返回一行以 missing/ambiguous 结尾的说明，没有内容
+        if len(header) != 3 or not header[2].isdigit():
+            return None
+        content = process.stdout.read(int(header[2]))
+        process.stdout.read(1)
+
+    if header[1] != 'blob':
+        return None
+    # 与 text=True 的 subprocess 输出及 Path.read_text 一样统一换行符
+    return content.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def close():
+    """Stop the cat-file processes and drop cached diffs and commits."""
+    with _lock:
+        for process in _cat_file_processes.values():
+            if process.poll() is None:
+                process.stdin.close()
+                process.wait()
+            process.stdout.close()
+        _cat_file_processes.clear()
+        _diff_cache.clear()
+        _last_commit_cache.clear()
+
+
+atexit.register(close)
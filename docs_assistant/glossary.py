@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+术语表匹配
+从 glossary.json 加载术语表并编译为 Aho-Corasick 多模式匹配器，一次扫描即可找出文本中出现的全部术语：
+翻译请求只附带原文中出现的术语，译文写入后检查对应的英文或日文术语是否出现；
+直接运行时对整个文档语料做术语检查
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import NamedTuple
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+GLOSSARY_PATH = Path(__file__).parent / 'glossary.json'
+DOCS_DIR = Path(__file__).parent.parent / 'docs/docs'
+TARGET_LANGUAGES = ('en', 'ja')
+# 匹配前去掉所有空白并转为小写，“API 凭据库”与“API凭据库”、“Channel”与“channel”视为同一术语
+NORMALIZE_PATTERN = re.compile(r'\s+')
+
+
+class GlossaryEntry(NamedTuple):
+    zh: str
+    translations: dict[str, str]  # 语言代码 -> 标准译法
+    note: str
+
+
+class Automaton(NamedTuple):
+    transitions: list[dict[str, int]]
+    fail: list[int]
+    outputs: list[tuple[int, ...]]  # 每个状态匹配到的模式编号
+
+
+_state = {
+    'path': None,
+    'version': '',
+    'entries': [],
+    'source_matcher': None,
+    'target_matchers': {},
+}
+
+
+def normalize(text: str) -> str:
+    return NORMALIZE_PATTERN.sub('', text).lower()
+
+
+def build_automaton(patterns: list[str]) -> Automaton:
+    """Compile patterns into an Aho-Corasick automaton."""
+    transitions: list[dict[str, int]] = [{}]
+    outputs: list[tuple[int, ...]] = [()]
+    for index, pattern in enumerate(patterns):
+        state = 0
+        for char in pattern:
+            if char not in transitions[state]:
+                transitions.append({})
+                outputs.append(())
+                transitions[state][char] = len(transitions) - 1
+            state = transitions[state][char]
+        outputs[state] += (index,)
+
+    # 按广度优先计算失败指针，并把失败状态的输出合并进来
+    fail = [0] * len(transitions)
+    queue = deque(transitions[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, child in transitions[state].items():
+            queue.append(child)
+            fallback = fail[state]
+            while fallback and char not in transitions[fallback]:
+                fallback = fail[fallback]
+            fail[child] = transitions[fallback].get(char, 0) if state else 0
+            outputs[child] += outputs[fail[child]]
+
+    return Automaton(transitions, fail, outputs)
+
+
+def search(automaton: Automaton, text: str) -> set[int]:
+    """Return the indexes of every pattern that occurs in text, in one pass."""
+    transitions, fail, outputs = automaton
+    found = set()
+    state = 0
+    for char in text:
+        while state and char not in transitions[state]:
+            state = fail[state]
+        state = transitions[state].get(char, 0)
+        found.update(outputs[state])
+    return found
+
+
+def load_glossary(path: Path = GLOSSARY_PATH):
+    """Load the glossary file and compile the source and per-language target matchers."""
+    data = path.read_bytes()
+    entries = [
+        GlossaryEntry(
+            item['zh'],
+            {language: item[language] for language in TARGET_LANGUAGES if item.get(language)},
+            item.get('note', ''),
+        )
+        for item in json.loads(data)
+    ]
+    _state['path'] = path
+    _state['version'] = hashlib.sha256(data).hexdigest()[:16]
+    _state['entries'] = entries
+    _state['source_matcher'] = build_automaton([normalize(entry.zh) for entry in entries])
+    _state['target_matchers'] = {
+        language: build_automaton([normalize(entry.translations.get(language, '')) or '\0' for entry in entries])
+        for language in TARGET_LANGUAGES
+    }
+
+
+def _ensure_loaded():
+    if _state['source_matcher'] is None:
+        load_glossary()
+
+
+def get_version() -> str:
+    """Hash of the glossary file, so glossary edits invalidate cached translations."""
+    _ensure_loaded()
+    return _state['version']
+
+
+def find_entries(text: str) -> list[GlossaryEntry]:
+    """Return the glossary entries whose Chinese term occurs in text, in glossary order."""
+    _ensure_loaded()
+    found = search(_state['source_matcher'], normalize(text))
+    return [entry for index, entry in enumerate(_state['entries']) if index in found]
+
+
+def format_table(entries: list[GlossaryEntry], target_language: str) -> str:
+    """Render entries as a Markdown table for one target language."""
+    rows = [
+        f"| {entry.zh} | {entry.translations[target_language]} | {entry.note} |"
+        for entry in entries
+        if target_language in entry.translations
+    ]
+    if not rows:
+        return ''
+    return '\n'.join(["| 中文 | 译法 | 说明 |", "|------|------|------|", *rows])
+
+
+def find_missing_terms(source: str, translation: str, target_language: str) -> list[GlossaryEntry]:
+    """Return entries used in the source whose standard translation does not occur in the translation."""
+    _ensure_loaded()
+    used = search(_state['source_matcher'], normalize(source))
+    if not used:
+        return []
+    present = search(_state['target_matchers'][target_language], normalize(translation))
+    return [
+        entry
+        for index, entry in enumerate(_state['entries'])
+        if index in used and index not in present and target_language in entry.translations
+    ]
+
+
+def check_corpus(docs_dir: Path) -> Counter:
+    """Count, per (language, term), the translated docs that miss a term used by their source."""
+    missing = Counter()
+    for source_file in sorted(docs_dir.rglob('*.md')):
+        rel_path = source_file.relative_to(docs_dir)
+        if rel_path.parts[0] in TARGET_LANGUAGES:
+            continue
+        source = source_file.read_text(encoding='utf-8')
+        for language in TARGET_LANGUAGES:
+            translated_file = docs_dir / language / rel_path
+            if not translated_file.is_file():
+                continue
+            for entry in find_missing_terms(source, translated_file.read_text(encoding='utf-8'), language):
+                missing[(language, entry.zh)] += 1
+                logger.info(f"   {language}/{rel_path.as_posix()}: 未出现“{entry.zh}”的译法 {entry.translations[language]}")
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查译文是否使用术语表中的标准译法')
+    parser.add_argument('--docs-dir', type=Path, default=DOCS_DIR, help='文档目录')
+    parser.add_argument('--glossary', type=Path, default=GLOSSARY_PATH, help='术语表文件')
+    parser.add_argument('--check', action='store_true', help='发现未使用标准译法的术语时返回非零退出码')
+    args = parser.parse_args()
+
+    load_glossary(args.glossary)
+    logger.info(f"🔍 检查术语（共 {len(_state['entries'])} 条）: {args.docs_dir}")
+    started_at = time.perf_counter()
+    missing = check_corpus(args.docs_dir)
+    elapsed = time.perf_counter() - started_at
+
+    for (language, term), count in missing.most_common():
+        logger.info(f"📋 {language}: “{term}” 在 {count} 篇译文中未使用标准译法")
+    logger.info(f"⏱️ 检查耗时 {elapsed:.2f} 秒，共 {sum(missing.values())} 处")
+
+    if args.check and missing:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
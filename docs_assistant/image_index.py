@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+本地化图片索引
+启动时扫描一次 static/image 下的本地化图片目录，之后查找本地化版本只需查询内存中的集合，
+不再为每个文件、每种语言、每个图片地址调用文件系统
+"""
+
+import os
+from pathlib import Path
+
+# 译文优先使用的本地化图片目录（相对于 static/image）
+LOCALIZED_IMAGE_DIR = 'en'
+
+_state = {
+    'root': None,
+    # 本地化目录内的图片，以相对于本地化目录的 POSIX 路径保存
+    'localized': frozenset(),
+    # 本地化目录及其子目录 -> 扫描时的修改时间，用于判断是否需要重建
+    'directories': {},
+}
+
+
+def build_index(static_image_root: Path) -> frozenset[str]:
+    """Scan the localized image directory once and replace the in-memory index."""
+    localized_root = static_image_root / LOCALIZED_IMAGE_DIR
+    localized = set()
+    directories = {}
+
+    for directory, _, file_names in os.walk(localized_root):
+        directory_path = Path(directory)
+        try:
+            directories[directory_path] = os.stat(directory_path).st_mtime_ns
+        except OSError:
+            continue
+        relative_dir = directory_path.relative_to(localized_root).as_posix()
+        for file_name in file_names:
+            localized.add(file_name if relative_dir == '.' else f'{relative_dir}/{file_name}')
+
+    _state.update(
+        root=static_image_root,
+        localized=frozenset(localized),
+        directories=directories,
+    )
+    return _state['localized']
+
+
+def refresh() -> bool:
+    """Rebuild the index when a scanned directory changed; only the directories are stat'ed."""
+    root = _state['root']
+    if root is None:
+        return False
+
+    directories = _state['directories']
+    localized_root = root / LOCALIZED_IMAGE_DIR
+    # 增删文件或子目录都会更新所在目录的修改时间；本地化目录本身出现或消失也需要重建
+    changed = (localized_root in directories) != localized_root.is_dir()
+    for directory, mtime_ns in directories.items():
+        if changed:
+            break
+        try:
+            changed = os.stat(directory).st_mtime_ns != mtime_ns
+        except OSError:
+            changed = True
+
+    if changed:
+        build_index(root)
+    return changed
+
+
+def ensure_index(static_image_root: Path):
+    """Build the index on first use or when a different image root is requested."""
+    if _state['root'] != static_image_root:
+        build_index(static_image_root)
+
+
+def has_localized_variant(static_image_root: Path, relative_path: str) -> bool:
+    """Return True when static/image/<localized dir>/<relative_path> exists according to the index."""
+    ensure_index(static_image_root)
+    return relative_path in _state['localized']
+
+
+def find_unreferenced_variants(referenced: set[str]) -> list[str]:
+    """Return indexed localized images, relative to the localized directory, that no doc references."""
+    return sorted(_state['localized'] - referenced)
@@ -1,12 +1,16 @@
 import os
 import time
+import shlex
 import logging
+import subprocess
 from datetime import datetime
 from contributors import update_special_thanks_file, update_special_thanks_file_en
 from changelog import update_changelog_file, update_changelog_file_en
 
 # 环境变量配置
 UPDATE_INTERVAL = int(os.environ.get('UPDATE_INTERVAL', 1800))  # 默认30分钟
+# 页面内容有变化后执行的重建命令（可选），例如触发文档构建；内容未变化的周期不会执行
+REBUILD_COMMAND = os.environ.get('REBUILD_COMMAND', '')
 
 # 配置日志
 logging.basicConfig(
@@ -15,6 +19,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger('docs-updater')
 
+def run_rebuild_command():
+    """页面有变化时执行配置的重建命令"""
+    if not REBUILD_COMMAND:
+        return
+    logger.info(f"文档内容有变化，执行重建命令: {REBUILD_COMMAND}")
+    result = subprocess.run(shlex.split(REBUILD_COMMAND))
+    if result.returncode != 0:
+        logger.warning(f"重建命令退出码为 {result.returncode}，将在下次内容变化时重新执行")
+
 def main():
     """主函数 - 智能更新文档"""
     logger.info("启动文档更新服务")
@@ -39,43 +52,56 @@ def main():
     while True:
         try:
             current_time = time.time()
+            # 本轮是否有页面实际写入了新内容，只有时间戳变化时不算
+            any_changed = False
             
             # 检查是否需要更新贡献者和赞助商列表（中文版）
             if current_time - last_update['contributors'] >= update_intervals['contributors']:
                 logger.info("开始更新贡献者和赞助商列表（中文版）")
-                if update_special_thanks_file():
+                ok, changed = update_special_thanks_file()
+                if ok:
                     last_update['contributors'] = current_time
-                    logger.info("贡献者和赞助商列表（中文版）更新成功")
+                    any_changed = any_changed or changed
+                    logger.info(f"贡献者和赞助商列表（中文版）更新成功{'' if changed else '，内容未变化'}")
                 else:
                     logger.warning("贡献者和赞助商列表（中文版）更新失败，将在下次更新周期重试")
             
             # 检查是否需要更新贡献者和赞助商列表（英文版）
             if current_time - last_update['contributors_en'] >= update_intervals['contributors_en']:
                 logger.info("开始更新贡献者和赞助商列表（英文版）")
-                if update_special_thanks_file_en():
+                ok, changed = update_special_thanks_file_en()
+                if ok:
                     last_update['contributors_en'] = current_time
-                    logger.info("贡献者和赞助商列表（英文版）更新成功")
+                    any_changed = any_changed or changed
+                    logger.info(f"贡献者和赞助商列表（英文版）更新成功{'' if changed else '，内容未变化'}")
                 else:
                     logger.warning("贡献者和赞助商列表（英文版）更新失败，将在下次更新周期重试")
             
             # 检查是否需要更新发布日志（中文版）
             if current_time - last_update['releases'] >= update_intervals['releases']:
                 logger.info("开始更新发布日志（中文版）")
-                if update_changelog_file():
+                ok, changed = update_changelog_file()
+                if ok:
                     last_update['releases'] = current_time
-                    logger.info("发布日志（中文版）更新成功")
+                    any_changed = any_changed or changed
+                    logger.info(f"发布日志（中文版）更新成功{'' if changed else '，内容未变化'}")
                 else:
                     logger.warning("发布日志（中文版）更新失败，将在下次更新周期重试")
             
             # 检查是否需要更新发布日志（英文版）
             if current_time - last_update['releases_en'] >= update_intervals['releases_en']:
                 logger.info("开始更新发布日志（英文版）")
-                if update_changelog_file_en():
+                ok, changed = update_changelog_file_en()
+                if ok:
                     last_update['releases_en'] = current_time
-                    logger.info("发布日志（英文版）更新成功")
+                    any_changed = any_changed or changed
+                    logger.info(f"发布日志（英文版）更新成功{'' if changed else '，内容未变化'}")
                 else:
                     logger.warning("发布日志（英文版）更新失败，将在下次更新周期重试")
             
+            if any_changed:
+                run_rebuild_command()
+
             # 计算下一次检查前的等待时间
             next_check = min(
                 last_update['contributors'] + update_intervals['contributors'],
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Markdown 块结构解析与译文对齐
+把文档拆分为标题、段落、列表项、表格行等块，并将源文块与已有译文块对齐为翻译记忆，
+或把源文 diff 的各个 hunk 映射到受影响的源文块和对应的译文块
+"""
+
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import NamedTuple
+
+FRONT_MATTER_PATTERN = re.compile(r'\A---[ \t]*\r?\n[\s\S]*?\r?\n---[ \t]*(?:\r?\n|\Z)')
+CODE_FENCE_LINE_PATTERN = re.compile(r'^[ \t]{0,3}(`{3,}|~{3,})')
+HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]')
+LIST_ITEM_PATTERN = re.compile(r'^([ \t]*)(?:[-*+]|\d+[.)])[ \t]')
+TABLE_ROW_PATTERN = re.compile(r'^[ \t]*\|')
+CONTAINER_PATTERN = re.compile(r'^[ \t]*:::')
+HTML_BLOCK_PATTERN = re.compile(r'^[ \t]*</?[A-Za-z][^>]*>[ \t]*$')
+CJK_PATTERN = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+HUNK_HEADER_PATTERN = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+# 这些块各自独占一行，遇到时会结束当前段落或列表项
+SINGLE_LINE_KINDS = ('heading', 'table_row', 'container', 'html')
+# 校验编辑结果时比较数量的块类型，译文中这些块与源文一一对应
+STRUCTURAL_KINDS = ('heading', 'code', 'table_row', 'container')
+EDIT_OPERATIONS = ('replace', 'delete')
+
+
+class MarkdownBlock(NamedTuple):
+    kind: str
+    text: str
+    separator: str
+
+
+class ChangedRegion(NamedTuple):
+    previous_source: str  # 改动前的源文块
+    previous_translation: str  # 与之对齐的已有译文块
+    source: str  # 改动后的源文块
+    context_before: str  # 区域前后的已有译文，仅供参考
+    context_after: str
+    translated_start: int  # 已有译文中被替换的块区间 [start, end)
+    translated_end: int
+
+
+def _classify_line(line: str) -> str | None:
+    """Return the block kind a line starts, or None for paragraph text."""
+    if HEADING_PATTERN.match(line):
+        return 'heading'
+    if TABLE_ROW_PATTERN.match(line):
+        return 'table_row'
+    if CONTAINER_PATTERN.match(line):
+        return 'container'
+    if HTML_BLOCK_PATTERN.match(line):
+        return 'html'
+    if LIST_ITEM_PATTERN.match(line):
+        return 'list_item'
+    return None
+
+
+def split_blocks(content: str) -> list[MarkdownBlock]:
+    """Split Markdown into blocks whose text plus separator reproduces the input exactly."""
+    blocks: list[MarkdownBlock] = []
+    lines = content.splitlines(keepends=True)
+    index = 0
+
+    front_matter_match = FRONT_MATTER_PATTERN.match(content)
+    if front_matter_match:
+        front_matter = front_matter_match.group(0)
+        index = len(front_matter.splitlines(keepends=True))
+        body = front_matter.rstrip('\r\n')
+        blocks.append(MarkdownBlock('front_matter', body, front_matter[len(body):]))
+
+    current_kind = None
+    current_lines: list[str] = []
+
+    def flush():
+        nonlocal current_kind, current_lines
+        if not current_lines:
+            return
+        raw = ''.join(current_lines)
+        text = raw.rstrip('\r\n')
+        blocks.append(MarkdownBlock(current_kind, text, raw[len(text):]))
+        current_kind = None
+        current_lines = []
+
+    while index < len(lines):
+        line = lines[index]
+
+        if not line.strip():
+            if current_lines:
+                flush()
+            if blocks:
+                last = blocks[-1]
+                blocks[-1] = last._replace(separator=last.separator + line)
+            else:
+                blocks.append(MarkdownBlock('blank', '', line))
+            index += 1
+            continue
+
+        fence_match = CODE_FENCE_LINE_PATTERN.match(line)
+        if fence_match:
+            flush()
+            marker = fence_match.group(1)
+            fence_lines = [line]
+            index += 1
+            while index < len(lines):
+                fence_lines.append(lines[index])
+                closing = CODE_FENCE_LINE_PATTERN.match(lines[index])
+                index += 1
+                if (
+                    closing
+                    and closing.group(1)[0] == marker[0]
+                    and len(closing.group(1)) >= len(marker)
+                    and not lines[index - 1][closing.end():].strip()
+                ):
+                    break
+            current_kind = 'code'
+            current_lines = fence_lines
+            flush()
+            continue
+
+        kind = _classify_line(line)
+        if kind in SINGLE_LINE_KINDS:
+            flush()
+            current_kind = kind
+            current_lines = [line]
+            flush()
+        elif kind == 'list_item':
+            flush()
+            current_kind = kind
+            current_lines = [line]
+        elif current_lines:
+            current_lines.append(line)
+        else:
+            current_kind = 'paragraph'
+            current_lines = [line]
+        index += 1
+
+    flush()
+    return blocks
+
+
+def join_blocks(blocks: list[MarkdownBlock]) -> str:
+    """Reassemble blocks into a Markdown document."""
+    return ''.join(block.text + block.separator for block in blocks)
+
+
+def normalize_block_text(text: str) -> str:
+    """Normalize a block for memory lookups, ignoring trailing whitespace differences."""
+    return '\n'.join(line.rstrip() for line in text.strip().splitlines())
+
+
+def needs_translation(block: MarkdownBlock) -> bool:
+    """Return True when a block carries Chinese text that the model must translate."""
+    return block.kind != 'code' and bool(CJK_PATTERN.search(block.text))
+
+
+def _block_signature(block: MarkdownBlock) -> str:
+    """Describe a block's structural shape, independent of its natural-language text."""
+    if block.kind == 'heading':
+        return f"heading:{HEADING_PATTERN.match(block.text).group(1)}"
+    if block.kind == 'code':
+        return f"code:{block.text}"
+    if block.kind == 'list_item':
+        indent = LIST_ITEM_PATTERN.match(block.text).group(1)
+        return f"list_item:{len(indent.expandtabs(4))}"
+    if block.kind == 'table_row':
+        return f"table_row:{block.text.count('|')}"
+    if block.kind == 'container':
+        return 'container:end' if block.text.strip() == ':::' else 'container:start'
+    return block.kind
+
+
+def align_blocks(
+    source_blocks: list[MarkdownBlock],
+    translated_blocks: list[MarkdownBlock],
+) -> list[tuple[int, int]]:
+    """Pair source and translated blocks whose structural shapes line up."""
+    matcher = SequenceMatcher(
+        a=[_block_signature(block) for block in source_blocks],
+        b=[_block_signature(block) for block in translated_blocks],
+        autojunk=False,
+    )
+
+    pairs = []
+    for tag, source_start, source_end, translated_start, _ in matcher.get_opcodes():
+        if tag != 'equal':
+            continue
+        for offset in range(source_end - source_start):
+            pairs.append((source_start + offset, translated_start + offset))
+
+    return pairs
+
+
+def build_translation_memory(source_content: str, translated_content: str) -> dict[str, str]:
+    """Map normalized source block text to its aligned translated block text."""
+    source_blocks = split_blocks(source_content)
+    translated_blocks = split_blocks(translated_content)
+
+    memory = {}
+    for source_index, translated_index in align_blocks(source_blocks, translated_blocks):
+        source_block = source_blocks[source_index]
+        if not needs_translation(source_block):
+            continue
+        memory.setdefault(
+            normalize_block_text(source_block.text),
+            translated_blocks[translated_index].text,
+        )
+
+    return memory
+
+
+def reverse_apply_diff(new_content: str, diff: str) -> tuple[str, list[list[int]]] | None:
+    """Rebuild the pre-change text from a unified diff; also return each changed run's old/new line ranges."""
+    new_lines = new_content.splitlines(keepends=True)
+    old_lines: list[str] = []
+    runs: list[list[int]] = []
+    new_index = 0
+    remaining = None
+    run = None
+    last_op = None
+
+    for line in diff.splitlines():
+        header = HUNK_HEADER_PATTERN.match(line)
+        if header:
+            new_start, new_count = int(header.group(3)), int(header.group(4) or '1')
+            position = new_start if new_count == 0 else new_start - 1
+            if position < new_index or position > len(new_lines):
+                return None
+            old_lines.extend(new_lines[new_index:position])
+            new_index = position
+            remaining = [int(header.group(2) or '1'), new_count]
+            run = None
+            continue
+        if remaining is None:
+            continue
+        if line.startswith('\\'):
+            # "\ No newline at end of file" 作用于上一行
+            if last_op == '-' and old_lines:
+                old_lines[-1] = old_lines[-1].rstrip('\r\n')
+            continue
+        if remaining == [0, 0]:
+            remaining = None
+            continue
+
+        op, text = line[:1], line[1:]
+        if op in (' ', '+'):
+            if new_index >= len(new_lines) or new_lines[new_index].rstrip('\r\n') != text:
+                return None
+        if op == ' ':
+            old_lines.append(new_lines[new_index])
+            new_index += 1
+            remaining = [remaining[0] - 1, remaining[1] - 1]
+            run = None
+        elif op in ('-', '+'):
+            if run is None:
+                run = [len(old_lines), len(old_lines), new_index, new_index]
+                runs.append(run)
+            if op == '-':
+                old_lines.append(text + '\n')
+                run[1] += 1
+                remaining = [remaining[0] - 1, remaining[1]]
+            else:
+                new_index += 1
+                run[3] += 1
+                remaining = [remaining[0], remaining[1] - 1]
+        else:
+            return None
+        last_op = op
+
+    old_lines.extend(new_lines[new_index:])
+    return ''.join(old_lines), runs
+
+
+def _block_line_starts(blocks: list[MarkdownBlock]) -> list[int]:
+    """Return the first line of every block plus the total line count."""
+    starts = [0]
+    for block in blocks:
+        starts.append(starts[-1] + len((block.text + block.separator).splitlines()))
+    return starts
+
+
+def _expand_to_blocks(start: int, end: int, line_starts: list[int]) -> tuple[int, int]:
+    """Widen a non-empty line range [start, end) to whole blocks; return the widened line range."""
+    first = max(index for index, line in enumerate(line_starts[:-1]) if line <= start)
+    last = min(index for index, line in enumerate(line_starts) if line >= end)
+    return line_starts[first], line_starts[last]
+
+
+def _merge_ranges(regions: list[list[int]]) -> list[list[int]]:
+    """Merge regions whose old or new line ranges overlap."""
+    merged: list[list[int]] = []
+    for region in sorted(regions):
+        if merged and (region[0] < merged[-1][1] or region[2] < merged[-1][3]):
+            previous = merged[-1]
+            merged[-1] = [
+                min(previous[0], region[0]),
+                max(previous[1], region[1]),
+                min(previous[2], region[2]),
+                max(previous[3], region[3]),
+            ]
+        else:
+            merged.append(list(region))
+    return merged
+
+
+def find_changed_regions(
+    new_content: str,
+    translated_content: str,
+    diff: str,
+    context_blocks: int = 1,
+) -> list[ChangedRegion] | None:
+    """Map diff hunks to whole source blocks and their aligned translated blocks; None when they cannot be mapped."""
+    reversed_diff = reverse_apply_diff(new_content, diff)
+    if reversed_diff is None or not reversed_diff[1]:
+        return None
+    old_content, runs = reversed_diff
+
+    old_blocks = split_blocks(old_content)
+    new_blocks = split_blocks(new_content)
+    translated_blocks = split_blocks(translated_content)
+    old_starts = _block_line_starts(old_blocks)
+    new_starts = _block_line_starts(new_blocks)
+    if not old_blocks or not new_blocks:
+        return None
+
+    # 纯新增或纯删除没有可定位的行，向前（文档开头则向后）带上一行未改动的内容
+    regions = []
+    for old_start, old_end, new_start, new_end in runs:
+        if old_start == old_end or new_start == new_end:
+            if old_start > 0 and new_start > 0:
+                old_start, new_start = old_start - 1, new_start - 1
+            else:
+                old_end, new_end = old_end + 1, new_end + 1
+        if old_end > old_starts[-1] or new_end > new_starts[-1]:
+            return None
+        regions.append([old_start, old_end, new_start, new_end])
+
+    # 两侧同时扩展到完整的块；区域之间的未改动行在两侧一一对应，因此两侧扩展同样的行数
+    changed = True
+    while changed:
+        changed = False
+        regions = _merge_ranges(regions)
+        for region in regions:
+            old_start, old_end = _expand_to_blocks(region[0], region[1], old_starts)
+            new_start, new_end = _expand_to_blocks(region[2], region[3], new_starts)
+            before = min(max(region[0] - old_start, region[2] - new_start), region[0], region[2])
+            after = max(old_end - region[1], new_end - region[3])
+            if before or after:
+                region[:] = [region[0] - before, region[1] + after, region[2] - before, region[3] + after]
+                changed = True
+            if region[1] > old_starts[-1] or region[3] > new_starts[-1]:
+                return None
+
+    block_regions = [
+        [old_starts.index(old_start), old_starts.index(old_end), new_starts.index(new_start), new_starts.index(new_end)]
+        for old_start, old_end, new_start, new_end in regions
+    ]
+
+    # 区域边界外的块必须是已与译文对齐的块，否则继续向外扩展
+    aligned = dict(align_blocks(old_blocks, translated_blocks))
+    changed = True
+    while changed:
+        changed = False
+        for region in block_regions:
+            while region[0] > 0 and region[0] - 1 not in aligned:
+                region[0] -= 1
+                region[2] -= 1
+                changed = True
+            while region[1] < len(old_blocks) and region[1] not in aligned:
+                region[1] += 1
+                region[3] += 1
+                changed = True
+        merged = _merge_ranges(block_regions)
+        changed = changed and merged != block_regions
+        block_regions = merged
+
+    # 区域之外的块在改动前后必须完全一致，否则说明块结构发生了区域外的变化
+    old_cursor = new_cursor = 0
+    for old_start, old_end, new_start, new_end in block_regions + [[len(old_blocks), 0, len(new_blocks), 0]]:
+        if old_start - old_cursor != new_start - new_cursor or new_start < new_cursor:
+            return None
+        for offset in range(old_start - old_cursor):
+            if old_blocks[old_cursor + offset].text != new_blocks[new_cursor + offset].text:
+                return None
+        old_cursor, new_cursor = old_end, new_end
+
+    changed_regions = []
+    for old_start, old_end, new_start, new_end in block_regions:
+        translated_start = aligned[old_start - 1] + 1 if old_start > 0 else 0
+        translated_end = aligned[old_end] if old_end < len(old_blocks) else len(translated_blocks)
+        if translated_start > translated_end:
+            return None
+        changed_regions.append(ChangedRegion(
+            join_blocks(old_blocks[old_start:old_end]),
+            join_blocks(translated_blocks[translated_start:translated_end]),
+            join_blocks(new_blocks[new_start:new_end]),
+            join_blocks(translated_blocks[max(0, translated_start - context_blocks):translated_start]).strip(),
+            join_blocks(translated_blocks[translated_end:translated_end + context_blocks]).strip(),
+            translated_start,
+            translated_end,
+        ))
+
+    return changed_regions
+
+
+def apply_region_updates(
+    translated_content: str,
+    regions: list[ChangedRegion],
+    updated_translations: list[str],
+) -> str:
+    """Splice updated region translations into the existing translation, keeping the new source's spacing."""
+    translated_blocks = split_blocks(translated_content)
+    parts = []
+    cursor = 0
+    for region, updated in zip(regions, updated_translations):
+        parts.append(join_blocks(translated_blocks[cursor:region.translated_start]))
+        source = region.source
+        stripped = source.strip()
+        leading = source[:len(source) - len(source.lstrip())]
+        trailing = source[len(source.rstrip()):]
+        parts.append(f"{leading}{updated.strip()}{trailing}" if stripped else source)
+        cursor = region.translated_end
+    parts.append(join_blocks(translated_blocks[cursor:]))
+    return ''.join(parts)
+
+
+def get_block_ids(blocks: list[MarkdownBlock]) -> dict[str, int]:
+    """Number the non-empty blocks as t0, t1, ... for edit lists."""
+    return {f't{index}': index for index, block in enumerate(blocks) if block.text}
+
+
+def apply_block_edits(translated_content: str, edits: list) -> str:
+    """Apply replace/delete operations keyed by block ID, raising ValueError on any invalid edit."""
+    blocks = split_blocks(translated_content)
+    block_ids = get_block_ids(blocks)
+    replacements: dict[int, str | None] = {}
+
+    for edit in edits:
+        if not isinstance(edit, dict) or edit.get('op') not in EDIT_OPERATIONS:
+            raise ValueError(f"无效的编辑操作: {edit!r}"[:200])
+        block_id = edit.get('id')
+        if block_id not in block_ids:
+            raise ValueError(f"编辑操作引用了不存在的块: {block_id!r}")
+        index = block_ids[block_id]
+        if index in replacements:
+            raise ValueError(f"同一个块 {block_id} 有多个编辑操作")
+        if edit['op'] == 'replace':
+            text = edit.get('text')
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError(f"块 {block_id} 的替换内容为空")
+            replacements[index] = text.strip('\r\n')
+        else:
+            replacements[index] = None
+
+    kept: list[MarkdownBlock] = []
+    for index, block in enumerate(blocks):
+        if index not in replacements:
+            kept.append(block)
+        elif replacements[index] is not None:
+            kept.append(block._replace(text=replacements[index]))
+        elif index == len(blocks) - 1 and kept:
+            # 删除末尾的块时保留原来的文末换行
+            kept[-1] = kept[-1]._replace(separator=block.separator)
+
+    patched = join_blocks(kept)
+    if not patched.strip():
+        raise ValueError("应用编辑后的译文为空")
+    return patched
+
+
+def count_structure(content: str) -> Counter:
+    """Count headings, code blocks, table rows and containers."""
+    return Counter(block.kind for block in split_blocks(content) if block.kind in STRUCTURAL_KINDS)
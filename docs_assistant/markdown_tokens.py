@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Markdown 链接、图片、锚点与代码的单次扫描
+一次遍历记录文档中所有链接目标、图片地址、HTML 属性值和代码片段的位置，
+后处理阶段基于同一份结果收集替换并一次性拼接
+"""
+
+import re
+from typing import NamedTuple
+
+# 开头的前瞻让正则引擎只在可能起始的字符处尝试匹配，性能接近单个简单正则；
+# 围栏代码块需位于行首（最多缩进 3 个字符），用定长后行断言代替 ^[ \t]{0,3} 以保留该优化
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?=[`~!\[<])
+    (?:
+        (?P<fence>
+            (?:(?<![^\n])|(?<=^[ \t])|(?<=^[ \t]{2})|(?<=^[ \t]{3}))
+            (?P<marker>`{3,}|~{3,}).*
+            (?:\n[\s\S]*?(?:\n[ \t]{0,3}(?P=marker)[`~]*[ \t]*(?=\n|\Z)|\Z)|\Z)
+        )
+        | (?P<code>(?P<ticks>`+)(?!`)[^\n]+?(?<!`)(?P=ticks)(?!`))
+        | (?P<image>!\[[^\]]*\]\((?P<image_url>[^)\n]+)\))
+        | (?<!!)(?P<link>\[(?P<link_text>(?:!\[[^\]]*\]\([^)\n]+\)|[^\]])*)\]\((?P<link_url>[^)\n]+)\))
+        | (?P<tag><(?P<tag_name>a|img)\b[^>]*>)
+    )
+    """,
+    re.MULTILINE | re.VERBOSE | re.IGNORECASE,
+)
+NESTED_IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\(([^)\n]+)\)')
+HTML_ATTRIBUTE_PATTERN = re.compile(r'\b(href|src|id)=(["\'])([^"\']+)\2', re.IGNORECASE)
+
+# 每种 HTML 标签中需要记录的属性及其对应的 token 种类
+TAG_ATTRIBUTE_KINDS = {
+    'a': {'href': 'href', 'id': 'anchor_id'},
+    'img': {'src': 'src'},
+}
+
+
+class MarkdownToken(NamedTuple):
+    kind: str  # code、link、image、href、src 或 anchor_id
+    start: int  # 值在文档中的起止位置：链接/图片为目标地址，HTML 为属性值，代码为整段代码
+    end: int
+    value: str
+
+
+def tokenize(content: str) -> list[MarkdownToken]:
+    """Scan a document once and return its links, images, HTML attributes and code spans in order."""
+    tokens = []
+
+    for match in TOKEN_PATTERN.finditer(content):
+        # 外层命名分组总是最后闭合，lastgroup 即为匹配到的分支
+        kind = match.lastgroup
+        if kind == 'fence' or kind == 'code':
+            tokens.append(MarkdownToken('code', match.start(), match.end(), match.group()))
+        elif kind == 'image':
+            tokens.append(
+                MarkdownToken('image', match.start('image_url'), match.end('image_url'), match.group('image_url'))
+            )
+        elif kind == 'link':
+            # 链接文字中可能嵌套图片，如 [![徽章](badge.svg)](https://...)
+            link_text = match.group('link_text')
+            if '![' in link_text:
+                text_start = match.start('link_text')
+                for image_match in NESTED_IMAGE_PATTERN.finditer(link_text):
+                    tokens.append(
+                        MarkdownToken(
+                            'image',
+                            text_start + image_match.start(1),
+                            text_start + image_match.end(1),
+                            image_match.group(1),
+                        )
+                    )
+            tokens.append(
+                MarkdownToken('link', match.start('link_url'), match.end('link_url'), match.group('link_url'))
+            )
+        else:
+            attribute_kinds = TAG_ATTRIBUTE_KINDS[match.group('tag_name').lower()]
+            tag_start = match.start()
+            for attribute_match in HTML_ATTRIBUTE_PATTERN.finditer(match.group()):
+                attribute_kind = attribute_kinds.get(attribute_match.group(1).lower())
+                if attribute_kind is not None:
+                    tokens.append(
+                        MarkdownToken(
+                            attribute_kind,
+                            tag_start + attribute_match.start(3),
+                            tag_start + attribute_match.end(3),
+                            attribute_match.group(3),
+                        )
+                    )
+
+    return tokens
+
+
+def splice(content: str, replacements: list[tuple[int, int, str]]) -> str:
+    """Apply non-overlapping (start, end, text) replacements in a single pass."""
+    if not replacements:
+        return content
+
+    parts = []
+    position = 0
+    for start, end, text in sorted(replacements):
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+无需翻译的源文改动
+把源文改动区域拆成正文骨架和不需要翻译的字面量（代码、链接与图片地址、HTML 属性值、裸 URL、版本号），
+骨架不变时改动只涉及字面量或空白，可以把同样的替换直接应用到已有译文，不必调用模型
+"""
+
+import re
+from typing import NamedTuple
+
+try:
+    from docs_assistant import markdown_tokens, placeholders
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import markdown_tokens
+    import placeholders
+
+VERSION_PATTERN = re.compile(r'(?<![\w.])v?\d+(?:\.\d+)+(?:-[0-9A-Za-z.]+)?(?![\w.])')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# 骨架中代替字面量的标记
+LITERAL_MARKER = '\0'
+
+# 译文后处理会按顺序从源文恢复这些 token，译文中找不到旧值时交给后处理
+RESTORED_TOKEN_KINDS = ('link', 'image', 'href', 'src', 'anchor_id')
+
+
+class Literal(NamedTuple):
+    kind: str  # markdown_tokens 的 token 种类，或 url、version
+    value: str
+
+
+def split_literals(text: str) -> tuple[str, list[Literal]]:
+    """Split text into a whitespace-normalized prose skeleton and its non-translatable literals in order."""
+    skeleton = []
+    literals = []
+
+    def collect_prose(prose: str):
+        position = 0
+        matches = sorted(
+            [(match.start(), match.end(), 'url') for match in placeholders.BARE_URL_PATTERN.finditer(prose)]
+            + [(match.start(), match.end(), 'version') for match in VERSION_PATTERN.finditer(prose)]
+        )
+        for start, end, kind in matches:
+            # 裸 URL 中的版本号已随 URL 一起记录
+            if start < position:
+                continue
+            skeleton.append(prose[position:start])
+            skeleton.append(LITERAL_MARKER)
+            literals.append(Literal(kind, prose[start:end]))
+            position = end
+        skeleton.append(prose[position:])
+
+    position = 0
+    for token in markdown_tokens.tokenize(text):
+        collect_prose(text[position:token.start])
+        skeleton.append(LITERAL_MARKER)
+        literals.append(Literal(token.kind, token.value))
+        position = token.end
+    collect_prose(text[position:])
+
+    return WHITESPACE_PATTERN.sub(' ', ''.join(skeleton)).strip(), literals
+
+
+def find_literal_edits(previous_source: str, source: str) -> list[tuple[Literal, Literal]] | None:
+    """Return the changed (old, new) literals when prose is untouched; None when the change needs translation."""
+    previous_skeleton, previous_literals = split_literals(previous_source)
+    skeleton, literals = split_literals(source)
+    if previous_skeleton != skeleton or len(previous_literals) != len(literals):
+        return None
+    if any(old.kind != new.kind for old, new in zip(previous_literals, literals)):
+        return None
+    return [(old, new) for old, new in zip(previous_literals, literals) if old.value != new.value]
+
+
+def patch_region(previous_source: str, previous_translation: str, source: str) -> str | None:
+    """Apply a non-translatable source change to the aligned translation; None when the model is needed."""
+    skeleton, _ = split_literals(source)
+    if not skeleton.replace(LITERAL_MARKER, '').strip():
+        # 新内容全部是代码、地址等字面量（包括整段删除），译文与源文相同
+        return source
+
+    edits = find_literal_edits(previous_source, source)
+    if edits is None:
+        return None
+
+    parts = []
+    position = 0
+    for old, new in edits:
+        index = previous_translation.find(old.value, position)
+        if index < 0:
+            if old.kind in RESTORED_TOKEN_KINDS:
+                continue
+            return None
+        parts.append(previous_translation[position:index])
+        parts.append(new.value)
+        position = index + len(old.value)
+    parts.append(previous_translation[position:])
+    return ''.join(parts)
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+本地 OpenAI 兼容模拟服务
+在本机提供 /v1/chat/completions 接口，按可配置的延迟分布、输出速度、429 比例和截断比例返回响应，
+用于在不消耗真实 token 的情况下测量 translate.py 的吞吐量；响应可录制为 cassette 文件以便复现
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    from docs_assistant import markdown_blocks
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import markdown_blocks
+
+logger = logging.getLogger(__name__)
+
+# 与 translate.py 中各任务用户消息的开头保持一致，模拟服务据此生成结构正确的“译文”
+FULL_TASK_PREFIX = '任务：整篇翻译'
+INCREMENTAL_TASK_PREFIX = '任务：增量更新'
+EDIT_LIST_TASK_PREFIX = '任务：以编辑列表增量更新'
+HUNKS_TASK_PREFIX = '任务：局部增量更新'
+SEGMENTS_TASK_PREFIX = '任务：分块翻译'
+# 各任务的待处理内容由成对的标签包裹，只读取标签之间的内容，不会把附带的术语表当作原文
+FULL_SOURCE_TAGS = ('<source_markdown>\n', '\n</source_markdown>')
+HUNKS_TAGS = ('<changed_regions>\n', '\n</changed_regions>')
+SEGMENTS_TAGS = ('<source_blocks>\n', '\n</source_blocks>')
+
+# 流式响应每个数据块包含的字符数
+STREAM_CHUNK_CHARS = 40
+
+
+class MockConfig(NamedTuple):
+    latency_median: float = 0.5  # 首个 token 延迟的中位数（秒），服从对数正态分布
+    latency_sigma: float = 0.5  # 对数正态分布的 sigma，越大长尾越明显
+    tokens_per_second: float = 300.0  # 输出速度
+    rate_limit_ratio: float = 0.0  # 返回 429 的请求比例
+    truncation_ratio: float = 0.0  # 以 finish_reason=length 截断的响应比例
+    retry_after: float = 1.0  # 429 响应中 retry-after-ms 对应的秒数
+    seed: int = 0  # 随机种子；同一请求第 N 次出现时的延迟与故障只由种子决定，与并发顺序无关
+
+
+DEFAULT_CONFIG = MockConfig()
+
+_lock = threading.Lock()
+_state = {
+    'config': DEFAULT_CONFIG,
+    'cassette_path': None,
+    'upstream_base_url': None,
+    'upstream_api_key': None,
+}
+# 请求键 -> 录制的响应 {'content': ..., 'finish_reason': ...}
+_cassette: dict[str, dict] = {}
+# 请求键 -> 已收到的次数，用于为重试请求生成不同但可复现的随机结果
+_occurrences: dict[str, int] = {}
+# 已出现过的系统提示词哈希，用于模拟服务商的前缀缓存
+_seen_prefixes: set[str] = set()
+_stats = {
+    'requests': 0,
+    'rate_limited': 0,
+    'truncated': 0,
+    'cassette_hits': 0,
+    'cassette_misses': 0,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate tokens the same way translate.py does: one per CJK character, one per four others."""
+    cjk_count = len(markdown_blocks.CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count) // 4 + 1
+
+
+def get_request_key(body: dict) -> str:
+    """Hash the model and messages so identical requests map to the same cassette entry."""
+    payload = json.dumps(
+        {'model': body.get('model'), 'messages': body.get('messages')},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _extract_between(text: str, start_tag: str, end_tag: str) -> str:
+    start = text.index(start_tag) + len(start_tag)
+    # 待处理内容本身可能包含同名标签，以最后一个结束标签为准
+    return text[start:text.rindex(end_tag, start)]
+
+
+def synthesize_response(messages: list[dict]) -> str:
+    """Build a structurally valid reply that echoes the source text back as the "translation"."""
+    user_messages = [message['content'] for message in messages if message['role'] == 'user']
+    task = user_messages[0]
+
+    if task.startswith(FULL_TASK_PREFIX):
+        response = _extract_between(task, *FULL_SOURCE_TAGS).rstrip('\n')
+    elif task.startswith(INCREMENTAL_TASK_PREFIX):
+        response = _extract_between(task, '<latest_source_markdown>\n', '\n</latest_source_markdown>')
+    elif task.startswith(EDIT_LIST_TASK_PREFIX):
+        # 第一个块替换为整篇最新源文，其余块删除；结构校验与整篇输出等价
+        latest_source = _extract_between(task, '<latest_source_markdown>\n', '\n</latest_source_markdown>')
+        block_ids = list(json.loads(
+            _extract_between(task, '<previous_translation_blocks>\n', '\n</previous_translation_blocks>')
+        ))
+        edits = [{'op': 'replace', 'id': block_ids[0], 'text': latest_source}] if block_ids else []
+        edits += [{'op': 'delete', 'id': block_id} for block_id in block_ids[1:]]
+        response = json.dumps({'edits': edits}, ensure_ascii=False)
+    elif task.startswith(HUNKS_TASK_PREFIX):
+        regions = json.loads(_extract_between(task, *HUNKS_TAGS))
+        response = json.dumps({key: region['source'] for key, region in regions.items()}, ensure_ascii=False)
+    elif task.startswith(SEGMENTS_TASK_PREFIX):
+        response = json.dumps(json.loads(_extract_between(task, *SEGMENTS_TAGS)), ensure_ascii=False)
+    else:
+        raise ValueError(f"无法识别的翻译任务: {task[:40]}")
+
+    # 续写请求：返回完整回复中已保留部分之后的内容
+    assistant_messages = [message['content'] for message in messages if message['role'] == 'assistant']
+    if assistant_messages:
+        kept = assistant_messages[-1].rstrip()
+        if response.startswith(kept):
+            return response[len(kept):]
+    return response
+
+
+def _request_upstream(body: dict) -> dict:
+    """Forward a request to the real upstream API without streaming and return the recorded response."""
+    upstream_body = {key: value for key, value in body.items() if key not in ('stream', 'stream_options')}
+    request = urllib.request.Request(
+        f"{_state['upstream_base_url'].rstrip('/')}/chat/completions",
+        data=json.dumps(upstream_body, ensure_ascii=False).encode('utf-8'),
+        headers={
+            'Content-Type': 'application/json',
+            'Authorization': f"Bearer {_state['upstream_api_key']}",
+        },
+    )
+    with urllib.request.urlopen(request, timeout=300) as response:
+        choice = json.loads(response.read())['choices'][0]
+    return {'content': choice['message']['content'] or '', 'finish_reason': choice.get('finish_reason')}
+
+
+def get_recorded_response(key: str, body: dict) -> dict:
+    """Return the cassette entry for key, creating it from upstream or the synthetic echo on a miss."""
+    with _lock:
+        recorded = _cassette.get(key)
+        if recorded is not None:
+            _stats['cassette_hits'] += 1
+            return recorded
+        _stats['cassette_misses'] += 1
+
+    if _state['upstream_base_url']:
+        recorded = _request_upstream(body)
+    else:
+        recorded = {'content': synthesize_response(body['messages']), 'finish_reason': 'stop'}
+
+    with _lock:
+        _cassette[key] = recorded
+        if _state['cassette_path'] is not None:
+            with _state['cassette_path'].open('a', encoding='utf-8') as cassette_file:
+                cassette_file.write(json.dumps({'key': key, **recorded}, ensure_ascii=False) + '\n')
+    return recorded
+
+
+def build_usage(messages: list[dict], content: str) -> dict:
+    """Report token usage, counting the system prompt as cached after its first appearance."""
+    prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+    system_prompt = messages[0]['content'] if messages and messages[0]['role'] == 'system' else ''
+    prefix_key = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+    with _lock:
+        cached_tokens = estimate_tokens(system_prompt) if system_prompt and prefix_key in _seen_prefixes else 0
+        _seen_prefixes.add(prefix_key)
+    completion_tokens = estimate_tokens(content)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {'cached_tokens': cached_tokens},
+    }
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        config = _state['config']
+        key = get_request_key(body)
+        with _lock:
+            _stats['requests'] += 1
+            occurrence = _occurrences.get(key, 0)
+            _occurrences[key] = occurrence + 1
+        rng = random.Random(f"{config.seed}:{key}:{occurrence}")
+        first_token_delay = config.latency_median * math.exp(rng.gauss(0.0, config.latency_sigma))
+
+        if rng.random() < config.rate_limit_ratio:
+            with _lock:
+                _stats['rate_limited'] += 1
+            time.sleep(min(first_token_delay, config.latency_median))
+            self._send_json(
+                429,
+                {'error': {'message': 'mock rate limit', 'type': 'rate_limit_exceeded'}},
+                {'retry-after-ms': str(int(config.retry_after * 1000))},
+            )
+            return
+
+        try:
+            recorded = get_recorded_response(key, body)
+        except Exception as e:
+            logger.error(f"生成模拟响应失败: {str(e)}")
+            self._send_json(500, {'error': {'message': str(e)}})
+            return
+
+        content = recorded['content']
+        finish_reason = recorded['finish_reason']
+        if len(content) > 1 and rng.random() < config.truncation_ratio:
+            with _lock:
+                _stats['truncated'] += 1
+            content = content[:len(content) // 2]
+            finish_reason = 'length'
+
+        usage = build_usage(body['messages'], content)
+        seconds_per_token = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        response_id = f'chatcmpl-mock-{key[:12]}-{occurrence}'
+        created = int(time.time())
+        time.sleep(first_token_delay)
+
+        if not body.get('stream'):
+            time.sleep(usage['completion_tokens'] * seconds_per_token)
+            self._send_json(200, {
+                'id': response_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': body.get('model'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': finish_reason,
+                }],
+                'usage': usage,
+            })
+            return
+
+        # HTTP/1.0 下不声明长度，连接关闭即表示事件流结束
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+
+        def send_chunk(delta: dict, chunk_finish_reason: str | None = None, chunk_usage: dict | None = None):
+            chunk = {
+                'id': response_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': body.get('model'),
+                'choices': [] if chunk_usage else [
+                    {'index': 0, 'delta': delta, 'finish_reason': chunk_finish_reason}
+                ],
+            }
+            if chunk_usage:
+                chunk['usage'] = chunk_usage
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        send_chunk({'role': 'assistant', 'content': ''})
+        for start in range(0, len(content), STREAM_CHUNK_CHARS):
+            part = content[start:start + STREAM_CHUNK_CHARS]
+            time.sleep(estimate_tokens(part) * seconds_per_token)
+            send_chunk({'content': part})
+        send_chunk({}, finish_reason)
+        if (body.get('stream_options') or {}).get('include_usage'):
+            send_chunk({}, chunk_usage=usage)
+        self.wfile.write(b'data: [DONE]\n\n')
+
+
+def configure(
+    config: MockConfig,
+    cassette_path: Path | None = None,
+    upstream_base_url: str | None = None,
+    upstream_api_key: str | None = None,
+):
+    """Reset counters and load the cassette; later requests replay recorded responses."""
+    with _lock:
+        _state.update(
+            config=config,
+            cassette_path=cassette_path,
+            upstream_base_url=upstream_base_url,
+            upstream_api_key=upstream_api_key,
+        )
+        _cassette.clear()
+        _occurrences.clear()
+        _seen_prefixes.clear()
+        for name in _stats:
+            _stats[name] = 0
+
+        if cassette_path is not None and cassette_path.exists():
+            with cassette_path.open('r', encoding='utf-8') as cassette_file:
+                for line in cassette_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        _cassette[entry.pop('key')] = entry
+        if cassette_path is not None:
+            cassette_path.parent.mkdir(parents=True, exist_ok=True)
+
+
+def reset_run():
+    """Forget per-run counters so each benchmark run sees the same fault sequence; the cassette is kept."""
+    with _lock:
+        _occurrences.clear()
+        _seen_prefixes.clear()
+        for name in _stats:
+            _stats[name] = 0
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start serving in a daemon thread; port 0 picks a free port (see server.server_address)."""
+    server = ThreadingHTTPServer((host, port), MockRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_stats() -> dict:
+    """Return server-side counters for the current run."""
+    with _lock:
+        return dict(_stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 OpenAI 兼容模拟服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--latency-median', type=float, default=DEFAULT_CONFIG.latency_median, help='首个 token 延迟中位数（秒）')
+    parser.add_argument('--latency-sigma', type=float, default=DEFAULT_CONFIG.latency_sigma, help='延迟对数正态分布的 sigma')
+    parser.add_argument('--tokens-per-second', type=float, default=DEFAULT_CONFIG.tokens_per_second, help='输出速度')
+    parser.add_argument('--rate-limit-ratio', type=float, default=DEFAULT_CONFIG.rate_limit_ratio, help='返回 429 的比例')
+    parser.add_argument('--truncation-ratio', type=float, default=DEFAULT_CONFIG.truncation_ratio, help='截断响应的比例')
+    parser.add_argument('--retry-after', type=float, default=DEFAULT_CONFIG.retry_after, help='429 响应建议的等待秒数')
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG.seed, help='随机种子')
+    parser.add_argument('--cassette', type=Path, help='录制/回放响应的 JSONL 文件')
+    parser.add_argument('--upstream-base-url', help='未命中 cassette 时转发到的真实 API 地址（密钥读取 OPENAI_API_KEY）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    configure(
+        MockConfig(
+            latency_median=args.latency_median,
+            latency_sigma=args.latency_sigma,
+            tokens_per_second=args.tokens_per_second,
+            rate_limit_ratio=args.rate_limit_ratio,
+            truncation_ratio=args.truncation_ratio,
+            retry_after=args.retry_after,
+            seed=args.seed,
+        ),
+        cassette_path=args.cassette,
+        upstream_base_url=args.upstream_base_url,
+        upstream_api_key=os.environ.get('OPENAI_API_KEY'),
+    )
+    server = ThreadingHTTPServer((args.host, args.port), MockRequestHandler)
+    logger.info(f"模拟服务已启动: http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
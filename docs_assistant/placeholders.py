@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+不可翻译内容的占位符替换
+发送给模型前把代码块、行内代码、URL 和 HTML 属性值替换为紧凑的占位符，收到译文后再逐一还原
+"""
+
+import re
+
+try:
+    from docs_assistant import markdown_blocks
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import markdown_blocks
+
+PLACEHOLDER_OPEN = '⟦'
+PLACEHOLDER_CLOSE = '⟧'
+PLACEHOLDER_PATTERN = re.compile(r'⟦[A-Z]\d+⟧')
+
+INLINE_CODE_PATTERN = re.compile(r'(?<!`)(`+)(?!`)(.+?)(?<!`)\1(?!`)')
+HTML_ATTRIBUTE_PATTERN = re.compile(r'(\b(?:href|src|id)=)(["\'])([^"\'\n]+)\2', re.IGNORECASE)
+MARKDOWN_TARGET_PATTERN = re.compile(r'(\]\()([^)\n]+)(\))')
+BARE_URL_PATTERN = re.compile(r'https?://[^\s<>()\[\]"\'`，。；：！？、]+')
+# 裸 URL 末尾的这些标点通常属于句子而不是链接
+URL_TRAILING_PUNCTUATION = '.,;:!?'
+
+# 占位符种类：C 代码块、I 行内代码、A HTML 属性值、U 链接目标与 URL
+KIND_CODE_BLOCK = 'C'
+KIND_INLINE_CODE = 'I'
+KIND_ATTRIBUTE = 'A'
+KIND_URL = 'U'
+
+
+def _make_placeholder(original: str, kind: str, mapping: dict[str, str]) -> str:
+    """Return the placeholder for original, reusing the existing one for repeated spans."""
+    for placeholder, value in mapping.items():
+        if value == original and placeholder[1] == kind:
+            return placeholder
+
+    count = sum(1 for placeholder in mapping if placeholder[1] == kind)
+    placeholder = f"{PLACEHOLDER_OPEN}{kind}{count + 1}{PLACEHOLDER_CLOSE}"
+    mapping[placeholder] = original
+    return placeholder
+
+
+def _mask_inline(text: str, mapping: dict[str, str]) -> str:
+    """Mask inline code, HTML link/anchor attributes, Markdown link targets and bare URLs."""
+    text = INLINE_CODE_PATTERN.sub(
+        lambda match: _make_placeholder(match.group(0), KIND_INLINE_CODE, mapping),
+        text,
+    )
+    text = HTML_ATTRIBUTE_PATTERN.sub(
+        lambda match: (
+            f"{match.group(1)}{match.group(2)}"
+            f"{_make_placeholder(match.group(3), KIND_ATTRIBUTE, mapping)}{match.group(2)}"
+        ),
+        text,
+    )
+    text = MARKDOWN_TARGET_PATTERN.sub(
+        lambda match: (
+            f"{match.group(1)}{_make_placeholder(match.group(2), KIND_URL, mapping)}{match.group(3)}"
+        ),
+        text,
+    )
+
+    def replace_url(match: re.Match[str]) -> str:
+        url = match.group(0).rstrip(URL_TRAILING_PUNCTUATION)
+        return _make_placeholder(url, KIND_URL, mapping) + match.group(0)[len(url):]
+
+    return BARE_URL_PATTERN.sub(replace_url, text)
+
+
+def mask_content(content: str, mapping: dict[str, str] | None = None) -> tuple[str, dict[str, str]]:
+    """Replace non-translatable spans with placeholders; a shared mapping reuses placeholders across texts."""
+    if mapping is None:
+        mapping = {}
+    if PLACEHOLDER_OPEN in content or PLACEHOLDER_CLOSE in content:
+        # 原文本身包含占位符字符时无法可靠还原，直接原样发送
+        return content, mapping
+
+    masked_blocks = []
+    for block in markdown_blocks.split_blocks(content):
+        if block.kind == 'code':
+            text = _make_placeholder(block.text, KIND_CODE_BLOCK, mapping)
+        elif block.kind == 'front_matter':
+            # Front matter 的字符串值需要翻译，且 YAML 引号规则由提示词约束，保持原样
+            text = block.text
+        else:
+            text = _mask_inline(block.text, mapping)
+        masked_blocks.append(block._replace(text=text))
+
+    return markdown_blocks.join_blocks(masked_blocks), mapping
+
+
+def restore_content(translated: str, masked_source: str, mapping: dict[str, str]) -> str:
+    """Put the original spans back, raising ValueError if the model dropped or duplicated a placeholder."""
+    if not mapping:
+        return translated
+
+    expected = PLACEHOLDER_PATTERN.findall(masked_source)
+    actual = PLACEHOLDER_PATTERN.findall(translated)
+    if sorted(expected) != sorted(actual):
+        missing = sorted(set(expected) - set(actual))
+        unexpected = sorted(set(actual) - set(expected))
+        raise ValueError(
+            f"译文中的占位符与原文不一致（缺少 {len(missing)} 个: {' '.join(missing[:5])}；"
+            f"多出 {len(unexpected)} 个: {' '.join(unexpected[:5])}；"
+            f"原文 {len(expected)} 个，译文 {len(actual)} 个）"
+        )
+
+    return PLACEHOLDER_PATTERN.sub(
+        lambda match: mapping.get(match.group(0), match.group(0)),
+        translated,
+    )
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+进程级共享限流器
+以令牌桶同时限制每分钟请求数（RPM）和每分钟 token 数（TPM），并根据服务端返回的限流响应头校正
+"""
+
+import asyncio
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+DURATION_PART_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {
+    'ms': 0.001,
+    's': 1.0,
+    'm': 60.0,
+    'h': 3600.0,
+}
+
+# 等待时间超过该阈值时输出日志，避免刷屏
+LOG_WAIT_THRESHOLD = 1.0
+
+_state = {
+    'requests_per_minute': 0.0,
+    'tokens_per_minute': 0.0,
+    'configured_requests_per_minute': 0.0,
+    'configured_tokens_per_minute': 0.0,
+    'available_requests': 0.0,
+    'available_tokens': 0.0,
+    'blocked_until': 0.0,
+    'updated_at': 0.0,
+}
+_stats = {
+    'acquired': 0,
+    'waits': 0,
+    'wait_seconds': 0.0,
+    'rate_limited': 0,
+}
+
+
+def configure(requests_per_minute: float = 0, tokens_per_minute: float = 0):
+    """Reset the shared buckets; zero means unlimited until response headers report a limit."""
+    now = time.monotonic()
+    _state.update(
+        requests_per_minute=float(requests_per_minute),
+        tokens_per_minute=float(tokens_per_minute),
+        configured_requests_per_minute=float(requests_per_minute),
+        configured_tokens_per_minute=float(tokens_per_minute),
+        available_requests=float(requests_per_minute),
+        available_tokens=float(tokens_per_minute),
+        blocked_until=0.0,
+        updated_at=now,
+    )
+    for name in _stats:
+        _stats[name] = 0
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Parse provider reset durations such as '20ms', '1.5s' or '6m0s' into seconds."""
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = DURATION_PART_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _parse_number(value: str | None) -> float | None:
+    """Parse a numeric header value, ignoring malformed input."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _refill(now: float):
+    """Add the capacity that accrued since the last update."""
+    elapsed = max(0.0, now - _state['updated_at'])
+    _state['updated_at'] = now
+
+    if _state['requests_per_minute'] > 0:
+        _state['available_requests'] = min(
+            _state['requests_per_minute'],
+            _state['available_requests'] + elapsed * _state['requests_per_minute'] / 60,
+        )
+    if _state['tokens_per_minute'] > 0:
+        _state['available_tokens'] = min(
+            _state['tokens_per_minute'],
+            _state['available_tokens'] + elapsed * _state['tokens_per_minute'] / 60,
+        )
+
+
+def _get_wait_seconds(tokens: int, now: float) -> float:
+    """Return how long a request of the given size must wait for capacity."""
+    wait = max(0.0, _state['blocked_until'] - now)
+
+    requests_per_minute = _state['requests_per_minute']
+    if requests_per_minute > 0 and _state['available_requests'] < 1:
+        wait = max(wait, (1 - _state['available_requests']) * 60 / requests_per_minute)
+
+    tokens_per_minute = _state['tokens_per_minute']
+    if tokens_per_minute > 0:
+        # 单个请求超过整桶容量时按满桶处理，否则永远无法获得额度
+        needed = min(tokens, tokens_per_minute)
+        if _state['available_tokens'] < needed:
+            wait = max(wait, (needed - _state['available_tokens']) * 60 / tokens_per_minute)
+
+    return wait
+
+
+async def acquire(tokens: int) -> float:
+    """Wait until one request of the estimated token size fits both buckets; return seconds waited."""
+    waited = 0.0
+
+    while True:
+        now = time.monotonic()
+        _refill(now)
+        wait = _get_wait_seconds(tokens, now)
+        if wait <= 0:
+            break
+
+        if wait >= LOG_WAIT_THRESHOLD:
+            logger.info("⏳ 接近服务商限流上限，等待 %.1f 秒后发送请求", wait)
+        _stats['waits'] += 1
+        _stats['wait_seconds'] += wait
+        waited += wait
+        await asyncio.sleep(wait)
+
+    if _state['requests_per_minute'] > 0:
+        _state['available_requests'] -= 1
+    if _state['tokens_per_minute'] > 0:
+        _state['available_tokens'] -= min(tokens, _state['tokens_per_minute'])
+    _stats['acquired'] += 1
+    return waited
+
+
+def record_usage(estimated_tokens: int, actual_tokens: int | None):
+    """Refund or charge the token bucket once the real usage of a request is known."""
+    if actual_tokens is None or _state['tokens_per_minute'] <= 0:
+        return
+
+    _state['available_tokens'] = min(
+        _state['tokens_per_minute'],
+        _state['available_tokens'] + estimated_tokens - actual_tokens,
+    )
+
+
+def block_for(seconds: float):
+    """Pause every request in the process for at least the given number of seconds."""
+    if seconds <= 0:
+        return
+
+    blocked_until = time.monotonic() + seconds
+    if blocked_until > _state['blocked_until']:
+        _state['blocked_until'] = blocked_until
+        logger.warning("🚦 触发服务商限流，所有请求暂停 %.1f 秒", seconds)
+
+
+def _apply_limit(kind: str, header_limit: float | None):
+    """Adopt the provider-reported limit, never exceeding an explicitly configured one."""
+    if header_limit is None or header_limit <= 0:
+        return
+
+    configured = _state[f'configured_{kind}_per_minute']
+    limit = min(configured, header_limit) if configured > 0 else header_limit
+    if _state[f'{kind}_per_minute'] <= 0:
+        # 首次获知上限时从满桶开始，随后由 remaining 头校正
+        _state[f'available_{kind}'] = limit
+    _state[f'{kind}_per_minute'] = limit
+
+
+def update_from_headers(headers, status_code: int | None = None) -> float:
+    """Feed retry-after and x-ratelimit-* headers into the buckets; return the pause they imposed."""
+    if status_code == 429:
+        _stats['rate_limited'] += 1
+
+    if not headers:
+        return 0.0
+
+    pause = 0.0
+    now = time.monotonic()
+    _refill(now)
+
+    _apply_limit('requests', _parse_number(headers.get('x-ratelimit-limit-requests')))
+    _apply_limit('tokens', _parse_number(headers.get('x-ratelimit-limit-tokens')))
+
+    for kind in ('requests', 'tokens'):
+        remaining = _parse_number(headers.get(f'x-ratelimit-remaining-{kind}'))
+        if remaining is None:
+            continue
+        if _state[f'{kind}_per_minute'] > 0:
+            _state[f'available_{kind}'] = min(_state[f'available_{kind}'], remaining)
+        if remaining <= 0:
+            reset = parse_duration(headers.get(f'x-ratelimit-reset-{kind}')) or 0.0
+            block_for(reset)
+            pause = max(pause, reset)
+
+    retry_after_ms = _parse_number(headers.get('retry-after-ms'))
+    retry_after = (
+        retry_after_ms / 1000
+        if retry_after_ms is not None
+        else parse_duration(headers.get('retry-after'))
+    )
+    if retry_after:
+        block_for(retry_after)
+        pause = max(pause, retry_after)
+
+    return pause
+
+
+def get_stats() -> dict:
+    """Return counters for the run summary."""
+    return dict(_stats)
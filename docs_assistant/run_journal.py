@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+翻译运行日志
+每完成一个 (文件, 语言) 任务就追加一条 JSONL 记录并落盘，记录以源文 blob 哈希、目标语言和提示词版本为键，
+连同写入的译文一起保存；中途失败后使用 --resume 重新运行时，已完成的任务直接复用日志中的译文
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 写入译文的任务在 asyncio.to_thread 的工作线程中记录完成状态，写文件与更新内存状态都需持锁
+_lock = threading.Lock()
+_state = {
+    'file': None,
+}
+# (文件, 源文 blob 哈希, 语言, 提示词版本) -> 已写入的译文
+_completed: dict[tuple[str, str, str, str], str] = {}
+_stats = {
+    'loaded': 0,
+    'recorded': 0,
+}
+
+
+def compute_blob_hash(content: str) -> str:
+    """Return the git blob hash of content, matching `git hash-object`."""
+    data = content.encode('utf-8')
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def _load_entries(path: Path):
+    """Read completed jobs from an existing journal, ignoring a torn trailing line."""
+    with path.open('r', encoding='utf-8') as journal_file:
+        for line in journal_file:
+            try:
+                entry = json.loads(line)
+                key = (entry['file'], entry['source_hash'], entry['language'], entry['prompt_version'])
+                _completed[key] = entry['translation']
+            except (ValueError, KeyError, TypeError):
+                # 进程在写入过程中被终止时最后一行可能不完整，该任务视为未完成
+                logger.warning(f"跳过无法解析的运行日志记录: {path}")
+                continue
+            _stats['loaded'] += 1
+
+
+def open_journal(path: Path | None, resume: bool = False):
+    """Start recording completed jobs; with resume, jobs from the previous journal are kept."""
+    close_journal()
+    _completed.clear()
+    for name in _stats:
+        _stats[name] = 0
+    if path is None:
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if resume and path.exists():
+        _load_entries(path)
+    # 不续跑时开始新的日志，避免复用其它提交范围的记录
+    _state['file'] = path.open('a' if resume else 'w', encoding='utf-8')
+
+
+def close_journal():
+    """Close the journal file if one is open and forget the completed jobs."""
+    with _lock:
+        if _state['file'] is not None:
+            _state['file'].close()
+            _state['file'] = None
+        _completed.clear()
+
+
+def get_completed(file: str, source_hash: str, language: str, prompt_version: str) -> str | None:
+    """Return the translation written by a completed job, or None when the job still has to run."""
+    return _completed.get((file, source_hash, language, prompt_version))
+
+
+def record_completed(file: str, source_hash: str, language: str, prompt_version: str, translation: str):
+    """Append a completed job and force it to disk before returning; safe to call from worker threads."""
+    entry = {
+        'file': file,
+        'source_hash': source_hash,
+        'language': language,
+        'prompt_version': prompt_version,
+        'translation': translation,
+    }
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    with _lock:
+        _completed[(file, source_hash, language, prompt_version)] = translation
+        _stats['recorded'] += 1
+        if _state['file'] is None:
+            return
+        # 每条记录单独一行，一次写入后立即 fsync；读取时忽略未写完的行，因此记录要么完整存在要么不存在
+        _state['file'].write(line)
+        _state['file'].flush()
+        os.fsync(_state['file'].fileno())
+
+
+def get_stats() -> dict:
+    """Return journal counters for the run summary."""
+    return dict(_stats)
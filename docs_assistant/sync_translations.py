@@ -6,9 +6,13 @@
 import logging
 import os
 import shutil
-import subprocess
 from pathlib import Path
 
+try:
+    from docs_assistant import git_access
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import git_access
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -89,51 +93,21 @@ def move_translation_file(old_target: Path, new_target: Path):
 
 def read_source_doc_changes() -> list[tuple[str, str, str | None]]:
     """Read source-doc delete and rename operations from the configured diff range."""
-    result = subprocess.run(
-        [
-            'git',
-            'diff',
-            '--name-status',
-            '--find-renames',
-            TRANSLATE_DIFF_BASE,
-            TRANSLATE_DIFF_HEAD,
-            '--',
-            DOCS_REPO_PREFIX,
-        ],
-        capture_output=True,
-        text=True,
-        cwd=REPO_ROOT,
-    )
-
-    if result.returncode != 0:
-        raise RuntimeError(
-            f"读取文档 diff 失败: {result.stderr.strip() or result.returncode}"
-        )
-
     changes: list[tuple[str, str, str | None]] = []
-    for raw_line in result.stdout.splitlines():
-        parts = raw_line.split('\t')
-        if not parts:
-            continue
-
-        status = parts[0]
-
-        if status == 'D' and len(parts) >= 2:
-            source_path = parts[1]
-            if is_source_doc_repo_path(source_path):
-                changes.append(('delete', source_path, None))
+    for file_diff in git_access.load_diff(REPO_ROOT, TRANSLATE_DIFF_BASE, TRANSLATE_DIFF_HEAD, DOCS_REPO_PREFIX):
+        if file_diff.status == 'D':
+            if is_source_doc_repo_path(file_diff.old_path):
+                changes.append(('delete', file_diff.old_path, None))
             continue
 
-        if status.startswith('R') and len(parts) >= 3:
-            old_path = parts[1]
-            new_path = parts[2]
-            old_is_source = is_source_doc_repo_path(old_path)
-            new_is_source = is_source_doc_repo_path(new_path)
+        if file_diff.status == 'R':
+            old_is_source = is_source_doc_repo_path(file_diff.old_path)
+            new_is_source = is_source_doc_repo_path(file_diff.new_path)
 
             if old_is_source and new_is_source:
-                changes.append(('rename', old_path, new_path))
+                changes.append(('rename', file_diff.old_path, file_diff.new_path))
             elif old_is_source:
-                changes.append(('delete', old_path, None))
+                changes.append(('delete', file_diff.old_path, None))
 
     return changes
 
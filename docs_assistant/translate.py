@@ -4,15 +4,57 @@
 使用 OpenAI API 将中文文档翻译为英文和日文
 """
 
+import argparse
 import os
 import sys
+import asyncio
+import contextvars
 import logging
-import time
 import re
-import subprocess
+import time
+import hashlib
+import json
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from openai import OpenAI
+from typing import NamedTuple
+import openai
+from openai import AsyncOpenAI
+
+try:
+    from docs_assistant import (
+        batch_client,
+        concurrency_controller,
+        front_matter,
+        git_access,
+        glossary,
+        image_index,
+        markdown_blocks,
+        markdown_tokens,
+        mechanical_patch,
+        placeholders,
+        rate_limiter,
+        run_journal,
+        translation_cache,
+        translation_validator,
+        usage_ledger,
+        utils,
+    )
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import batch_client
+    import concurrency_controller
+    import front_matter
+    import git_access
+    import glossary
+    import image_index
+    import markdown_blocks
+    import markdown_tokens
+    import mechanical_patch
+    import placeholders
+    import rate_limiter
+    import run_journal
+    import translation_cache
+    import translation_validator
+    import usage_ledger
+    import utils
 
 # 配置日志
 logging.basicConfig(
@@ -49,7 +91,74 @@ RETRY_DELAY = int(os.environ.get('RETRY_DELAY', '2'))  # 初始重试延迟（
 RETRY_BACKOFF = float(os.environ.get('RETRY_BACKOFF', '2.0'))  # 退避倍数
 
 # 并发配置
-MAX_WORKERS = int(os.environ.get('MAX_WORKERS', '3'))  # 最大并发数
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', '3'))  # 初始的全局在途 API 请求数上限
+TRANSLATE_ADAPTIVE_CONCURRENCY = os.environ.get('TRANSLATE_ADAPTIVE_CONCURRENCY', 'true').lower() == 'true'  # 是否根据延迟和错误率自动调整并发
+TRANSLATE_MIN_WORKERS = int(os.environ.get('TRANSLATE_MIN_WORKERS', '1'))  # 自动调整时的并发下限
+TRANSLATE_MAX_WORKERS = int(os.environ.get('TRANSLATE_MAX_WORKERS', '16'))  # 自动调整时的并发上限
+
+# 限流配置（0 表示不预设上限，由服务端返回的 x-ratelimit-* 响应头决定）
+TRANSLATE_RPM_LIMIT = int(os.environ.get('TRANSLATE_RPM_LIMIT', '0'))  # 每分钟请求数上限
+TRANSLATE_TPM_LIMIT = int(os.environ.get('TRANSLATE_TPM_LIMIT', '0'))  # 每分钟 token 数上限
+
+# 占位符配置
+TRANSLATE_MASK = os.environ.get('TRANSLATE_MASK', 'true').lower() == 'true'  # 是否把代码、URL 和 HTML 属性值替换为占位符后再发送
+
+# 流式输出配置
+TRANSLATE_STREAM = os.environ.get('TRANSLATE_STREAM', 'true').lower() == 'true'  # 是否以流式方式接收译文
+TRANSLATE_STREAM_USAGE = os.environ.get('TRANSLATE_STREAM_USAGE', 'true').lower() == 'true'  # 流式请求是否附带 stream_options.include_usage 以获取 token 用量；服务商返回 400 时自动去掉重发
+TRANSLATE_MAX_CONTINUATIONS = int(os.environ.get('TRANSLATE_MAX_CONTINUATIONS', '3'))  # 译文因长度上限被截断时最多续写的次数
+
+# 分块配置
+TRANSLATE_CHUNK_SIZE = int(os.environ.get('TRANSLATE_CHUNK_SIZE', '12000'))  # 超过该字符数的文档按标题分块翻译
+
+# Front matter 配置
+TRANSLATE_FRONT_MATTER = os.environ.get('TRANSLATE_FRONT_MATTER', 'true').lower() == 'true'  # 整篇翻译时自行解析 Front matter，只把字符串值作为键值 JSON 翻译
+
+# 翻译缓存配置
+TRANSLATE_CACHE = os.environ.get('TRANSLATE_CACHE', 'true').lower() == 'true'  # 是否启用片段翻译缓存
+TRANSLATE_CACHE_PATH = Path(
+    os.environ.get('TRANSLATE_CACHE_PATH', REPO_ROOT / '.cache/translate/segments.sqlite3')
+)
+TRANSLATE_CACHE_MAX_MB = int(os.environ.get('TRANSLATE_CACHE_MAX_MB', '200'))  # 缓存容量上限（MB）
+
+# 翻译记忆配置
+TRANSLATE_MEMORY = os.environ.get('TRANSLATE_MEMORY', 'true').lower() == 'true'  # 是否复用已有译文中未变化的块
+TRANSLATE_MEMORY_MAX_MISS_RATIO = float(os.environ.get('TRANSLATE_MEMORY_MAX_MISS_RATIO', '0.6'))  # 待翻译内容占比超过该值时改为整篇翻译
+
+# 局部增量更新配置
+TRANSLATE_HUNK_INCREMENTAL = os.environ.get('TRANSLATE_HUNK_INCREMENTAL', 'true').lower() == 'true'  # 增量更新时只发送 diff 涉及的文档块
+TRANSLATE_HUNK_CONTEXT_BLOCKS = int(os.environ.get('TRANSLATE_HUNK_CONTEXT_BLOCKS', '1'))  # 每个改动区域前后附带的已有译文块数
+TRANSLATE_PATCH_OUTPUT = os.environ.get('TRANSLATE_PATCH_OUTPUT', 'true').lower() == 'true'  # 整篇增量更新时让模型只返回按块编号的编辑列表
+TRANSLATE_APPEND_ONLY_FILES = [
+    path.strip()
+    for path in os.environ.get('TRANSLATE_APPEND_ONLY_FILES', 'changelog.md').split(',')
+    if path.strip()
+]  # 只在顶部新增版本章节的文档（相对 docs/docs），增量更新时只翻译新增的版本
+TRANSLATE_MECHANICAL_PATCH = os.environ.get('TRANSLATE_MECHANICAL_PATCH', 'true').lower() == 'true'  # 源文只改动代码、链接、版本号或空白时直接修改已有译文，不调用 API
+
+# 结构校验配置
+TRANSLATE_VALIDATE = os.environ.get('TRANSLATE_VALIDATE', 'true').lower() == 'true'  # 是否逐节校验译文结构并只重译未通过的章节
+TRANSLATE_VALIDATE_MAX_CJK_RATIO = float(os.environ.get('TRANSLATE_VALIDATE_MAX_CJK_RATIO', '0.1'))  # 章节残留中文超过原文汉字的该比例时视为未翻译完整
+
+# 批量模式配置（通过 --batch 开启）
+TRANSLATE_BATCH_BACKEND = os.environ.get('TRANSLATE_BATCH_BACKEND', 'openai')  # openai 或 local（本地文件替身）
+TRANSLATE_BATCH_DIR = Path(
+    os.environ.get('TRANSLATE_BATCH_DIR', REPO_ROOT / '.cache/translate/batches')
+)
+TRANSLATE_BATCH_POLL_INTERVAL = float(os.environ.get('TRANSLATE_BATCH_POLL_INTERVAL', '60'))  # 轮询批次状态的间隔（秒）
+
+# 请求账本配置（每次 API 调用写入一条 JSONL 记录，设为空字符串时只在内存中汇总）
+# 每次运行开始时重写该文件；默认位置不在 CI 缓存的 .cache/translate 中，不会随缓存恢复而累积历次运行
+TRANSLATE_LEDGER_PATH = os.environ.get(
+    'TRANSLATE_LEDGER_PATH',
+    str(REPO_ROOT / '.cache/translate-ledger/ledger.jsonl'),
+)
+
+# 运行日志配置（记录已完成的任务供 --resume 跳过，设为空字符串时不写入）
+TRANSLATE_JOURNAL_PATH = os.environ.get(
+    'TRANSLATE_JOURNAL_PATH',
+    str(REPO_ROOT / '.cache/translate/journal.jsonl'),
+)
 
 # 强制翻译配置
 FORCE_TRANSLATE = os.environ.get('FORCE_TRANSLATE', 'false').lower() == 'true'  # 是否强制重新翻译已存在的文件
@@ -62,30 +171,65 @@ if not OPENAI_API_KEY:
     sys.exit(1)
 
 # 初始化 OpenAI 客户端
-client = OpenAI(
+# 关闭 SDK 内置的重试：429、5xx 和超时都交给 request_translation 的退避重试处理，
+# 共享限流器和并发控制器才能看到每一次失败，一个请求被限流时其它请求也会一起暂停
+client = AsyncOpenAI(
     api_key=OPENAI_API_KEY,
-    base_url=OPENAI_BASE_URL
+    base_url=OPENAI_BASE_URL,
+    max_retries=0,
 )
 
-MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)\n]+)\)')
-MARKDOWN_LINK_PATTERN = re.compile(r'(?<!!)\[([^\]]*)\]\(([^)\n]+)\)')
-HTML_IMAGE_SRC_PATTERN = re.compile(
-    r'(<img\b[^>]*\bsrc=)(["\'])([^"\']+)(\2)',
-    re.IGNORECASE,
-)
-HTML_LINK_HREF_PATTERN = re.compile(
-    r'(<a\b[^>]*\bhref=)(["\'])([^"\']+)(\2)',
-    re.IGNORECASE,
-)
-HTML_ANCHOR_ID_PATTERN = re.compile(
-    r'(<a\b[^>]*\bid=)(["\'])([^"\']+)(\2)',
-    re.IGNORECASE,
-)
+# 流式接收译文时输出进度日志的间隔（秒）
+STREAM_PROGRESS_INTERVAL = 10.0
+
+# 当前 (文件, 语言) 任务的预计 token 数，排队等待并发空位时大任务优先
+current_job_priority = contextvars.ContextVar('current_job_priority', default=0)
+# 当前任务对应的源文件（仓库相对路径），写入请求账本
+current_job_file = contextvars.ContextVar('current_job_file', default=None)
+
+_state = {
+    'stream_usage_rejected': False,  # 服务商拒绝过 stream_options 后，本次运行的流式请求不再附带
+}
+
+
+# 翻译任务类型，每类任务使用各自固定的系统提示词
+TASK_FULL = 'full'  # 整篇或片段翻译
+TASK_INCREMENTAL = 'incremental'  # 基于旧译文和 diff 输出完整文档
+TASK_EDITS = 'edits'  # 基于旧译文和 diff 输出块编辑列表
+TASK_HUNKS = 'hunks'  # 只发送 diff 涉及的改动区域
+TASK_SEGMENTS = 'segments'  # 按块编号批量翻译（翻译记忆、Front matter）
+# 发送前做过占位符替换的任务，系统提示词需要附带占位符说明
+MASKED_TASKS = (TASK_FULL, TASK_HUNKS, TASK_SEGMENTS)
+
+
+class TranslationJob(NamedTuple):
+    source_file: Path
+    lang_code: str
+    mode: str  # full、incremental、mechanical 或 skip
+    prompt_tokens: int
+    completion_tokens: int
+
+
 URL_SUFFIX_PATTERN = re.compile(r'^([^?#]+)([?#].*)?$')
 OUTER_CODE_FENCE_PATTERN = re.compile(
     r'^\s*```(?:markdown|md|yaml|yml)?\s*\r?\n([\s\S]*?)\r?\n```\s*$',
     re.IGNORECASE,
 )
+JSON_CODE_FENCE_PATTERN = re.compile(r'^\s*```(?:json)?\s*\r?\n([\s\S]*?)\r?\n```\s*$', re.IGNORECASE)
+TOP_LEVEL_HEADING_PATTERN = re.compile(r'^#{1,2}[ \t]')
+VERSION_HEADING_PATTERN = re.compile(r'^##[ \t]+v?(\d+(?:\.\d+)+[^\s]*)[ \t]*\r?$', re.MULTILINE)
+
+PLACEHOLDER_INSTRUCTIONS = """## 占位符
+原文中形如 `⟦C1⟧`、`⟦I2⟧`、`⟦U3⟧`、`⟦A4⟧` 的占位符代表代码块、行内代码、链接地址和 HTML 属性值等不可翻译的内容。必须把每个占位符逐字符原样保留在译文中对应的位置，不要翻译、改写、拆分、合并、增加或删除占位符。"""
+
+SYSTEM_PROMPT = (
+    "You are a professional technical documentation translator and editor. "
+    "Translate accurately while preserving Markdown formatting, code blocks, "
+    "and technical terms. Produce natural, idiomatic target-language prose, "
+    "and never leave newly added Chinese text untranslated in headings, "
+    "tables, link text, or admonitions unless it is a proper noun, code, "
+    "URL, path, or an explicitly preserved product label."
+)
 
 
 def is_translation_relative_path(path_str: str) -> bool:
@@ -105,11 +249,11 @@ def is_translated_doc_repo_path(repo_path: str) -> bool:
     return is_translation_relative_path(repo_path[len(prefix):])
 
 
-def get_translation_prompt(target_language: str, content: str) -> str:
-    """构建翻译提示词"""
-    prompt = f"""你是一个专业的技术文档翻译专家。请将以下 Markdown 格式的技术文档从中文翻译为{LANGUAGES[target_language]['native_name']}。
-
-翻译要求：
+def get_task_instructions(target_language: str, task: str) -> str:
+    """Return the instructions for one task type; every request carries only its own task's rules."""
+    language_name = LANGUAGES[target_language]['native_name']
+    if task == TASK_FULL:
+        return f"""## 整篇翻译的要求
 1. 保持 Markdown 格式完整，包括标题、列表、代码块、链接等
 2. 代码块内容不要翻译
 3. 专业术语使用行业标准翻译
@@ -120,7 +264,7 @@ def get_translation_prompt(target_language: str, content: str) -> str:
 8. 对于特殊的专有名词（如产品名 "New API"、"Cherry Studio" 等），保持不变
 9. 如果原文包含 YAML front matter，则键名、层级结构与列表缩进必须保持不变
 10. 如果原文包含 YAML front matter，则其中所有字符串值必须保留或改写为双引号包裹的形式，尤其是 title、tagline、heroText、footer、actions[*].text、actions[*].link、actions[*].type、features[*].title、features[*].details
-11. 如果原文包含 YAML front matter，不要输出未加引号且包含 ":"、"#"、"["、"]"、"{"、"}" 的 YAML 字符串值
+11. 如果原文包含 YAML front matter，不要输出未加引号且包含 ":"、"#"、"["、"]"、"{{"、"}}" 的 YAML 字符串值
 12. Markdown 图片 `![alt](...)` 和 HTML `<img src="...">` 中的本地相对路径必须逐字符原样保留，不要翻译、不要改写、不要自行补 `../` 或删减层级
 13. 远程图片 URL、站外链接、站内绝对路径（以 `/` 开头）也必须原样保留
 14. Markdown 链接目标 `(...)`、HTML `<a href="...">`、显式锚点 `<a id="..."></a>` 中的 URL、路径、`#fragment` 和 `id` 必须逐字符原样保留；只翻译链接文字，不要翻译或根据标题改写锚点
@@ -129,40 +273,11 @@ def get_translation_prompt(target_language: str, content: str) -> str:
 17. 译文必须符合目标语言技术文档的自然表达，避免逐词直译和明显的中文句式；必要时可以调整语序以保证流畅
 18. 遇到像“正式版 Stable”“Nightly 预发布”这类中外文混合标签时，可以保留 Stable、Nightly 等产品或渠道标签，但周围说明、链接文本、句子和表格内容必须完整翻译为目标语言，并在同一文档内保持一致
 19. 输出前请自检：除代码、URL、路径、明确保留的专有名词或英文产品标签外，不应残留中文句子、中文链接文字或中文表格单元
-
-术语表（不要放在翻译内容中）：
-
-| 中文 | English | 日本語 | 说明 |
-|------|---------|--------|------|
-| API 凭据库 | API Credential Library | API 認証情報庫 | 保存独立 Base URL + API Key 的功能名称 |
-| 倍率 | Ratio | 倍率 | 用于计算价格的乘数因子 |
-| 令牌 | Token | トークン | API访问凭证，也指模型处理的文本单元 |
-| 渠道 | Channel | チャネル | API服务提供商的接入通道 |
-| 分组 | Group | グループ | 用户或令牌的分类，影响价格倍率 |
-| 额度 | Quota | クォータ | 用户可用的服务额度 |
-| 自动签到 | Auto Check-in | 自動チェックイン | 自动执行站点签到任务 |
-| 自建站点 | Self-hosted Site | セルフホスト型サイト | 用户自行部署和管理的站点 |
-| 托管站点 | Managed Site | 管理対象サイト | 由扩展管理配置的站点 |
-| 不适用 | Not Applicable | 適用外 | 当前配置或能力不适用 |
-
-请直接返回翻译后的内容，不要添加任何解释或说明。
-
-原文：
-
-{content}
-"""
-    
-    return prompt
-
-
-def get_incremental_translation_prompt(
-    target_language: str,
-    new_source_content: str,
-    existing_translation_content: str,
-    source_diff: str,
-) -> str:
-    """构建基于旧译文和 diff 的最小修改翻译提示词"""
-    prompt = f"""你正在基于已有译文做增量更新，而不是重新翻译整份文档。请根据中文源文的变更 diff，在已有{LANGUAGES[target_language]['native_name']}译文上做最小必要修改，并返回完整的更新后文档。
+20. 如果用户消息说明原文是长文档中的一个连续片段，只翻译片段本身；不要补充文档标题、Front matter、前言或总结，也不要省略片段开头或结尾的内容
+21. 直接返回翻译后的内容，不要添加任何解释或说明"""
+    if task == TASK_INCREMENTAL:
+        return f"""## 增量更新的要求
+你将基于已有译文做增量更新，而不是重新翻译整份文档：根据中文源文的变更 diff，在已有{language_name}译文上做最小必要修改，并返回完整的更新后文档。
 
 核心目标：
 1. 优先保证“最小修改”，不是追求整篇文风统一
@@ -170,7 +285,7 @@ def get_incremental_translation_prompt(
 3. 未受本次 diff 影响的已有译文应尽量逐字保持不变，不要顺手重写历史段落
 
 翻译要求：
-1. 返回完整的更新后{LANGUAGES[target_language]['native_name']}文档，不要只返回 diff，也不要添加解释
+1. 返回完整的更新后{language_name}文档，不要只返回 diff，也不要添加解释
 2. 保持 Markdown 格式完整，包括标题、列表、代码块、链接、admonition 等
 3. 代码块内容不要翻译
 4. 专业术语使用行业标准翻译；产品名如 "New API"、"Cherry Studio" 保持不变
@@ -184,29 +299,105 @@ def get_incremental_translation_prompt(
 12. 译文必须符合目标语言技术文档的自然表达，避免逐词直译和明显的中文句式；必要时可以调整语序以保证流畅
 13. 如果本次改动包含“正式版 Stable”“Nightly 预发布”这类中外文混合标签，可以保留 Stable、Nightly 等产品或渠道标签，但周围说明、链接文字和句子必须完整翻译并保持一致
 14. 输出前请自检：除代码、URL、路径、明确保留的专有名词或英文产品标签外，不应残留中文句子、中文链接文字或中文表格单元
-15. 如果旧译文中存在与本次 diff 无关的瑕疵，也不要顺手大范围改写；除非 diff 直接涉及该处
-
-术语表（不要放在翻译内容中）：
-
-| 中文 | English | 日本語 | 说明 |
-|------|---------|--------|------|
-| API 凭据库 | API Credential Library | API 認証情報庫 | 保存独立 Base URL + API Key 的功能名称 |
-| 倍率 | Ratio | 倍率 | 用于计算价格的乘数因子 |
-| 令牌 | Token | トークン | API访问凭证，也指模型处理的文本单元 |
-| 渠道 | Channel | チャネル | API服务提供商的接入通道 |
-| 分组 | Group | グループ | 用户或令牌的分类，影响价格倍率 |
-| 额度 | Quota | クォータ | 用户可用的服务额度 |
-| 自动签到 | Auto Check-in | 自動チェックイン | 自动执行站点签到任务 |
-| 自建站点 | Self-hosted Site | セルフホスト型サイト | 用户自行部署和管理的站点 |
-| 托管站点 | Managed Site | 管理対象サイト | 由扩展管理配置的站点 |
-| 不适用 | Not Applicable | 適用外 | 当前配置或能力不适用 |
-
-输入一：最新中文源文
+15. 如果旧译文中存在与本次 diff 无关的瑕疵，也不要顺手大范围改写；除非 diff 直接涉及该处"""
+    if task == TASK_EDITS:
+        return f"""## 编辑列表增量更新的要求
+用户消息提供最新中文源文、中文源文 diff，以及按块编号列出的上一版{language_name}译文（JSON 对象，键是块编号，值是该块的译文）。不要输出完整文档，只返回把旧译文更新为最新源文译文所需的编辑列表。
+1. 只返回一个 JSON 对象 `{{"edits": [...]}}`，不要添加解释，也不要包裹代码块
+2. 每个编辑是 `{{"op": "replace", "id": "t3", "text": "..."}}` 或 `{{"op": "delete", "id": "t5"}}`；`id` 必须是输入中存在的块编号，每个块最多出现一次
+3. `replace` 的 `text` 是该块更新后的完整译文；需要新增的内容放进相邻块的 `text` 中，与原有内容之间按 Markdown 需要用换行或空行分隔
+4. 只编辑受本次 diff 影响的块，其余块不要出现在编辑列表中；没有需要修改的块时返回 `{{"edits": []}}`
+5. 新增或修改的自然语言必须翻译为目标语言；Markdown 格式、代码、URL、路径、Markdown 链接目标、HTML `href`、`src`、`id` 的要求与增量更新相同"""
+    if task == TASK_HUNKS:
+        return f"""## 局部增量更新的要求
+用户消息中的 JSON 对象列出同一篇文档中受本次源文改动影响的若干区域，键是区域编号，值包含 `previous_source`（改动前的中文原文）、`previous_translation`（与之对应的已有译文）、`source`（改动后的中文原文），以及 `context_before`、`context_after`（区域前后的已有译文，仅供参考）。
+1. 只返回一个 JSON 对象，键与输入完全一致，值是对应 `source` 的完整{language_name}译文；不要输出上下文，不要添加解释，也不要包裹代码块
+2. 对照 `previous_source` 与 `source` 找出改动，在 `previous_translation` 上做最小必要修改；未改动的句子尽量逐字保留已有译文
+3. 新增或修改的自然语言必须翻译为目标语言，不要残留中文
+4. Markdown 结构（标题级别、列表标记与缩进、表格竖线、admonition 标记等）与 `source` 保持一致；代码、URL、路径、Markdown 链接目标、HTML `href`、`src`、`id` 必须逐字符原样保留
+5. 专业术语使用行业标准翻译，产品名如 "New API"、"Cherry Studio" 保持不变，用词与上下文保持一致"""
+    if task == TASK_SEGMENTS:
+        return f"""## 分块翻译的要求
+用户消息中的 JSON 对象包含同一篇文档中需要重新翻译的若干文档块，键是块编号，值是中文原文；其余未变化的块已经有译文，无需处理。
+1. 只返回一个 JSON 对象，键与输入完全一致，不要增删键，不要添加解释，也不要包裹代码块
+2. 每个值内部保持 Markdown 格式完整，包括标题级别、列表标记与缩进、表格竖线、admonition 标记等
+3. 代码、行内代码、URL、路径保持不变；Markdown 链接目标、HTML `href`、`src`、`id` 必须逐字符原样保留，只翻译链接文字和图片 alt
+4. 如果某个值是 YAML front matter，则键名、层级结构与列表缩进保持不变，所有字符串值使用双引号包裹
+5. 专业术语使用行业标准翻译；产品名如 "New API"、"Cherry Studio" 保持不变
+6. 译文必须符合目标语言技术文档的自然表达，除代码、URL、路径、明确保留的专有名词或英文产品标签外，不应残留中文"""
+    raise ValueError(f"未知的翻译任务类型: {task}")
+
+
+def get_system_prompt(target_language: str, task: str) -> str:
+    """构建同一 (目标语言, 任务类型) 所有请求共享的系统提示词"""
+    # 说明和规则逐字节固定，按内容筛选的术语表等可变内容只放在用户消息中，使同类请求命中服务商的前缀缓存；
+    # 每类任务只附带自己的说明，Front matter、分块等小请求不再为其它任务的规则付费
+    language_name = LANGUAGES[target_language]['native_name']
+    placeholder_note = f"\n\n{PLACEHOLDER_INSTRUCTIONS}" if task in MASKED_TASKS else ''
+    return f"""{SYSTEM_PROMPT}
+
+你是一个专业的技术文档翻译专家，负责把中文 Markdown 技术文档翻译为{language_name}。{placeholder_note}
+
+{get_task_instructions(target_language, task)}
+
+## 术语表
+用户消息在待处理内容之前可能附带本次内容涉及的术语表，表中术语必须使用给定的译法；术语表本身不要放在翻译内容中。
+"""
+
+
+def get_glossary_note(target_language: str, content: str) -> str:
+    """List only the glossary entries whose Chinese term occurs in the content being sent."""
+    table = glossary.format_table(glossary.find_entries(content), target_language)
+    if not table:
+        return ''
+    # 术语表放在待处理内容之前，内容本身由标签包裹，解析回复或原文时不会把术语表误当作内容
+    return f"""本次内容涉及的术语（不要放在翻译内容中）：
+
+{table}
+
+"""
+
+
+def build_messages(target_language: str, task: str, user_prompt: str) -> list[dict]:
+    """Pair the shared per-(language, task) system prompt with a request-specific user message."""
+    return [
+        {"role": "system", "content": get_system_prompt(target_language, task)},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def get_translation_prompt(target_language: str, content: str, is_fragment: bool = False) -> str:
+    """构建整篇翻译的用户消息"""
+    fragment_note = (
+        "以下原文是长文档中的一个连续片段。\n\n"
+        if is_fragment
+        else ""
+    )
+    return f"""任务：整篇翻译为{LANGUAGES[target_language]['native_name']}。
+
+{fragment_note}{get_glossary_note(target_language, content)}原文：
+<source_markdown>
+{content}
+</source_markdown>
+"""
+
+
+def get_incremental_translation_prompt(
+    target_language: str,
+    new_source_content: str,
+    existing_translation_content: str,
+    source_diff: str,
+) -> str:
+    """构建基于旧译文和 diff 的增量更新用户消息"""
+    language_name = LANGUAGES[target_language]['native_name']
+    return f"""任务：增量更新{language_name}译文。
+
+{get_glossary_note(target_language, new_source_content)}输入一：最新中文源文
 <latest_source_markdown>
 {new_source_content}
 </latest_source_markdown>
 
-输入二：上一版{LANGUAGES[target_language]['native_name']}译文
+输入二：上一版{language_name}译文
 <previous_translation_markdown>
 {existing_translation_content}
 </previous_translation_markdown>
@@ -217,7 +408,111 @@ def get_incremental_translation_prompt(
 </source_diff>
 """
 
-    return prompt
+
+def get_edit_list_prompt(
+    target_language: str,
+    new_source_content: str,
+    translated_blocks: dict[str, str],
+    source_diff: str,
+) -> str:
+    """构建要求返回编辑列表的增量更新用户消息"""
+    language_name = LANGUAGES[target_language]['native_name']
+    blocks_json = json.dumps(translated_blocks, ensure_ascii=False, indent=2)
+    return f"""任务：以编辑列表增量更新{language_name}译文。
+
+{get_glossary_note(target_language, new_source_content)}输入一：最新中文源文
+<latest_source_markdown>
+{new_source_content}
+</latest_source_markdown>
+
+输入二：按块编号列出的上一版{language_name}译文
+<previous_translation_blocks>
+{blocks_json}
+</previous_translation_blocks>
+
+输入三：中文源文 diff（仅用于定位改动范围）
+<source_diff>
+{source_diff}
+</source_diff>
+"""
+
+
+def get_hunks_translation_prompt(target_language: str, segments: dict[str, dict[str, str]]) -> str:
+    """构建按改动区域局部增量更新的用户消息"""
+    segments_json = json.dumps(segments, ensure_ascii=False, indent=2)
+    glossary_note = get_glossary_note(target_language, ''.join(segment['source'] for segment in segments.values()))
+    return f"""任务：局部增量更新{LANGUAGES[target_language]['native_name']}译文。
+
+{glossary_note}受本次改动影响的区域：
+<changed_regions>
+{segments_json}
+</changed_regions>
+"""
+
+
+def get_segments_translation_prompt(target_language: str, segments: dict[str, str]) -> str:
+    """构建按块编号批量翻译的用户消息"""
+    segments_json = json.dumps(segments, ensure_ascii=False, indent=2)
+    return f"""任务：分块翻译为{LANGUAGES[target_language]['native_name']}。
+
+{get_glossary_note(target_language, ''.join(segments.values()))}待翻译的文档块：
+<source_blocks>
+{segments_json}
+</source_blocks>
+"""
+
+
+def get_continuation_prompt() -> str:
+    """构建译文被截断后的续写提示词"""
+    return """上一次回复因长度限制被截断，已保留到最后一个完整的文档块为止。请从紧接着的下一个文档块继续翻译，直到原文结束。
+
+要求：
+1. 只输出剩余部分的译文，不要重复已输出的内容，不要添加任何说明
+2. 保持与前文一致的 Markdown 格式、术语和翻译要求
+3. 不要用代码块包裹输出
+"""
+
+
+def get_prompt_version(target_language: str, is_fragment: bool = False) -> str:
+    """Hash the full-translation prompt template so prompt edits invalidate cached segments."""
+    template = get_system_prompt(target_language, TASK_FULL) + get_translation_prompt(
+        target_language,
+        '',
+        is_fragment=is_fragment,
+    ) + glossary.get_version()
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+
+
+def get_journal_key(rel_path: Path, content: str, target_language: str) -> tuple[str, str, str, str]:
+    """Identify a (file, language) job in the run journal by source blob hash and prompt version."""
+    return (
+        rel_path.as_posix(),
+        run_journal.compute_blob_hash(content),
+        target_language,
+        get_prompt_version(target_language),
+    )
+
+
+def get_segment_cache_key(content: str, target_language: str, is_fragment: bool = False) -> str:
+    """Build the cache key for a full-translation segment."""
+    return translation_cache.make_cache_key(
+        content,
+        target_language,
+        OPENAI_MODEL,
+        get_prompt_version(target_language, is_fragment=is_fragment),
+    )
+
+
+def get_block_cache_key(content: str, target_language: str) -> str:
+    """Build the cache key for a single block translated through the segments prompt."""
+    prompt_version = hashlib.sha256(
+        (
+            get_system_prompt(target_language, TASK_SEGMENTS)
+            + get_segments_translation_prompt(target_language, {})
+            + glossary.get_version()
+        ).encode('utf-8')
+    ).hexdigest()[:16]
+    return translation_cache.make_cache_key(content, target_language, OPENAI_MODEL, prompt_version)
 
 
 def strip_outer_code_fence(content: str) -> str:
@@ -229,76 +524,121 @@ def strip_outer_code_fence(content: str) -> str:
     return match.group(1).strip()
 
 
-def _replace_ordered_matches(
+def split_markdown_sections(content: str) -> list[str]:
+    """Split Markdown at top-level headings, keeping front matter and code fences intact."""
+    front_matter_match = markdown_blocks.FRONT_MATTER_PATTERN.match(content)
+    body_start = front_matter_match.end() if front_matter_match else 0
+
+    sections = []
+    section_start = 0
+    offset = body_start
+    fence_marker = None
+
+    for line in content[body_start:].splitlines(keepends=True):
+        fence_match = markdown_blocks.CODE_FENCE_LINE_PATTERN.match(line)
+        if fence_marker is None:
+            if fence_match:
+                fence_marker = fence_match.group(1)
+            elif TOP_LEVEL_HEADING_PATTERN.match(line) and offset > section_start:
+                sections.append(content[section_start:offset])
+                section_start = offset
+        elif (
+            fence_match
+            and fence_match.group(1)[0] == fence_marker[0]
+            and len(fence_match.group(1)) >= len(fence_marker)
+            and not line[fence_match.end():].strip()
+        ):
+            fence_marker = None
+
+        offset += len(line)
+
+    sections.append(content[section_start:])
+    return [section for section in sections if section]
+
+
+def split_version_sections(content: str) -> tuple[str, list[tuple[str, str]]]:
+    """Split a changelog into its preamble and (version, section) pairs in document order."""
+    preamble = []
+    versions = []
+    for section in split_markdown_sections(content):
+        version_match = VERSION_HEADING_PATTERN.match(section)
+        if version_match:
+            versions.append((version_match.group(1), section))
+        elif versions:
+            # 版本之后的其它二级标题（如“更早的版本”）归入前一个版本
+            versions[-1] = (versions[-1][0], versions[-1][1] + section)
+        else:
+            preamble.append(section)
+    return ''.join(preamble), versions
+
+
+def split_markdown_chunks(content: str, max_chars: int) -> list[str]:
+    """Group top-level sections into ordered chunks of at most max_chars where possible."""
+    if max_chars <= 0 or len(content) <= max_chars:
+        return [content]
+
+    chunks = []
+    current = ''
+    for section in split_markdown_sections(content):
+        if current and len(current) + len(section) > max_chars:
+            chunks.append(current)
+            current = ''
+        current += section
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+# 需要在译文中保持与源文一致的 token 种类及其日志名称
+PRESERVED_TOKEN_KINDS = {
+    'link': "Markdown 链接目标",
+    'href': "HTML 链接 href",
+    'anchor_id': "HTML 锚点 id",
+}
+IMAGE_TOKEN_KINDS = ('image', 'src')
+
+
+def finalize_translated_content(
+    source_content: str,
     translated_content: str,
-    source_matches: list[str],
-    translated_pattern: re.Pattern,
-    replacement_factory,
-    label: str,
+    image_url_mapping: dict | None = None,
+    source_tokens: list | None = None,
 ) -> str:
-    """Restore ordered, non-translatable Markdown/HTML attributes after LLM output."""
-    translated_matches = list(translated_pattern.finditer(translated_content))
-
-    if len(source_matches) != len(translated_matches):
-        logger.warning(
-            "跳过%s恢复：源文数量 %s 与译文数量 %s 不一致",
-            label,
-            len(source_matches),
-            len(translated_matches),
-        )
-        return translated_content
+    """Restore link targets and anchor ids and relocate image paths from one tokenizer pass per document."""
+    if source_tokens is None:
+        source_tokens = markdown_tokens.tokenize(source_content)
+    translated_tokens = markdown_tokens.tokenize(translated_content)
+    replacements = []
+
+    for kind, label in PRESERVED_TOKEN_KINDS.items():
+        source_values = [token.value for token in source_tokens if token.kind == kind]
+        translated_matches = [token for token in translated_tokens if token.kind == kind]
+        if len(source_values) != len(translated_matches):
+            logger.warning(
+                "跳过%s恢复：源文数量 %s 与译文数量 %s 不一致",
+                label,
+                len(source_values),
+                len(translated_matches),
+            )
+            continue
 
-    source_index = 0
+        for token, source_value in zip(translated_matches, source_values):
+            if token.value != source_value:
+                replacements.append((token.start, token.end, source_value))
 
-    def replace(match: re.Match[str]) -> str:
-        nonlocal source_index
-        source_value = source_matches[source_index]
-        source_index += 1
-        return replacement_factory(match, source_value)
+    if image_url_mapping:
+        for token in translated_tokens:
+            if token.kind in IMAGE_TOKEN_KINDS and token.value in image_url_mapping:
+                replacements.append((token.start, token.end, image_url_mapping[token.value]))
 
-    return translated_pattern.sub(replace, translated_content)
+    return markdown_tokens.splice(translated_content, replacements)
 
 
 def preserve_translated_link_targets(source_content: str, translated_content: str) -> str:
     """Keep link targets and explicit anchor ids stable across translated docs."""
-    markdown_link_targets = [
-        match.group(2) for match in MARKDOWN_LINK_PATTERN.finditer(source_content)
-    ]
-    translated_content = _replace_ordered_matches(
-        translated_content,
-        markdown_link_targets,
-        MARKDOWN_LINK_PATTERN,
-        lambda match, source_target: f"[{match.group(1)}]({source_target})",
-        "Markdown 链接目标",
-    )
-
-    html_link_hrefs = [
-        match.group(3) for match in HTML_LINK_HREF_PATTERN.finditer(source_content)
-    ]
-    translated_content = _replace_ordered_matches(
-        translated_content,
-        html_link_hrefs,
-        HTML_LINK_HREF_PATTERN,
-        lambda match, source_href: (
-            f"{match.group(1)}{match.group(2)}{source_href}{match.group(4)}"
-        ),
-        "HTML 链接 href",
-    )
-
-    html_anchor_ids = [
-        match.group(3) for match in HTML_ANCHOR_ID_PATTERN.finditer(source_content)
-    ]
-    translated_content = _replace_ordered_matches(
-        translated_content,
-        html_anchor_ids,
-        HTML_ANCHOR_ID_PATTERN,
-        lambda match, source_id: (
-            f"{match.group(1)}{match.group(2)}{source_id}{match.group(4)}"
-        ),
-        "HTML 锚点 id",
-    )
-
-    return translated_content
+    return finalize_translated_content(source_content, translated_content)
 
 
 def is_local_relative_url(url: str) -> bool:
@@ -341,12 +681,12 @@ def resolve_localized_image_target(asset_path: Path, target_language: str) -> Pa
     except ValueError:
         return asset_path
 
-    if not relative.parts or relative.parts[0] == 'en':
+    if not relative.parts or relative.parts[0] == image_index.LOCALIZED_IMAGE_DIR:
         return asset_path
 
-    localized_candidate = static_image_root / 'en' / relative
-    if localized_candidate.exists():
-        return localized_candidate
+    # 查询启动时建立的图片索引，不再逐个调用 exists()
+    if image_index.has_localized_variant(static_image_root, relative.as_posix()):
+        return static_image_root / image_index.LOCALIZED_IMAGE_DIR / relative
 
     return asset_path
 
@@ -363,7 +703,8 @@ def rewrite_local_image_url(
     if not is_local_relative_url(path_part):
         return original_url
 
-    source_asset = (source_file.parent / path_part).resolve(strict=False)
+    # 纯字符串规范化路径，不访问文件系统
+    source_asset = Path(os.path.normpath(source_file.parent / path_part))
     target_asset = resolve_localized_image_target(source_asset, target_language)
     relocated = os.path.relpath(target_asset, start=target_file.parent)
     relocated = relocated.replace('\\', '/')
@@ -376,15 +717,12 @@ def collect_image_url_mapping(
     source_file: Path,
     target_file: Path,
     target_language: str,
+    source_tokens: list | None = None,
 ):
     """Build a mapping from source image URLs to translated-file-relative URLs."""
-    image_urls = set()
-
-    for match in MARKDOWN_IMAGE_PATTERN.finditer(source_content):
-        image_urls.add(match.group(2))
-
-    for match in HTML_IMAGE_SRC_PATTERN.finditer(source_content):
-        image_urls.add(match.group(3))
+    if source_tokens is None:
+        source_tokens = markdown_tokens.tokenize(source_content)
+    image_urls = {token.value for token in source_tokens if token.kind in IMAGE_TOKEN_KINDS}
 
     mapping = {}
     for url in image_urls:
@@ -400,28 +738,43 @@ def collect_image_url_mapping(
     return mapping
 
 
+def find_unreferenced_localized_images(docs_dir: Path) -> list[str]:
+    """Return indexed localized images that neither source docs nor translations reference."""
+    static_image_root = docs_dir / 'static' / 'image'
+    image_index.ensure_index(static_image_root)
+
+    referenced = set()
+    for doc_file in docs_dir.rglob('*.md'):
+        for token in markdown_tokens.tokenize(doc_file.read_text(encoding='utf-8')):
+            if token.kind not in IMAGE_TOKEN_KINDS:
+                continue
+            path_part, _ = split_url_suffix(token.value)
+            if not is_local_relative_url(path_part):
+                continue
+            asset_path = Path(os.path.normpath(doc_file.parent / path_part))
+            try:
+                relative = asset_path.relative_to(static_image_root)
+            except ValueError:
+                continue
+            # 源文引用通用图片时，译文会改用同名的本地化版本，同样算作引用
+            if relative.parts and relative.parts[0] == image_index.LOCALIZED_IMAGE_DIR:
+                relative = relative.relative_to(image_index.LOCALIZED_IMAGE_DIR)
+            referenced.add(relative.as_posix())
+
+    return image_index.find_unreferenced_variants(referenced)
+
+
 def rewrite_translated_image_paths(translated_content: str, image_url_mapping: dict) -> str:
     """Rewrite image paths in translated markdown using the deterministic mapping."""
     if not image_url_mapping:
         return translated_content
 
-    def replace_markdown(match: re.Match[str]) -> str:
-        alt_text = match.group(1)
-        image_url = match.group(2)
-        rewritten = image_url_mapping.get(image_url, image_url)
-        return f'![{alt_text}]({rewritten})'
-
-    def replace_html(match: re.Match[str]) -> str:
-        prefix = match.group(1)
-        quote = match.group(2)
-        image_url = match.group(3)
-        rewritten = image_url_mapping.get(image_url, image_url)
-        return f'{prefix}{quote}{rewritten}{quote}'
-
-    translated_content = MARKDOWN_IMAGE_PATTERN.sub(replace_markdown, translated_content)
-    translated_content = HTML_IMAGE_SRC_PATTERN.sub(replace_html, translated_content)
-
-    return translated_content
+    replacements = [
+        (token.start, token.end, image_url_mapping[token.value])
+        for token in markdown_tokens.tokenize(translated_content)
+        if token.kind in IMAGE_TOKEN_KINDS and token.value in image_url_mapping
+    ]
+    return markdown_tokens.splice(translated_content, replacements)
 
 
 def get_repo_relative_posix_path(file_path: Path) -> str:
@@ -433,107 +786,317 @@ def get_source_diff(source_file: Path) -> str:
     """Read the source-file unified diff between the configured revisions."""
     repo_relative_path = get_repo_relative_posix_path(source_file)
 
-    result = subprocess.run(
-        [
-            'git',
-            'diff',
-            '--no-color',
-            '--unified=3',
+    # 整个 docs 目录的 diff 只读取一次，各文件从中取出自己的部分
+    try:
+        file_diff = git_access.get_file_diff(
+            REPO_ROOT,
             TRANSLATE_DIFF_BASE,
             TRANSLATE_DIFF_HEAD,
-            '--',
+            DOCS_REPO_PREFIX,
             repo_relative_path,
-        ],
-        capture_output=True,
-        text=True,
-        cwd=REPO_ROOT,
+        )
+    except RuntimeError as e:
+        logger.warning(f"读取源文 diff 失败 {repo_relative_path}: {str(e)}")
+        return ''
+
+    return file_diff.patch if file_diff is not None else ''
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate tokens: one per CJK character, one per four other characters."""
+    cjk_count = len(markdown_blocks.CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count) // 4 + 1
+
+
+def configure_batch_mode():
+    """Enable batch submission with the backend selected by TRANSLATE_BATCH_BACKEND."""
+    if TRANSLATE_BATCH_BACKEND == 'local':
+        backend = batch_client.make_local_backend(TRANSLATE_BATCH_DIR / 'local')
+    elif TRANSLATE_BATCH_BACKEND == 'openai':
+        backend = batch_client.make_openai_backend(client)
+    else:
+        raise ValueError(f"不支持的批量后端: {TRANSLATE_BATCH_BACKEND}")
+
+    batch_client.configure(
+        backend,
+        TRANSLATE_BATCH_DIR,
+        poll_interval=TRANSLATE_BATCH_POLL_INTERVAL,
     )
 
-    if result.returncode != 0:
-        logger.warning(
-            f"读取源文 diff 失败 {repo_relative_path}: {result.stderr.strip() or result.returncode}"
-        )
+
+def configure_concurrency():
+    """Reset the shared in-flight limit that every file, language and chunk competes for."""
+    if TRANSLATE_ADAPTIVE_CONCURRENCY:
+        concurrency_controller.configure(MAX_WORKERS, TRANSLATE_MIN_WORKERS, TRANSLATE_MAX_WORKERS)
+    else:
+        concurrency_controller.configure(MAX_WORKERS)
+
+
+def truncate_to_complete_blocks(text: str) -> str:
+    """Drop the trailing, possibly cut-off block of a truncated Markdown response."""
+    blocks = markdown_blocks.split_blocks(text)
+    if len(blocks) <= 1:
         return ''
+    return markdown_blocks.join_blocks(blocks[:-1])
 
-    return result.stdout.strip()
 
+async def read_completion_stream(stream, target_language: str) -> tuple[str, str | None, object]:
+    """Collect streamed deltas, logging progress; return (text, finish_reason, usage)."""
+    parts = []
+    received_chars = 0
+    finish_reason = None
+    usage = None
+    next_progress_at = time.monotonic() + STREAM_PROGRESS_INTERVAL
 
-def translate_content(
-    content: str,
+    try:
+        async for chunk in stream:
+            if getattr(chunk, 'usage', None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+
+            choice = chunk.choices[0]
+            delta = choice.delta.content if choice.delta is not None else None
+            if delta:
+                parts.append(delta)
+                received_chars += len(delta)
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+
+            if time.monotonic() >= next_progress_at:
+                logger.info(
+                    f"{LANGUAGES[target_language]['native_name']} 译文接收中: "
+                    f"已收到 {received_chars} 字符（约 {estimate_tokens(''.join(parts))} token）"
+                )
+                next_progress_at = time.monotonic() + STREAM_PROGRESS_INTERVAL
+    finally:
+        # 中途出错时也要关闭响应，释放连接
+        await stream.close()
+
+    return ''.join(parts), finish_reason, usage
+
+
+def get_usage_value(usage, *path: str) -> int:
+    """Read a nested usage field from an SDK object or a Batch-output dict, defaulting to 0."""
+    value = usage
+    for name in path:
+        if value is None:
+            return 0
+        value = value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+    return value or 0
+
+
+async def create_completion(messages: list[dict], request_options: dict):
+    """Issue one raw chat completion call with the shared model settings."""
+    return await client.chat.completions.with_raw_response.create(
+        model=OPENAI_MODEL,
+        messages=messages,
+        temperature=0.3,  # 较低的温度以获得更一致的翻译
+        timeout=300.0,  # 300秒超时
+        **request_options,
+    )
+
+
+async def request_completion(
+    messages: list[dict],
     target_language: str,
-    existing_translation_content: str = '',
-    source_diff: str = '',
-) -> str:
-    """使用 OpenAI API 翻译内容（带重试机制）"""
+    estimated_tokens: int,
+    mode: str = 'full',
+    attempt: int = 0,
+    continuation: int = 0,
+) -> tuple[str, str | None]:
+    """Send one chat completion through the shared limits; return (text, finish_reason)."""
+    queued_at = time.monotonic()
+    started_at = queued_at
+    usage = None
+    finish_reason = None
+    ledger_fields = {
+        'file': current_job_file.get(),
+        'language': target_language,
+        'mode': mode,
+        'attempt': attempt,
+        'continuation': continuation,
+        'transport': 'batch' if batch_client.is_batch_enabled() else 'stream' if TRANSLATE_STREAM else 'sync',
+    }
+
+    try:
+        if batch_client.is_batch_enabled():
+            # 批量请求由服务端异步处理，不占用实时接口的限流和并发额度
+            result = await batch_client.submit_request({
+                'model': OPENAI_MODEL,
+                'messages': messages,
+                'temperature': 0.3,
+            })
+            text, finish_reason, usage = result
+        else:
+            # 所有请求先在共享限流器上排队，避免逼近服务商上限后集中触发 429
+            await rate_limiter.acquire(estimated_tokens)
+            started_at = await concurrency_controller.acquire(current_job_priority.get())
+            outcome = 'failed'
+            try:
+                request_options = {}
+                if TRANSLATE_STREAM:
+                    request_options = {'stream': True}
+                    if TRANSLATE_STREAM_USAGE and not _state['stream_usage_rejected']:
+                        request_options['stream_options'] = {'include_usage': True}
+                try:
+                    raw_response = await create_completion(messages, request_options)
+                except openai.BadRequestError as e:
+                    if 'stream_options' not in request_options:
+                        raise
+                    # 部分 OpenAI 兼容服务不接受 stream_options，去掉后重发一次；成功后本次运行不再附带
+                    del request_options['stream_options']
+                    raw_response = await create_completion(messages, request_options)
+                    _state['stream_usage_rejected'] = True
+                    logger.warning(f"服务商不接受 stream_options，已改为不请求流式 token 用量: {str(e)}")
+                rate_limiter.update_from_headers(raw_response.headers)
+                response = raw_response.parse()
+                if TRANSLATE_STREAM:
+                    text, finish_reason, usage = await read_completion_stream(response, target_language)
+                else:
+                    choice = response.choices[0]
+                    text = choice.message.content or ''
+                    finish_reason = getattr(choice, 'finish_reason', None)
+                    usage = getattr(response, 'usage', None)
+                outcome = 'success'
+            except (openai.RateLimitError, openai.InternalServerError, openai.APITimeoutError):
+                outcome = 'overloaded'
+                raise
+            finally:
+                concurrency_controller.release(started_at, estimated_tokens, outcome)
+
+            rate_limiter.record_usage(estimated_tokens, get_usage_value(usage, 'total_tokens') or None)
+    except Exception as e:
+        usage_ledger.record(
+            **ledger_fields,
+            status='error',
+            error=f"{type(e).__name__}: {str(e)}"[:500],
+            queue_seconds=round(started_at - queued_at, 3),
+            latency_seconds=round(time.monotonic() - started_at, 3),
+        )
+        raise
+
+    usage_ledger.record(
+        **ledger_fields,
+        status='ok',
+        finish_reason=finish_reason,
+        prompt_tokens=get_usage_value(usage, 'prompt_tokens'),
+        cached_tokens=get_usage_value(usage, 'prompt_tokens_details', 'cached_tokens'),
+        completion_tokens=get_usage_value(usage, 'completion_tokens'),
+        queue_seconds=round(started_at - queued_at, 3),
+        latency_seconds=round(time.monotonic() - started_at, 3),
+    )
+    return text, finish_reason
+
+
+async def request_translation(
+    messages: list[dict],
+    target_language: str,
+    parse_response,
+    expected_completion_tokens: int | None = None,
+    continuable: bool = True,
+    mode: str = 'full',
+):
+    """Send a chat completion with exponential-backoff retries and parse its text."""
     retry_count = 0
     last_error = None
-    
+    prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+    estimated_tokens = prompt_tokens + (
+        expected_completion_tokens if expected_completion_tokens is not None else prompt_tokens
+    )
+    # 已收到的截断译文在重试时保留，网络错误只重发当前这次续写
+    partial_content = None
+    continuation_count = 0
+
     while retry_count <= MAX_RETRIES:
         try:
             if retry_count > 0:
                 logger.info(f"第 {retry_count} 次重试翻译为 {LANGUAGES[target_language]['native_name']}...")
             else:
                 logger.info(f"正在翻译为 {LANGUAGES[target_language]['native_name']}...")
-            
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a professional technical documentation translator and editor. "
-                            "Translate accurately while preserving Markdown formatting, code blocks, "
-                            "and technical terms. Produce natural, idiomatic target-language prose, "
-                            "and never leave newly added Chinese text untranslated in headings, "
-                            "tables, link text, or admonitions unless it is a proper noun, code, "
-                            "URL, path, or an explicitly preserved product label."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            get_incremental_translation_prompt(
-                                target_language,
-                                content,
-                                existing_translation_content,
-                                source_diff,
-                            )
-                            if existing_translation_content and source_diff
-                            else get_translation_prompt(target_language, content)
-                        )
-                    }
-                ],
-                temperature=0.3,  # 较低的温度以获得更一致的翻译
-                timeout=300.0,  # 300秒超时
-            )
-            
-            translated_content = response.choices[0].message.content.strip()
-            translated_content = strip_outer_code_fence(translated_content)
-            translated_content = preserve_translated_link_targets(
-                content,
-                translated_content,
-            )
-            if not translated_content.strip():
-                raise ValueError(
-                    f"翻译结果为空 ({LANGUAGES[target_language]['native_name']})"
+
+            if partial_content is None:
+                content, finish_reason = await request_completion(
+                    messages,
+                    target_language,
+                    estimated_tokens,
+                    mode=mode,
+                    attempt=retry_count,
+                )
+            else:
+                content, finish_reason = partial_content, 'length'
+
+            while finish_reason == 'length':
+                kept_content = truncate_to_complete_blocks(content) if continuable else ''
+                if not kept_content.strip():
+                    raise ValueError(
+                        f"翻译结果超出输出长度限制且无法续写 ({LANGUAGES[target_language]['native_name']})"
+                    )
+                if continuation_count >= TRANSLATE_MAX_CONTINUATIONS:
+                    raise ValueError(
+                        f"翻译结果续写 {continuation_count} 次后仍被截断 "
+                        f"({LANGUAGES[target_language]['native_name']})"
+                    )
+
+                partial_content = content
+                logger.warning(
+                    f"译文达到输出长度上限，从最后一个完整的文档块开始第 {continuation_count + 1} 次续写 "
+                    f"({LANGUAGES[target_language]['native_name']})"
                 )
+                continuation, finish_reason = await request_completion(
+                    [
+                        *messages,
+                        {"role": "assistant", "content": kept_content},
+                        {"role": "user", "content": get_continuation_prompt()},
+                    ],
+                    target_language,
+                    estimated_tokens,
+                    mode=mode,
+                    attempt=retry_count,
+                    continuation=continuation_count + 1,
+                )
+                content = kept_content + continuation
+                partial_content = None
+                continuation_count += 1
+
+            result = parse_response(content)
             logger.info(f"翻译完成 ({LANGUAGES[target_language]['native_name']})")
-            
-            return translated_content
+
+            return result
         
         except Exception as e:
             last_error = e
             retry_count += 1
+            if not isinstance(e, openai.APIError):
+                # 译文本身有问题时丢弃已续写的部分，从头重新翻译
+                partial_content = None
+                continuation_count = 0
+            rate_limit_pause = 0.0
+            if isinstance(e, openai.APIStatusError):
+                rate_limit_pause = rate_limiter.update_from_headers(
+                    e.response.headers,
+                    e.status_code,
+                )
             
             if retry_count <= MAX_RETRIES:
                 # 计算退避延迟时间（指数退避）
                 delay = RETRY_DELAY * (RETRY_BACKOFF ** (retry_count - 1))
+                if isinstance(e, openai.RateLimitError):
+                    # 429 通过共享限流器暂停所有请求，而不是只让当前请求单独退避
+                    if not rate_limit_pause:
+                        rate_limiter.block_for(delay)
+                    logger.warning(
+                        f"翻译被限流: {str(e)}, "
+                        f"将在限流解除后进行第 {retry_count} 次重试 "
+                        f"(最多 {MAX_RETRIES} 次)"
+                    )
+                    continue
                 logger.warning(
                     f"翻译失败: {str(e)}, "
                     f"将在 {delay:.1f} 秒后进行第 {retry_count} 次重试 "
                     f"(最多 {MAX_RETRIES} 次)"
                 )
-                time.sleep(delay)
+                await asyncio.sleep(delay)
             else:
                 logger.error(
                     f"翻译失败，已达到最大重试次数 ({MAX_RETRIES}): {str(e)}"
@@ -541,101 +1104,1090 @@ def translate_content(
                 raise last_error
 
 
-def translate_file(source_file: Path, file_index: int = 0, total_files: int = 0, manual_translations: set = None):
-    """翻译单个文件"""
-    prefix = f"[{file_index}/{total_files}] " if total_files > 0 else ""
-    logger.info(f"{prefix}处理文件: {source_file}")
-    
-    # 读取源文件
-    try:
-        with open(source_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except Exception as e:
-        logger.error(f"{prefix}读取文件失败 {source_file}: {str(e)}")
-        return False
-    
-    # 计算相对路径
-    try:
+def load_translation_commits(files_to_translate: list[Path]):
+    """Resolve the last commit of every existing translation of the given sources with one git log call."""
+    target_repo_paths = []
+    for source_file in files_to_translate:
         rel_path = source_file.relative_to(DOCS_DIR)
-    except ValueError:
-        logger.error(f"{prefix}文件不在 docs 目录中: {source_file}")
-        return False
-    
-    # 检查是否有手动翻译
-    if manual_translations is None:
-        manual_translations = set()
-    
-    translated_count = 0
-    skipped_count = 0
-    failed_count = 0
-    source_diff = get_source_diff(source_file)
-    
-    # 翻译到各个目标语言
-    for lang_code, lang_info in LANGUAGES.items():
-        try:
-            # 构建目标文件路径
+        for lang_info in LANGUAGES.values():
             target_file = DOCS_DIR / lang_info['dir'] / rel_path
-            existing_translation_content = ''
             if target_file.exists():
-                existing_translation_content = target_file.read_text(encoding='utf-8')
+                target_repo_paths.append(get_repo_relative_posix_path(target_file))
+    if not target_repo_paths:
+        return
 
-            image_url_mapping = collect_image_url_mapping(
-                content,
-                source_file=source_file,
-                target_file=target_file,
-                target_language=lang_code,
-            )
-            
-            # 检查是否有手动翻译
-            target_repo_path = get_repo_relative_posix_path(target_file)
-            if target_repo_path in manual_translations:
-                logger.info(f"{prefix}⏭️  跳过 {lang_info['native_name']}翻译（检测到手动翻译）")
-                skipped_count += 1
-                continue
-            
-            # 检查翻译是否已存在
-            if target_file.exists() and not FORCE_TRANSLATE:
-                logger.info(f"{prefix}⏭️  跳过 {lang_info['native_name']}翻译（已存在）")
-                skipped_count += 1
-                continue
-            elif target_file.exists() and FORCE_TRANSLATE:
-                logger.info(f"{prefix}🔄 强制重新翻译 {lang_info['native_name']}（文件已存在）")
-            
-            # 翻译内容
-            translated_content = translate_content(
-                content,
-                lang_code,
-                existing_translation_content=existing_translation_content,
-                source_diff=source_diff,
-            )
-            translated_content = rewrite_translated_image_paths(
-                translated_content,
-                image_url_mapping,
-            )
-            
-            # 确保目标目录存在
-            target_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 写入翻译后的文件
-            with open(target_file, 'w', encoding='utf-8') as f:
-                f.write(translated_content)
-            
-            logger.info(f"{prefix}✓ 已保存 {lang_info['native_name']}翻译")
-            translated_count += 1
-        
-        except Exception as e:
-            logger.error(f"{prefix}处理 {lang_info['native_name']}翻译失败: {str(e)}")
-            failed_count += 1
-            continue
-    
-    if translated_count > 0:
-        logger.info(f"{prefix}✅ 完成翻译 {translated_count} 个语言")
-    if failed_count > 0:
+    try:
+        git_access.load_last_commits(REPO_ROOT, 'HEAD', target_repo_paths)
+    except RuntimeError as e:
+        # 查询失败时各任务会逐个重试，仍失败则不使用翻译记忆
+        logger.warning(f"批量读取译文提交记录失败: {str(e)}")
+
+
+def get_translation_base_source(
+    source_file: Path,
+    target_file: Path,
+    existing_translation_content: str,
+) -> str | None:
+    """Return the source text as of the commit that last wrote the existing translation."""
+    target_repo_path = get_repo_relative_posix_path(target_file)
+    # 通常已由 load_translation_commits 为本次运行的全部译文一次查好，这里只读取缓存
+    try:
+        commit = git_access.load_last_commits(REPO_ROOT, 'HEAD', [target_repo_path])[target_repo_path]
+    except RuntimeError as e:
+        logger.warning(f"读取译文提交记录失败 {target_repo_path}: {str(e)}")
+        return None
+    if not commit:
+        return None
+
+    # 工作区中的译文与提交不一致时，无法确定它对应的源文版本
+    committed_translation = git_access.read_blob(REPO_ROOT, f'{commit}:{target_repo_path}')
+    if committed_translation != existing_translation_content:
+        return None
+
+    return git_access.read_blob(REPO_ROOT, f'{commit}:{get_repo_relative_posix_path(source_file)}')
+
+
+def load_translation_memory(
+    source_file: Path,
+    target_file: Path,
+    existing_translation_content: str,
+) -> tuple[str | None, dict[str, str] | None]:
+    """Return (base source, translation memory) for an existing translation, or (None, None) when unknown."""
+    base_source_content = get_translation_base_source(source_file, target_file, existing_translation_content)
+    if base_source_content is None:
+        return None, None
+    return base_source_content, markdown_blocks.build_translation_memory(
+        base_source_content,
+        existing_translation_content,
+    )
+
+
+async def retranslate_failing_sections(
+    content: str,
+    translated_content: str,
+    target_language: str,
+    is_fragment: bool = False,
+) -> tuple[str, bool]:
+    """Validate a translation section by section and retranslate the failing sections; return (content, passed)."""
+    # 译文首尾空白已被去掉，源文也去掉首尾空白，避免开头的空行单独成节
+    source_sections = split_markdown_sections(content.strip())
+    translated_sections = split_markdown_sections(translated_content.strip())
+    problems = translation_validator.validate_sections(
+        source_sections, translated_sections, target_language, TRANSLATE_VALIDATE_MAX_CJK_RATIO
+    )
+    if not problems:
+        return translated_content, True
+
+    native_name = LANGUAGES[target_language]['native_name']
+    for index, section_problems in problems.items():
+        logger.warning(f"第 {index + 1} 节译文未通过结构校验 ({native_name}): {'；'.join(section_problems)}")
+    if len(translated_sections) != len(source_sections):
+        # 章节无法一一对应时定位不到出错的章节，整篇重译一次，而不是把每一节作为单独的片段请求发送
+        logger.info(
+            f"译文章节数 {len(translated_sections)} 与原文 {len(source_sections)} 不一致，整篇重译一次 ({native_name})"
+        )
+        repaired_content = await translate_content(content, target_language, is_fragment=is_fragment, validate=False)
+    else:
+        logger.info(f"重译 {len(problems)}/{len(source_sections)} 个未通过校验的章节 ({native_name})")
+        retranslated_sections = await asyncio.gather(*(
+            translate_content(source_sections[index], target_language, is_fragment=True, validate=False)
+            for index in problems
+        ))
+        for index, retranslated_section in zip(problems, retranslated_sections):
+            source_section = source_sections[index]
+            # 沿用源文章节末尾的空白，保证章节之间的分隔不变
+            translated_sections[index] = retranslated_section.strip() + source_section[len(source_section.rstrip()):]
+        repaired_content = ''.join(translated_sections)
+
+    remaining_problems = translation_validator.validate_sections(
+        source_sections, split_markdown_sections(repaired_content), target_language, TRANSLATE_VALIDATE_MAX_CJK_RATIO
+    )
+    if remaining_problems:
+        logger.warning(
+            f"重译后仍有 {len(remaining_problems)} 个章节未通过结构校验，保留当前译文但不写入翻译缓存 ({native_name})"
+        )
+        return repaired_content, False
+    return repaired_content, True
+
+
+async def translate_content(
+    content: str,
+    target_language: str,
+    existing_translation_content: str = '',
+    source_diff: str = '',
+    is_fragment: bool = False,
+    validate: bool = True,
+) -> str:
+    """使用 OpenAI API 翻译内容（带重试机制）"""
+    is_incremental = bool(existing_translation_content and source_diff)
+
+    # 增量翻译依赖旧译文和 diff，结果无法按源文片段复用
+    cache_key = None
+    if not is_incremental and translation_cache.is_cache_enabled():
+        cache_key = get_segment_cache_key(content, target_language, is_fragment=is_fragment)
+        cached_translation = translation_cache.lookup(cache_key)
+        if cached_translation is not None:
+            logger.info(f"命中翻译缓存 ({LANGUAGES[target_language]['native_name']})")
+            return cached_translation
+
+    # 增量翻译需要对照旧译文和 diff 定位改动，不做占位符替换
+    masked_content, placeholder_mapping = (
+        placeholders.mask_content(content)
+        if TRANSLATE_MASK and not is_incremental
+        else (content, {})
+    )
+
+    def parse_response(response_text: str) -> str:
+        translated_content = strip_outer_code_fence(response_text.strip())
+        if not translated_content.strip():
+            raise ValueError(
+                f"翻译结果为空 ({LANGUAGES[target_language]['native_name']})"
+            )
+        return placeholders.restore_content(translated_content, masked_content, placeholder_mapping)
+
+    translated_content = await request_translation(
+        build_messages(
+            target_language,
+            TASK_INCREMENTAL if is_incremental else TASK_FULL,
+            get_incremental_translation_prompt(
+                target_language,
+                content,
+                existing_translation_content,
+                source_diff,
+            )
+            if is_incremental
+            else get_translation_prompt(
+                target_language,
+                masked_content,
+                is_fragment=is_fragment,
+            ),
+        ),
+        target_language,
+        parse_response,
+        expected_completion_tokens=estimate_tokens(
+            existing_translation_content if is_incremental else masked_content
+        ),
+        mode='incremental' if is_incremental else 'fragment' if is_fragment else 'full',
+    )
+
+    # validate=False 时由调用方校验结果，这里不写入缓存
+    passed = validate
+    if validate and TRANSLATE_VALIDATE:
+        translated_content, passed = await retranslate_failing_sections(
+            content, translated_content, target_language, is_fragment=is_fragment
+        )
+
+    # 未通过结构校验的译文不写入缓存，下次运行重新翻译
+    if cache_key is not None and passed:
+        translation_cache.store(cache_key, translated_content)
+
+    return translated_content
+
+
+def parse_keyed_translations(
+    response_text: str,
+    masked_sources: dict[str, str],
+    placeholder_mapping: dict[str, str],
+    target_language: str,
+) -> dict[str, str]:
+    """Parse a JSON object of translations that must carry exactly the requested keys, restoring placeholders."""
+    response_text = response_text.strip()
+    fence_match = JSON_CODE_FENCE_PATTERN.match(response_text)
+    if fence_match:
+        response_text = fence_match.group(1)
+
+    parsed = json.loads(response_text)
+    if not isinstance(parsed, dict) or set(parsed) != set(masked_sources):
+        raise ValueError("分块翻译结果的块编号与请求不一致")
+    if not all(isinstance(value, str) and value.strip() for value in parsed.values()):
+        raise ValueError(
+            f"分块翻译结果包含空内容 ({LANGUAGES[target_language]['native_name']})"
+        )
+    return {
+        segment_id: placeholders.restore_content(
+            value.strip(),
+            masked_sources[segment_id],
+            placeholder_mapping,
+        )
+        for segment_id, value in parsed.items()
+    }
+
+
+async def translate_segments(
+    segments: dict[str, str],
+    target_language: str,
+    mode: str = 'memory',
+) -> dict[str, str]:
+    """Translate keyed Markdown blocks in one request, serving cached blocks locally."""
+    translations = {}
+    cache_keys = {}
+    pending = {}
+
+    for segment_id, text in segments.items():
+        if translation_cache.is_cache_enabled():
+            cache_keys[segment_id] = get_block_cache_key(text, target_language)
+            cached_translation = translation_cache.lookup(cache_keys[segment_id])
+            if cached_translation is not None:
+                translations[segment_id] = cached_translation
+                continue
+        pending[segment_id] = text
+
+    if not pending:
+        return translations
+
+    # 所有块共享同一份占位符映射，重复出现的链接和代码使用相同的占位符
+    placeholder_mapping = {}
+    masked_pending = {
+        segment_id: (
+            placeholders.mask_content(text, placeholder_mapping)[0]
+            if TRANSLATE_MASK
+            else text
+        )
+        for segment_id, text in pending.items()
+    }
+
+    def parse_response(response_text: str) -> dict[str, str]:
+        return parse_keyed_translations(response_text, masked_pending, placeholder_mapping, target_language)
+
+    translated = await request_translation(
+        build_messages(
+            target_language,
+            TASK_SEGMENTS,
+            get_segments_translation_prompt(target_language, masked_pending),
+        ),
+        target_language,
+        parse_response,
+        expected_completion_tokens=estimate_tokens(''.join(masked_pending.values())),
+        # JSON 结果无法按文档块截断续写，超长时直接重试
+        continuable=False,
+        mode=mode,
+    )
+
+    for segment_id, value in translated.items():
+        if segment_id in cache_keys:
+            translation_cache.store(cache_keys[segment_id], value)
+        translations[segment_id] = value
+
+    return translations
+
+
+async def translate_front_matter(parsed_front_matter: front_matter.FrontMatter, target_language: str) -> str:
+    """Translate the front matter's string values as keyed JSON and rebuild the YAML locally."""
+    if not parsed_front_matter.leaves:
+        return parsed_front_matter.text
+    translations = await translate_segments(parsed_front_matter.leaves, target_language, mode='front_matter')
+    return front_matter.rebuild_front_matter(parsed_front_matter, translations)
+
+
+def match_translation_memory(
+    content: str,
+    translation_memory: dict[str, str],
+) -> tuple[list, dict[int, str], dict[str, str], int]:
+    """Look up each block in the memory; return (blocks, memorized texts, missing blocks, translatable chars)."""
+    blocks = markdown_blocks.split_blocks(content)
+    translated_texts = {}
+    pending = {}
+    translatable_chars = 0
+
+    for index, block in enumerate(blocks):
+        if not markdown_blocks.needs_translation(block):
+            continue
+
+        translatable_chars += len(block.text)
+        memorized = translation_memory.get(markdown_blocks.normalize_block_text(block.text))
+        if memorized is not None:
+            translated_texts[index] = memorized
+        else:
+            pending[f'b{index}'] = block.text
+
+    return blocks, translated_texts, pending, translatable_chars
+
+
+def has_memory_coverage(pending: dict[str, str], translatable_chars: int) -> bool:
+    pending_chars = sum(len(text) for text in pending.values())
+    return not translatable_chars or pending_chars / translatable_chars <= TRANSLATE_MEMORY_MAX_MISS_RATIO
+
+
+async def translate_with_memory(
+    content: str,
+    target_language: str,
+    translation_memory: dict[str, str],
+) -> str | None:
+    """Reuse memorized block translations and send only changed blocks to the model."""
+    blocks, translated_texts, pending, translatable_chars = match_translation_memory(content, translation_memory)
+    if not has_memory_coverage(pending, translatable_chars):
+        logger.info(
+            f"翻译记忆覆盖不足（待翻译 {sum(len(text) for text in pending.values())}/{translatable_chars} 字符），"
+            f"改为其它翻译方式"
+        )
+        return None
+
+    logger.info(
+        f"翻译记忆复用 {len(translated_texts)} 个块，需翻译 {len(pending)} 个块 "
+        f"({LANGUAGES[target_language]['native_name']})"
+    )
+    if pending:
+        translated_segments = await translate_segments(pending, target_language)
+        for segment_id, value in translated_segments.items():
+            translated_texts[int(segment_id[1:])] = value
+
+    return markdown_blocks.join_blocks([
+        block._replace(text=translated_texts.get(index, block.text))
+        for index, block in enumerate(blocks)
+    ])
+
+
+def build_hunk_segments(
+    regions: list[markdown_blocks.ChangedRegion],
+) -> tuple[dict[str, dict[str, str]], dict[str, str]]:
+    """Build the request payload for regions with source text, masking all fields with one shared mapping."""
+    placeholder_mapping = {}
+
+    def prepare(text: str) -> str:
+        text = text.strip()
+        return placeholders.mask_content(text, placeholder_mapping)[0] if TRANSLATE_MASK else text
+
+    segments = {}
+    for index, region in enumerate(regions):
+        # 整段删除的区域没有需要翻译的内容，直接在本地删去对应译文
+        if not region.source.strip():
+            continue
+        segments[f'h{index}'] = {
+            'context_before': prepare(region.context_before),
+            'previous_source': prepare(region.previous_source),
+            'previous_translation': prepare(region.previous_translation),
+            'source': prepare(region.source),
+            'context_after': prepare(region.context_after),
+        }
+
+    return segments, placeholder_mapping
+
+
+async def translate_hunks(
+    content: str,
+    target_language: str,
+    existing_translation_content: str,
+    source_diff: str,
+) -> str | None:
+    """Update only the translated blocks touched by the source diff; None when the hunks cannot be mapped."""
+    regions = markdown_blocks.find_changed_regions(
+        content,
+        existing_translation_content,
+        source_diff,
+        TRANSLATE_HUNK_CONTEXT_BLOCKS,
+    )
+    if regions is None:
+        logger.info("源文 diff 无法映射到文档块，改为整篇增量更新")
+        return None
+
+    segments, placeholder_mapping = build_hunk_segments(regions)
+    logger.info(
+        f"局部增量更新 {len(segments)} 个改动区域（{sum(len(region.source) for region in regions)}/"
+        f"{len(content)} 字符）({LANGUAGES[target_language]['native_name']})"
+    )
+
+    translated = {}
+    if segments:
+        masked_sources = {segment_id: segment['source'] for segment_id, segment in segments.items()}
+        translated = await request_translation(
+            build_messages(target_language, TASK_HUNKS, get_hunks_translation_prompt(target_language, segments)),
+            target_language,
+            lambda response_text: parse_keyed_translations(
+                response_text,
+                masked_sources,
+                placeholder_mapping,
+                target_language,
+            ),
+            expected_completion_tokens=estimate_tokens(''.join(masked_sources.values())),
+            # JSON 结果无法按文档块截断续写，超长时直接重试
+            continuable=False,
+            mode='hunk',
+        )
+
+    return markdown_blocks.apply_region_updates(
+        existing_translation_content,
+        regions,
+        [translated.get(f'h{index}', '') for index in range(len(regions))],
+    )
+
+
+def patch_mechanical_changes(
+    content: str,
+    existing_translation_content: str,
+    source_diff: str,
+) -> str | None:
+    """Apply a diff that touches only code, URLs, version numbers or whitespace to the translation without the model."""
+    regions = markdown_blocks.find_changed_regions(content, existing_translation_content, source_diff, 0)
+    if regions is None:
+        return None
+
+    updated_translations = []
+    for region in regions:
+        updated = mechanical_patch.patch_region(region.previous_source, region.previous_translation, region.source)
+        if updated is None:
+            return None
+        updated_translations.append(updated)
+
+    return markdown_blocks.apply_region_updates(existing_translation_content, regions, updated_translations)
+
+
+def is_append_only_document(rel_path: Path) -> bool:
+    return rel_path.as_posix() in TRANSLATE_APPEND_ONLY_FILES
+
+
+def find_added_version_sections(
+    content: str,
+    existing_translation_content: str,
+    source_diff: str,
+) -> tuple[str, str, str] | None:
+    """Return (added source sections, translated preamble, translated older sections) when the diff only adds versions at the top."""
+    reversed_diff = markdown_blocks.reverse_apply_diff(content, source_diff)
+    if reversed_diff is None:
+        return None
+
+    preamble, versions = split_version_sections(content)
+    previous_preamble, previous_versions = split_version_sections(reversed_diff[0])
+    translated_preamble, translated_versions = split_version_sections(existing_translation_content)
+    added_count = len(versions) - len(previous_versions)
+    # 开头说明和已有版本的源文都必须逐字未变，且已有译文的版本列表与改动前的源文一致
+    if (
+        added_count <= 0
+        or preamble != previous_preamble
+        or versions[added_count:] != previous_versions
+        or [version for version, _ in translated_versions] != [version for version, _ in previous_versions]
+    ):
+        return None
+
+    return (
+        ''.join(section for _, section in versions[:added_count]),
+        translated_preamble,
+        ''.join(section for _, section in translated_versions),
+    )
+
+
+async def translate_added_versions(
+    content: str,
+    target_language: str,
+    existing_translation_content: str,
+    source_diff: str,
+    image_url_mapping: dict | None = None,
+) -> str | None:
+    """Translate only the version sections added at the top and prepend them to the existing translation."""
+    added = find_added_version_sections(content, existing_translation_content, source_diff)
+    if added is None:
+        logger.info("源文改动不只是在顶部新增版本，改为常规增量更新")
+        return None
+    added_content, translated_preamble, translated_older = added
+
+    logger.info(
+        f"只翻译新增的版本章节（{len(added_content)}/{len(content)} 字符），已有版本的译文保持不变 "
+        f"({LANGUAGES[target_language]['native_name']})"
+    )
+    translated_added = await translate_content(added_content, target_language, is_fragment=True)
+    # 只对新增部分做后处理，已有版本的译文逐字保留
+    translated_added = finalize_translated_content(added_content, translated_added, image_url_mapping)
+    trailing_whitespace = added_content[len(added_content.rstrip()):]
+    return translated_preamble + translated_added.strip() + trailing_whitespace + translated_older
+
+
+def get_translated_block_texts(existing_translation_content: str) -> dict[str, str]:
+    """Return the previous translation's blocks keyed by the IDs used in edit lists."""
+    blocks = markdown_blocks.split_blocks(existing_translation_content)
+    return {block_id: blocks[index].text for block_id, index in markdown_blocks.get_block_ids(blocks).items()}
+
+
+async def translate_with_edits(
+    content: str,
+    target_language: str,
+    existing_translation_content: str,
+    source_diff: str,
+) -> str | None:
+    """Ask for a block edit list against the previous translation; None when the edits fail validation."""
+    # 译文中标题、代码块、表格行等块的数量应随源文改动同步增减
+    expected_structure = None
+    reversed_diff = markdown_blocks.reverse_apply_diff(content, source_diff)
+    if reversed_diff is not None:
+        expected_structure = (
+            markdown_blocks.count_structure(existing_translation_content)
+            + markdown_blocks.count_structure(content)
+            - markdown_blocks.count_structure(reversed_diff[0])
+        )
+
+    def parse_response(response_text: str) -> str | None:
+        response_text = response_text.strip()
+        fence_match = JSON_CODE_FENCE_PATTERN.match(response_text)
+        if fence_match:
+            response_text = fence_match.group(1)
+
+        try:
+            parsed = json.loads(response_text)
+            if not isinstance(parsed, dict) or not isinstance(parsed.get('edits'), list):
+                raise ValueError("缺少 edits 列表")
+            patched = markdown_blocks.apply_block_edits(existing_translation_content, parsed['edits'])
+            if expected_structure is not None and markdown_blocks.count_structure(patched) != expected_structure:
+                raise ValueError("应用编辑后的译文结构与源文改动不一致")
+        except ValueError as e:
+            logger.warning(
+                f"编辑列表未通过校验，改为输出完整译文 ({LANGUAGES[target_language]['native_name']}): {str(e)}"
+            )
+            return None
+
+        logger.info(
+            f"应用 {len(parsed['edits'])} 个块编辑 ({LANGUAGES[target_language]['native_name']})"
+        )
+        return patched
+
+    return await request_translation(
+        build_messages(
+            target_language,
+            TASK_EDITS,
+            get_edit_list_prompt(
+                target_language,
+                content,
+                get_translated_block_texts(existing_translation_content),
+                source_diff,
+            ),
+        ),
+        target_language,
+        parse_response,
+        expected_completion_tokens=estimate_tokens(source_diff),
+        # JSON 结果无法按文档块截断续写，超长时直接重试
+        continuable=False,
+        mode='patch',
+    )
+
+
+async def translate_document(
+    content: str,
+    target_language: str,
+    existing_translation_content: str = '',
+    source_diff: str = '',
+    translation_memory: dict[str, str] | None = None,
+    image_url_mapping: dict | None = None,
+    source_tokens: list | None = None,
+    append_only: bool = False,
+) -> str:
+    """Translate a whole document, splitting large full translations into concurrent chunks."""
+    is_incremental = bool(existing_translation_content and source_diff)
+    if is_incremental and TRANSLATE_MECHANICAL_PATCH:
+        translated_content = patch_mechanical_changes(content, existing_translation_content, source_diff)
+        if translated_content is not None:
+            logger.info(
+                f"源文改动只涉及代码、链接、版本号或空白，直接更新已有"
+                f"{LANGUAGES[target_language]['native_name']}译文，无需调用 API"
+            )
+            return finalize_translated_content(content, translated_content, image_url_mapping, source_tokens)
+
+    if is_incremental and append_only:
+        translated_content = await translate_added_versions(
+            content,
+            target_language,
+            existing_translation_content,
+            source_diff,
+            image_url_mapping,
+        )
+        if translated_content is not None:
+            return translated_content
+
+    # 有 diff 时先做局部增量更新：只发送改动区域并在已有译文上做最小修改，输入和输出都随改动大小变化；
+    # diff 无法映射到文档块时再用翻译记忆重译变化的块；两者都不适用时才用需要发送整篇源文的编辑列表。
+    # estimate_job_tokens 按同样的顺序估算
+    if is_incremental and TRANSLATE_HUNK_INCREMENTAL:
+        translated_content = await translate_hunks(
+            content,
+            target_language,
+            existing_translation_content,
+            source_diff,
+        )
+        if translated_content is not None:
+            return finalize_translated_content(content, translated_content, image_url_mapping, source_tokens)
+
+    if translation_memory:
+        translated_content = await translate_with_memory(content, target_language, translation_memory)
+        if translated_content is not None:
+            return finalize_translated_content(content, translated_content, image_url_mapping, source_tokens)
+
+    if is_incremental and TRANSLATE_PATCH_OUTPUT:
+        translated_content = await translate_with_edits(
+            content,
+            target_language,
+            existing_translation_content,
+            source_diff,
+        )
+        if translated_content is not None:
+            return finalize_translated_content(content, translated_content, image_url_mapping, source_tokens)
+
+    # 整篇翻译时 Front matter 的字符串值单独以键值 JSON 翻译，正文不再包含 YAML
+    parsed_front_matter = (
+        front_matter.parse_front_matter(content)
+        if not is_incremental and TRANSLATE_FRONT_MATTER
+        else None
+    )
+    body = parsed_front_matter.body if parsed_front_matter is not None else content
+    chunks = (
+        [content]
+        if is_incremental
+        else split_markdown_chunks(body, TRANSLATE_CHUNK_SIZE)
+    )
+
+    async def translate_body() -> str:
+        if not body.strip():
+            return body
+        if len(chunks) == 1:
+            return await translate_content(
+                body,
+                target_language,
+                existing_translation_content=existing_translation_content,
+                source_diff=source_diff,
+            )
+        logger.info(
+            f"文档较大（{len(content)} 字符），按标题拆分为 {len(chunks)} 个片段并发翻译为 "
+            f"{LANGUAGES[target_language]['native_name']}"
+        )
+        # 每个片段独立重试，失败时只重试出错的片段；并发度由全局请求上限控制
+        translated_chunks = await asyncio.gather(*(
+            translate_content(chunk, target_language, is_fragment=True)
+            for chunk in chunks
+        ))
+        # 沿用每个源文片段末尾的空白，片段之间的空行与原文一致，不会在每次整篇翻译时被改写
+        return ''.join(
+            translated_chunk.strip() + chunk[len(chunk.rstrip()):]
+            for chunk, translated_chunk in zip(chunks, translated_chunks)
+        )
+
+    if parsed_front_matter is None:
+        translated_content = await translate_body()
+    else:
+        translated_front_matter, translated_body = await asyncio.gather(
+            translate_front_matter(parsed_front_matter, target_language),
+            translate_body(),
+        )
+        leading_whitespace = body[:len(body) - len(body.lstrip())]
+        translated_content = translated_front_matter + leading_whitespace + translated_body.lstrip()
+
+    return finalize_translated_content(content, translated_content, image_url_mapping, source_tokens)
+
+
+def estimate_job_tokens(
+    content: str,
+    target_language: str,
+    existing_translation_content: str = '',
+    source_diff: str = '',
+    translation_memory: dict[str, str] | None = None,
+) -> tuple[int, int]:
+    """Estimate (prompt_tokens, completion_tokens) for the path translate_document will take."""
+    if existing_translation_content and source_diff and TRANSLATE_HUNK_INCREMENTAL:
+        regions = markdown_blocks.find_changed_regions(
+            content,
+            existing_translation_content,
+            source_diff,
+            TRANSLATE_HUNK_CONTEXT_BLOCKS,
+        )
+        if regions is not None:
+            segments, _ = build_hunk_segments(regions)
+            if not segments:
+                return 0, 0
+            return (
+                estimate_tokens(get_system_prompt(target_language, TASK_HUNKS))
+                + estimate_tokens(get_hunks_translation_prompt(target_language, segments)),
+                estimate_tokens(''.join(segment['source'] for segment in segments.values())),
+            )
+
+    if translation_memory:
+        _, _, pending, translatable_chars = match_translation_memory(content, translation_memory)
+        if has_memory_coverage(pending, translatable_chars):
+            if not pending:
+                return 0, 0
+            masked_pending = {
+                segment_id: placeholders.mask_content(text)[0] if TRANSLATE_MASK else text
+                for segment_id, text in pending.items()
+            }
+            return (
+                estimate_tokens(get_system_prompt(target_language, TASK_SEGMENTS))
+                + estimate_tokens(get_segments_translation_prompt(target_language, masked_pending)),
+                estimate_tokens(''.join(masked_pending.values())),
+            )
+
+    if existing_translation_content and source_diff and TRANSLATE_PATCH_OUTPUT:
+        prompt = get_edit_list_prompt(
+            target_language,
+            content,
+            get_translated_block_texts(existing_translation_content),
+            source_diff,
+        )
+        return (
+            estimate_tokens(get_system_prompt(target_language, TASK_EDITS)) + estimate_tokens(prompt),
+            estimate_tokens(source_diff),
+        )
+
+    if existing_translation_content and source_diff:
+        prompt = get_incremental_translation_prompt(
+            target_language,
+            content,
+            existing_translation_content,
+            source_diff,
+        )
+        return (
+            estimate_tokens(get_system_prompt(target_language, TASK_INCREMENTAL)) + estimate_tokens(prompt),
+            estimate_tokens(existing_translation_content),
+        )
+
+    parsed_front_matter = front_matter.parse_front_matter(content) if TRANSLATE_FRONT_MATTER else None
+    chunks = [
+        placeholders.mask_content(chunk)[0] if TRANSLATE_MASK else chunk
+        for chunk in split_markdown_chunks(
+            parsed_front_matter.body if parsed_front_matter is not None else content,
+            TRANSLATE_CHUNK_SIZE,
+        )
+    ]
+    prompt_tokens = sum(
+        estimate_tokens(get_system_prompt(target_language, TASK_FULL))
+        + estimate_tokens(get_translation_prompt(target_language, chunk, is_fragment=len(chunks) > 1))
+        for chunk in chunks
+    )
+    completion_tokens = sum(estimate_tokens(chunk) for chunk in chunks)
+    if parsed_front_matter is not None and parsed_front_matter.leaves:
+        prompt_tokens += estimate_tokens(get_system_prompt(target_language, TASK_SEGMENTS)) + estimate_tokens(
+            get_segments_translation_prompt(target_language, parsed_front_matter.leaves)
+        )
+        completion_tokens += estimate_tokens(''.join(parsed_front_matter.leaves.values()))
+    return prompt_tokens, completion_tokens
+
+
+async def plan_file_jobs(
+    source_file: Path,
+    manual_translations: set,
+) -> tuple[str, list[TranslationJob]]:
+    """Read a source file once and estimate every target-language job; return (source_diff, jobs)."""
+    try:
+        content = await asyncio.to_thread(source_file.read_text, encoding='utf-8')
+        rel_path = source_file.relative_to(DOCS_DIR)
+        source_diff = await asyncio.to_thread(get_source_diff, source_file)
+        jobs = []
+        for lang_code, lang_info in LANGUAGES.items():
+            target_file = DOCS_DIR / lang_info['dir'] / rel_path
+            if (
+                get_repo_relative_posix_path(target_file) in manual_translations
+                or (target_file.exists() and not FORCE_TRANSLATE)
+                or run_journal.get_completed(*get_journal_key(rel_path, content, lang_code)) is not None
+            ):
+                jobs.append(TranslationJob(source_file, lang_code, 'skip', 0, 0))
+                continue
+
+            existing_translation_content = ''
+            if target_file.exists():
+                existing_translation_content = await asyncio.to_thread(
+                    target_file.read_text,
+                    encoding='utf-8',
+                )
+            if (
+                existing_translation_content
+                and source_diff
+                and TRANSLATE_MECHANICAL_PATCH
+                and patch_mechanical_changes(content, existing_translation_content, source_diff) is not None
+            ):
+                jobs.append(TranslationJob(source_file, lang_code, 'mechanical', 0, 0))
+                continue
+
+            added = (
+                find_added_version_sections(content, existing_translation_content, source_diff)
+                if existing_translation_content and source_diff and is_append_only_document(rel_path)
+                else None
+            )
+            base_source_content, translation_memory = None, None
+            if existing_translation_content and TRANSLATE_MEMORY and added is None:
+                base_source_content, translation_memory = await asyncio.to_thread(
+                    load_translation_memory,
+                    source_file,
+                    target_file,
+                    existing_translation_content,
+                )
+            if added is not None:
+                # 只翻译新增的版本章节，按片段整篇翻译估算
+                prompt_tokens, completion_tokens = estimate_job_tokens(added[0], lang_code)
+            elif translation_memory is not None and base_source_content == content:
+                # 源文自上次翻译后未变化，执行时直接保留已有译文
+                prompt_tokens, completion_tokens = 0, 0
+            else:
+                prompt_tokens, completion_tokens = estimate_job_tokens(
+                    content,
+                    lang_code,
+                    existing_translation_content,
+                    source_diff,
+                    translation_memory,
+                )
+            mode = 'incremental' if existing_translation_content and source_diff else 'full'
+            jobs.append(TranslationJob(source_file, lang_code, mode, prompt_tokens, completion_tokens))
+    except Exception as e:
+        # 估算失败不影响执行，具体错误由执行阶段报告
+        logger.warning(f"估算翻译任务失败 {source_file}: {str(e)}")
+        return '', []
+
+    return source_diff, jobs
+
+
+def log_translation_plan(jobs: list[TranslationJob]):
+    """Print the planned jobs, largest first, with their token estimates."""
+    active_jobs = [job for job in jobs if job.mode != 'skip']
+    logger.info(f"📋 翻译计划（共 {len(active_jobs)} 个任务，按预计 token 数从大到小执行）:")
+    for job in active_jobs:
+        mode_label = {'incremental': '增量', 'mechanical': '直接修改'}.get(job.mode, '全量')
+        logger.info(
+            f"   {get_repo_relative_posix_path(job.source_file)} → "
+            f"{LANGUAGES[job.lang_code]['native_name']} [{mode_label}] "
+            f"输入 ~{job.prompt_tokens} / 输出 ~{job.completion_tokens} token"
+        )
+    skipped_count = len(jobs) - len(active_jobs)
+    if skipped_count:
+        logger.info(f"   另有 {skipped_count} 个任务将跳过（已存在或手动翻译）")
+    logger.info(
+        f"   预计合计: 输入 ~{sum(job.prompt_tokens for job in active_jobs)} / "
+        f"输出 ~{sum(job.completion_tokens for job in active_jobs)} token"
+    )
+
+
+async def translate_file_language(
+    source_file: Path,
+    content: str,
+    rel_path: Path,
+    lang_code: str,
+    source_diff: str,
+    manual_translations: set,
+    prefix: str = '',
+    source_tokens: list | None = None,
+) -> str:
+    """Translate one (file, language) job and return translated, skipped or failed."""
+    lang_info = LANGUAGES[lang_code]
+
+    try:
+        # 构建目标文件路径
+        target_file = DOCS_DIR / lang_info['dir'] / rel_path
+        existing_translation_content = ''
+        if target_file.exists():
+            existing_translation_content = await asyncio.to_thread(
+                target_file.read_text,
+                encoding='utf-8',
+            )
+
+        image_url_mapping = collect_image_url_mapping(
+            content,
+            source_file=source_file,
+            target_file=target_file,
+            target_language=lang_code,
+            source_tokens=source_tokens,
+        )
+        
+        # 检查是否有手动翻译
+        target_repo_path = get_repo_relative_posix_path(target_file)
+        if target_repo_path in manual_translations:
+            logger.info(f"{prefix}⏭️  跳过 {lang_info['native_name']}翻译（检测到手动翻译）")
+            return 'skipped'
+
+        # 上次运行中已完成的任务直接使用日志中的译文，工作区是全新检出时也能恢复文件
+        journal_key = get_journal_key(rel_path, content, lang_code)
+        journaled_translation = run_journal.get_completed(*journal_key)
+        if journaled_translation is not None:
+            await asyncio.to_thread(utils.write_if_changed, target_file, journaled_translation)
+            logger.info(f"{prefix}⏭️  跳过 {lang_info['native_name']}翻译（上次运行已完成）")
+            return 'skipped'
+        
+        # 检查翻译是否已存在
+        if target_file.exists() and not FORCE_TRANSLATE:
+            logger.info(f"{prefix}⏭️  跳过 {lang_info['native_name']}翻译（已存在）")
+            return 'skipped'
+        elif target_file.exists() and FORCE_TRANSLATE:
+            logger.info(f"{prefix}🔄 强制重新翻译 {lang_info['native_name']}（文件已存在）")
+        
+        translation_memory = None
+        base_source_content = None
+        if existing_translation_content and TRANSLATE_MEMORY:
+            base_source_content, translation_memory = await asyncio.to_thread(
+                load_translation_memory,
+                source_file,
+                target_file,
+                existing_translation_content,
+            )
+
+        # 翻译内容
+        if translation_memory is not None and base_source_content == content:
+            logger.info(f"{prefix}♻️ 源文自上次翻译后未变化，保留已有{lang_info['native_name']}译文")
+            translated_content = rewrite_translated_image_paths(
+                existing_translation_content,
+                image_url_mapping,
+            )
+        else:
+            # 链接目标恢复与图片路径改写在 translate_document 中基于同一次解析完成
+            translated_content = await translate_document(
+                content,
+                lang_code,
+                existing_translation_content=existing_translation_content,
+                source_diff=source_diff,
+                translation_memory=translation_memory,
+                image_url_mapping=image_url_mapping,
+                source_tokens=source_tokens,
+                append_only=is_append_only_document(rel_path),
+            )
+        
+        # 译文与已有文件相同时不重写，避免触发无意义的文档重建；写入经临时文件原子替换
+        changed = await asyncio.to_thread(utils.write_if_changed, target_file, translated_content)
+        await asyncio.to_thread(run_journal.record_completed, *journal_key, translated_content)
+
+        missing_terms = glossary.find_missing_terms(content, translated_content, lang_code)
+        if missing_terms:
+            logger.warning(
+                f"{prefix}{lang_info['native_name']}译文未使用术语表译法: "
+                + '、'.join(f"{entry.zh} → {entry.translations[lang_code]}" for entry in missing_terms)
+            )
+
+        if changed:
+            logger.info(f"{prefix}✓ 已保存 {lang_info['native_name']}翻译")
+        else:
+            logger.info(f"{prefix}✓ {lang_info['native_name']}译文与已有文件相同，未重写")
+        return 'translated'
+    
+    except Exception as e:
+        logger.error(f"{prefix}处理 {lang_info['native_name']}翻译失败: {str(e)}")
+        return 'failed'
+
+
+async def translate_file(
+    source_file: Path,
+    file_index: int = 0,
+    total_files: int = 0,
+    manual_translations: set = None,
+    source_diff: str | None = None,
+    job_priorities: dict[str, int] | None = None,
+):
+    """翻译单个文件，各目标语言并发执行"""
+    prefix = f"[{file_index}/{total_files}] " if total_files > 0 else ""
+    logger.info(f"{prefix}处理文件: {source_file}")
+    
+    # 读取源文件
+    try:
+        content = await asyncio.to_thread(source_file.read_text, encoding='utf-8')
+    except Exception as e:
+        logger.error(f"{prefix}读取文件失败 {source_file}: {str(e)}")
+        return False
+    
+    # 计算相对路径
+    try:
+        rel_path = source_file.relative_to(DOCS_DIR)
+    except ValueError:
+        logger.error(f"{prefix}文件不在 docs 目录中: {source_file}")
+        return False
+    
+    # 检查是否有手动翻译
+    if manual_translations is None:
+        manual_translations = set()
+    
+    if source_diff is None:
+        source_diff = await asyncio.to_thread(get_source_diff, source_file)
+    if job_priorities is None:
+        job_priorities = {}
+
+    # 批量模式或长时间运行期间可能有新增或删除的本地化图片；只 stat 已扫描的目录，有变化时才重建索引
+    if image_index.refresh():
+        logger.info(f"{prefix}本地化图片目录有变化，已重建图片索引")
+    # 源文只解析一次，各语言的图片映射与链接恢复共用这份结果
+    source_tokens = markdown_tokens.tokenize(content)
+
+    async def run_language(lang_code: str) -> str:
+        # gather 为每个语言创建独立任务，这里设置的优先级只作用于该任务发出的请求
+        current_job_priority.set(job_priorities.get(lang_code, 0))
+        current_job_file.set(rel_path.as_posix())
+        return await translate_file_language(
+            source_file,
+            content,
+            rel_path,
+            lang_code,
+            source_diff,
+            manual_translations,
+            prefix,
+            source_tokens,
+        )
+
+    # 翻译到各个目标语言
+    statuses = await asyncio.gather(*(
+        run_language(lang_code)
+        for lang_code in LANGUAGES
+    ))
+    translated_count = statuses.count('translated')
+    skipped_count = statuses.count('skipped')
+    failed_count = statuses.count('failed')
+    
+    if translated_count > 0:
+        logger.info(f"{prefix}✅ 完成翻译 {translated_count} 个语言")
+    if failed_count > 0:
         logger.error(f"{prefix}❌ {failed_count} 个语言翻译失败")
     
     return failed_count == 0 and (translated_count > 0 or skipped_count > 0)
 
 
+async def translate_files(files_to_translate: list[Path], manual_translations: set) -> tuple[int, int]:
+    """Translate all files concurrently and return (success_count, fail_count)."""
+    configure_concurrency()
+    total_files = len(files_to_translate)
+    if TRANSLATE_MEMORY:
+        # 翻译记忆需要每篇已有译文最近一次提交时的源文，一次 git log 查出全部译文的提交
+        await asyncio.to_thread(load_translation_commits, files_to_translate)
+
+    # 先估算每个 (文件, 语言) 任务的 token 数，再按从大到小的顺序调度，避免大文件拖长运行尾部
+    file_plans = await asyncio.gather(*(
+        plan_file_jobs(file_path, manual_translations)
+        for file_path in files_to_translate
+    ))
+    jobs = sorted(
+        (job for _, file_jobs in file_plans for job in file_jobs),
+        key=lambda job: job.prompt_tokens + job.completion_tokens,
+        reverse=True,
+    )
+    log_translation_plan(jobs)
+    logger.info("-" * 60)
+
+    def get_file_priorities(file_jobs: list[TranslationJob]) -> dict[str, int]:
+        return {job.lang_code: job.prompt_tokens + job.completion_tokens for job in file_jobs}
+
+    scheduled_files = sorted(
+        zip(range(1, total_files + 1), files_to_translate, file_plans),
+        key=lambda item: max(get_file_priorities(item[2][1]).values(), default=0),
+        reverse=True,
+    )
+
+    async def run_file(idx: int, file_path: Path, file_plan: tuple[str, list[TranslationJob]]) -> bool:
+        source_diff, file_jobs = file_plan
+        try:
+            result = await translate_file(
+                file_path,
+                idx,
+                total_files,
+                manual_translations,
+                source_diff=source_diff if file_jobs else None,
+                job_priorities=get_file_priorities(file_jobs),
+            )
+        except Exception as e:
+            logger.error(f"❌ 文件翻译异常 {file_path}: {str(e)}")
+            result = False
+        logger.info("-" * 60)
+        return result
+
+    # 批量模式下由调度任务把排队的请求打包提交，并在结果返回后唤醒各个翻译任务
+    batch_dispatcher = (
+        asyncio.create_task(batch_client.run_dispatcher())
+        if batch_client.is_batch_enabled()
+        else None
+    )
+    try:
+        results = await asyncio.gather(*(
+            run_file(idx, file_path, file_plan)
+            for idx, file_path, file_plan in scheduled_files
+        ))
+    finally:
+        if batch_dispatcher is not None:
+            batch_dispatcher.cancel()
+    success_count = sum(1 for result in results if result)
+    return success_count, len(results) - success_count
+
+
 def detect_manual_translations():
     """检测手动翻译的文件"""
     manual_translations = set()
@@ -645,35 +2197,12 @@ def detect_manual_translations():
         return manual_translations
     
     try:
-        # 获取当前提交中修改的文件列表
-        result = subprocess.run(
-            [
-                'git',
-                'diff',
-                '--name-only',
-                '--diff-filter=AMR',
-                '--find-renames',
-                TRANSLATE_DIFF_BASE,
-                TRANSLATE_DIFF_HEAD,
-                '--',
-                DOCS_REPO_PREFIX,
-            ],
-            capture_output=True,
-            text=True,
-            cwd=REPO_ROOT
-        )
-        
-        if result.returncode != 0:
-            raise RuntimeError(
-                f"读取手动翻译 diff 失败: {result.stderr.strip() or result.returncode}"
-            )
-
-        changed_files = result.stdout.strip().split('\n')
-        for file_path in changed_files:
-            normalized_path = file_path.strip()
-            if normalized_path and is_translated_doc_repo_path(normalized_path):
-                manual_translations.add(normalized_path)
-                logger.info(f"检测到手动翻译文件: {normalized_path}")
+        # 获取当前提交中新增、修改或重命名的文件，与源文 diff 共用同一次 git 调用
+        file_diffs = git_access.load_diff(REPO_ROOT, TRANSLATE_DIFF_BASE, TRANSLATE_DIFF_HEAD, DOCS_REPO_PREFIX)
+        for file_diff in file_diffs:
+            if file_diff.status in ('A', 'M', 'R') and is_translated_doc_repo_path(file_diff.new_path):
+                manual_translations.add(file_diff.new_path)
+                logger.info(f"检测到手动翻译文件: {file_diff.new_path}")
 
     except Exception as e:
         logger.error(f"检测手动翻译时出错: {str(e)}")
@@ -684,13 +2213,35 @@ def detect_manual_translations():
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        logger.error("用法: python translate.py <file1.md> [file2.md] ...")
-        sys.exit(1)
-    
+    parser = argparse.ArgumentParser(description="使用 OpenAI API 翻译中文文档")
+    parser.add_argument("files", nargs="*", help="要翻译的中文 Markdown 文件")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="以 Batch 格式批量提交所有请求并轮询结果，适合大规模重译",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="读取上次运行的日志，跳过其中已完成的 (文件, 语言) 任务",
+    )
+    parser.add_argument(
+        "--check-images",
+        action="store_true",
+        help="扫描全部源文和译文，报告没有被任何文档引用的本地化图片；可以不指定要翻译的文件",
+    )
+    args = parser.parse_args()
+
+    if args.check_images:
+        # 需要读取整个 docs 目录，只在显式要求时执行，日常翻译只处理本次改动的文件
+        unreferenced_images = find_unreferenced_localized_images(DOCS_DIR)
+        for unreferenced in unreferenced_images:
+            logger.warning(f"本地化图片未被任何文档引用: static/image/{image_index.LOCALIZED_IMAGE_DIR}/{unreferenced}")
+        logger.info(f"🖼️ 共有 {len(unreferenced_images)} 张本地化图片未被引用")
+
     files_to_translate = []
     
-    for file_arg in sys.argv[1:]:
+    for file_arg in args.files:
         file_path = Path(file_arg).resolve()  # 转换为绝对路径
 
         if not file_path.exists():
@@ -719,62 +2270,116 @@ def main():
     
     # 检测手动翻译
     manual_translations = detect_manual_translations()
+
+    if TRANSLATE_CACHE:
+        translation_cache.open_cache(
+            TRANSLATE_CACHE_PATH,
+            max_bytes=TRANSLATE_CACHE_MAX_MB * 1024 * 1024,
+        )
     
+    # 本地化图片索引只在启动时建立一次，所有文件与语言的翻译任务共用
+    image_index.ensure_index(DOCS_DIR / 'static' / 'image')
+
     logger.info(f"共有 {len(files_to_translate)} 个文件需要翻译")
     logger.info(f"使用模型: {OPENAI_MODEL}")
     logger.info(f"API 地址: {OPENAI_BASE_URL}")
     logger.info(f"目标语言: {', '.join([lang['native_name'] for lang in LANGUAGES.values()])}")
     logger.info(f"重试配置: 最大 {MAX_RETRIES} 次, 初始延迟 {RETRY_DELAY}s, 退避倍数 {RETRY_BACKOFF}x")
-    logger.info(f"并发配置: 最大 {MAX_WORKERS} 个并发任务")
+    if TRANSLATE_ADAPTIVE_CONCURRENCY:
+        logger.info(
+            f"并发配置: 初始 {MAX_WORKERS} 个在途请求, "
+            f"根据延迟和错误率在 {TRANSLATE_MIN_WORKERS}-{TRANSLATE_MAX_WORKERS} 之间自动调整"
+        )
+    else:
+        logger.info(f"并发配置: 固定 {MAX_WORKERS} 个在途请求")
+    logger.info(
+        f"限流配置: RPM {TRANSLATE_RPM_LIMIT or '自动'}, TPM {TRANSLATE_TPM_LIMIT or '自动'}"
+    )
     logger.info(f"强制翻译: {'是' if FORCE_TRANSLATE else '否'}")
+    logger.info(f"翻译缓存: {TRANSLATE_CACHE_PATH if TRANSLATE_CACHE else '已禁用'}")
+    logger.info(f"请求账本: {TRANSLATE_LEDGER_PATH or '仅内存汇总'}")
+    logger.info(f"运行日志: {TRANSLATE_JOURNAL_PATH or '已禁用'}{'（续跑）' if args.resume else ''}")
     logger.info(f"检测到 {len(manual_translations)} 个手动翻译文件")
     logger.info("-" * 60)
     
-    # 使用线程池并发翻译
+    rate_limiter.configure(TRANSLATE_RPM_LIMIT, TRANSLATE_TPM_LIMIT)
+    run_journal.open_journal(
+        Path(TRANSLATE_JOURNAL_PATH) if TRANSLATE_JOURNAL_PATH else None,
+        resume=args.resume,
+    )
+    if args.resume:
+        logger.info(f"🔁 续跑: 运行日志中有 {run_journal.get_stats()['loaded']} 个已完成的任务")
+    usage_ledger.open_ledger(
+        Path(TRANSLATE_LEDGER_PATH) if TRANSLATE_LEDGER_PATH else None,
+        run_id=time.strftime('%Y%m%dT%H%M%S'),
+    )
+    if args.batch:
+        configure_batch_mode()
+        logger.info(
+            f"📦 批量模式: 后端 {TRANSLATE_BATCH_BACKEND}, 请求文件目录 {TRANSLATE_BATCH_DIR}, "
+            f"每 {TRANSLATE_BATCH_POLL_INTERVAL:.0f} 秒查询一次结果"
+        )
+
+    # 所有文件与语言作为异步任务调度，共享同一个在途请求上限
     total_files = len(files_to_translate)
-    success_count = 0
-    fail_count = 0
-    
-    if MAX_WORKERS == 1:
-        # 单线程模式
-        logger.info("🔄 使用单线程模式\n")
-        for idx, file_path in enumerate(files_to_translate, 1):
-            result = translate_file(file_path, idx, total_files, manual_translations)
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-            logger.info("-" * 60)
-    else:
-        # 并发模式
-        logger.info(f"🚀 使用并发模式（{MAX_WORKERS} 个工作线程）\n")
-        
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            # 提交所有任务
-            future_to_file = {
-                executor.submit(translate_file, file_path, idx, total_files, manual_translations): file_path
-                for idx, file_path in enumerate(files_to_translate, 1)
-            }
-            
-            # 等待任务完成
-            for future in as_completed(future_to_file):
-                file_path = future_to_file[future]
-                try:
-                    result = future.result()
-                    if result:
-                        success_count += 1
-                    else:
-                        fail_count += 1
-                except Exception as e:
-                    logger.error(f"❌ 文件翻译异常 {file_path}: {str(e)}")
-                    fail_count += 1
-                
-                logger.info("-" * 60)
+    logger.info(f"🚀 使用异步并发模式（初始 {MAX_WORKERS} 个在途请求）\n")
+    success_count, fail_count = asyncio.run(
+        translate_files(files_to_translate, manual_translations)
+    )
     
     # 输出统计信息
     logger.info(f"\n📊 翻译统计:")
     logger.info(f"   总文件数: {total_files}")
     logger.info(f"   成功: {success_count}")
+    ledger_summary = usage_ledger.summarize()
+    if ledger_summary['requests']:
+        logger.info(
+            f"   请求: {ledger_summary['requests']} 次（失败 {ledger_summary['errors']}, "
+            f"重试 {ledger_summary['retries']}）, 延迟 p50 {ledger_summary['p50_latency']:.1f}s / "
+            f"p95 {ledger_summary['p95_latency']:.1f}s, 输出 {ledger_summary['tokens_per_second']:.1f} token/s"
+        )
+        cached_ratio = (
+            ledger_summary['cached_tokens'] / ledger_summary['prompt_tokens']
+            if ledger_summary['prompt_tokens']
+            else 0.0
+        )
+        logger.info(
+            f"   Token: 输入 {ledger_summary['prompt_tokens']}"
+            f"（命中前缀缓存 {ledger_summary['cached_tokens']}, 未命中 "
+            f"{ledger_summary['prompt_tokens'] - ledger_summary['cached_tokens']}, "
+            f"缓存占比 {cached_ratio:.0%}）, 输出 {ledger_summary['completion_tokens']}"
+        )
+        logger.info("   最慢的文件（累计请求耗时）:")
+        for file_path, seconds in ledger_summary['slowest_files']:
+            logger.info(f"     {seconds:.1f}s  {file_path}")
+    usage_ledger.close_ledger()
+    run_journal.close_journal()
+    concurrency_stats = concurrency_controller.get_stats()
+    if concurrency_stats['increases'] or concurrency_stats['decreases']:
+        logger.info(
+            f"   并发: 最终 {concurrency_stats['limit']}, 峰值 {concurrency_stats['peak_limit']}, "
+            f"提高 {concurrency_stats['increases']} 次, 降低 {concurrency_stats['decreases']} 次"
+        )
+    if batch_client.is_batch_enabled():
+        batch_stats = batch_client.get_stats()
+        logger.info(
+            f"   批量: 提交 {batch_stats['batches']} 个批次共 {batch_stats['requests']} 个请求, "
+            f"失败 {batch_stats['failed_requests']} 个"
+        )
+        batch_client.close()
+    rate_limit_stats = rate_limiter.get_stats()
+    if rate_limit_stats['waits'] or rate_limit_stats['rate_limited']:
+        logger.info(
+            f"   限流: 等待 {rate_limit_stats['waits']} 次共 {rate_limit_stats['wait_seconds']:.1f} 秒, "
+            f"收到 429 {rate_limit_stats['rate_limited']} 次"
+        )
+    if translation_cache.is_cache_enabled():
+        cache_stats = translation_cache.get_stats()
+        logger.info(
+            f"   翻译缓存: 命中 {cache_stats['hits']}, 未命中 {cache_stats['misses']}, "
+            f"淘汰 {cache_stats['evictions']}"
+        )
+        translation_cache.close_cache()
     if fail_count > 0:
         logger.info(f"   失败: {fail_count}")
         logger.error("\n❌ 翻译任务未完成，请检查上方错误")
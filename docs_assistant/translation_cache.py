@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+翻译片段缓存
+以内容寻址的方式在本地 SQLite 中保存已翻译的文档片段，避免重复调用 API
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 淘汰后保留的容量比例，避免每次写入都触发淘汰
+EVICTION_TARGET_RATIO = 0.9
+
+_lock = threading.Lock()
+_connection = None
+_max_bytes = 0
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'stores': 0,
+    'evictions': 0,
+}
+
+
+def normalize_segment(text: str) -> str:
+    """Normalize line endings and trailing whitespace so cosmetic edits still hit the cache."""
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def make_cache_key(segment: str, *parts: str) -> str:
+    """Build a content-addressed key from the normalized segment and its translation settings."""
+    payload = json.dumps(
+        [normalize_segment(segment), *parts],
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def open_cache(path: Path, max_bytes: int):
+    """Open (or create) the on-disk cache; subsequent lookups and stores use it."""
+    global _connection, _max_bytes
+
+    close_cache()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with _lock:
+        _connection = sqlite3.connect(str(path), check_same_thread=False)
+        _connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                key TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        _connection.execute(
+            'CREATE INDEX IF NOT EXISTS segments_last_used ON segments (last_used)'
+        )
+        _connection.commit()
+        _max_bytes = max_bytes
+        for name in _stats:
+            _stats[name] = 0
+
+
+def close_cache():
+    """Close the cache connection if one is open."""
+    global _connection
+
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+
+
+def is_cache_enabled() -> bool:
+    """Return True when a cache has been opened for this process."""
+    return _connection is not None
+
+
+def lookup(key: str) -> str | None:
+    """Return the cached translation for key, counting the hit or miss."""
+    if _connection is None:
+        return None
+
+    with _lock:
+        row = _connection.execute(
+            'SELECT translation FROM segments WHERE key = ?',
+            (key,),
+        ).fetchone()
+
+        if row is None:
+            _stats['misses'] += 1
+            return None
+
+        _connection.execute(
+            'UPDATE segments SET last_used = ? WHERE key = ?',
+            (time.time(), key),
+        )
+        _connection.commit()
+        _stats['hits'] += 1
+        return row[0]
+
+
+def store(key: str, translation: str):
+    """Save a translation and evict least recently used entries beyond the size limit."""
+    if _connection is None:
+        return
+
+    size = len(translation.encode('utf-8'))
+
+    with _lock:
+        _connection.execute(
+            'INSERT OR REPLACE INTO segments (key, translation, size, last_used) VALUES (?, ?, ?, ?)',
+            (key, translation, size, time.time()),
+        )
+        _stats['stores'] += 1
+        _evict_locked()
+        _connection.commit()
+
+
+def _evict_locked():
+    """Drop least recently used entries until the cache fits its size budget."""
+    if _max_bytes <= 0:
+        return
+
+    total_size = _connection.execute('SELECT COALESCE(SUM(size), 0) FROM segments').fetchone()[0]
+    if total_size <= _max_bytes:
+        return
+
+    target_size = int(_max_bytes * EVICTION_TARGET_RATIO)
+    rows = _connection.execute(
+        'SELECT key, size FROM segments ORDER BY last_used ASC'
+    ).fetchall()
+
+    evicted_keys = []
+    for key, size in rows:
+        if total_size <= target_size:
+            break
+        evicted_keys.append((key,))
+        total_size -= size
+
+    _connection.executemany('DELETE FROM segments WHERE key = ?', evicted_keys)
+    _stats['evictions'] += len(evicted_keys)
+    logger.info("翻译缓存超出容量限制，已淘汰 %s 条最久未使用的记录", len(evicted_keys))
+
+
+def get_stats() -> dict:
+    """Return a snapshot of hit/miss/store/eviction counters for the run summary."""
+    with _lock:
+        return dict(_stats)
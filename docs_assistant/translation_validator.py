@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+译文结构校验
+逐节比较源文与译文的标题层级、代码围栏、表格形状、链接与锚点数量、Front matter 可解析性和残留中文比例，
+返回未通过校验的章节及原因，供翻译脚本只重译这些章节
+"""
+
+import re
+from collections import Counter
+from typing import NamedTuple
+
+import yaml
+
+try:
+    from docs_assistant import markdown_blocks, markdown_tokens
+except ImportError:  # 以脚本方式运行时 docs_assistant 不是包
+    import markdown_blocks
+    import markdown_tokens
+
+KANA_PATTERN = re.compile(r'[぀-ヿ]')
+# 日文中不使用的常见简体字；日文译文中汉字本身是正常的，只有含这些字且没有假名的行才算残留中文
+SIMPLIFIED_ONLY_PATTERN = re.compile(r'[这们个说时为请务设击图页应该据库问题处选择显账导开关还对过进从经给让么吗呢]')
+TABLE_CELL_SEPARATOR_PATTERN = re.compile(r'(?<!\\)\|')
+
+# 汉字本身也是正文一部分的目标语言
+KANJI_LANGUAGES = ('ja',)
+# 计数时比较的链接类 token 种类
+LINK_TOKEN_KINDS = ('link', 'image', 'href', 'src', 'anchor_id')
+
+
+class SectionProfile(NamedTuple):
+    front_matter: str  # none、ok 或 invalid
+    headings: tuple[int, ...]  # 按顺序排列的标题级别
+    fences: int  # 代码围栏行数
+    unclosed_fence: bool
+    tables: tuple[tuple[int, ...], ...]  # 每张表格各行的单元格数
+    links: tuple[tuple[str, int], ...]  # 各类链接 token 的数量
+    cjk_chars: int  # 代码和链接地址之外的汉字数；指定目标语言时只统计残留中文
+
+
+def _count_table_cells(line: str) -> int:
+    return len(TABLE_CELL_SEPARATOR_PATTERN.split(line.strip().strip('|')))
+
+
+def _count_cjk(prose: str, target_language: str | None) -> int:
+    if target_language not in KANJI_LANGUAGES:
+        return len(markdown_blocks.CJK_PATTERN.findall(prose))
+    return sum(
+        len(markdown_blocks.CJK_PATTERN.findall(line))
+        for line in prose.splitlines()
+        if SIMPLIFIED_ONLY_PATTERN.search(line) and not KANA_PATTERN.search(line)
+    )
+
+
+def profile_section(section: str, target_language: str | None = None) -> SectionProfile:
+    """Describe a section's structure in one line scan plus one tokenizer pass."""
+    front_matter = 'none'
+    body = section
+    front_matter_match = markdown_blocks.FRONT_MATTER_PATTERN.match(section)
+    if front_matter_match:
+        body = section[front_matter_match.end():]
+        try:
+            yaml.safe_load(front_matter_match.group(0).strip().strip('-'))
+            front_matter = 'ok'
+        except yaml.YAMLError:
+            front_matter = 'invalid'
+
+    headings = []
+    fences = 0
+    fence_marker = None
+    tables = []
+    previous_was_table_row = False
+    for line in body.splitlines():
+        fence_match = markdown_blocks.CODE_FENCE_LINE_PATTERN.match(line)
+        is_table_row = False
+        if fence_marker is None:
+            if fence_match:
+                fences += 1
+                fence_marker = fence_match.group(1)
+            elif heading_match := markdown_blocks.HEADING_PATTERN.match(line):
+                headings.append(len(heading_match.group(1)))
+            elif markdown_blocks.TABLE_ROW_PATTERN.match(line):
+                is_table_row = True
+                if not previous_was_table_row:
+                    tables.append([])
+                tables[-1].append(_count_table_cells(line))
+        elif (
+            fence_match
+            and fence_match.group(1)[0] == fence_marker[0]
+            and len(fence_match.group(1)) >= len(fence_marker)
+            and not line[fence_match.end():].strip()
+        ):
+            fences += 1
+            fence_marker = None
+        previous_was_table_row = is_table_row
+
+    # 代码和链接地址中的中文不需要翻译，统计前替换为空格
+    tokens = markdown_tokens.tokenize(body)
+    prose = markdown_tokens.splice(
+        body,
+        [(token.start, token.end, ' ') for token in tokens if token.kind == 'code' or token.kind in LINK_TOKEN_KINDS],
+    )
+    links = Counter(token.kind for token in tokens if token.kind in LINK_TOKEN_KINDS)
+
+    return SectionProfile(
+        front_matter=front_matter,
+        headings=tuple(headings),
+        fences=fences,
+        unclosed_fence=fence_marker is not None,
+        tables=tuple(tuple(table) for table in tables),
+        links=tuple(sorted(links.items())),
+        cjk_chars=_count_cjk(prose, target_language),
+    )
+
+
+def find_section_problems(
+    source_section: str,
+    translated_section: str,
+    target_language: str,
+    max_cjk_ratio: float,
+) -> list[str]:
+    """Return the reasons a translated section fails structural validation, or an empty list."""
+    source = profile_section(source_section)
+    translated = profile_section(translated_section, target_language)
+    problems = []
+
+    if source.front_matter != translated.front_matter:
+        if translated.front_matter == 'invalid':
+            problems.append("Front matter 无法解析")
+        elif translated.front_matter == 'none':
+            problems.append("Front matter 缺失")
+        elif source.front_matter == 'none':
+            problems.append("新增了原文没有的 Front matter")
+    if source.headings != translated.headings:
+        problems.append(
+            f"标题层级不一致（源文 {list(source.headings)}，译文 {list(translated.headings)}）"
+        )
+    if translated.unclosed_fence and not source.unclosed_fence:
+        problems.append("代码围栏未闭合")
+    elif source.fences != translated.fences:
+        problems.append(f"代码围栏数量不一致（源文 {source.fences}，译文 {translated.fences}）")
+    if source.tables != translated.tables:
+        problems.append("表格行数或列数不一致")
+    if source.links != translated.links:
+        problems.append(
+            f"链接与锚点数量不一致（源文 {dict(source.links)}，译文 {dict(translated.links)}）"
+        )
+    if source.cjk_chars and translated.cjk_chars / source.cjk_chars > max_cjk_ratio:
+        problems.append(f"残留中文 {translated.cjk_chars} 字，占原文汉字的 {translated.cjk_chars / source.cjk_chars:.0%}")
+
+    return problems
+
+
+def validate_sections(
+    source_sections: list[str],
+    translated_sections: list[str],
+    target_language: str,
+    max_cjk_ratio: float,
+) -> dict[int, list[str]]:
+    """Map the index of every failing source section to its problems; unpaired sections all fail."""
+    if len(source_sections) != len(translated_sections):
+        reason = f"章节数量不一致（源文 {len(source_sections)}，译文 {len(translated_sections)}）"
+        return {index: [reason] for index in range(len(source_sections))}
+
+    problems = {}
+    for index, (source_section, translated_section) in enumerate(zip(source_sections, translated_sections)):
+        section_problems = find_section_problems(source_section, translated_section, target_language, max_cjk_ratio)
+        if section_problems:
+            problems[index] = section_problems
+    return problems
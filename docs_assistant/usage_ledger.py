@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+翻译请求账本
+为每次 API 调用写入一条 JSONL 记录（文件、语言、模式、token 用量、延迟、重试次数等），
+并在运行结束时汇总延迟分位数、吞吐量和最慢的文件
+"""
+
+import json
+import logging
+import math
+import time
+from collections import defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 汇总中列出的最慢文件数量
+SLOWEST_FILES_LIMIT = 5
+
+_state = {
+    'file': None,
+    'run_id': None,
+}
+_records: list[dict] = []
+
+
+def open_ledger(path: Path | None, run_id: str):
+    """Start a run; path is rewritten to hold only this run's records, which are always kept for the summary."""
+    close_ledger()
+    _records.clear()
+    _state['run_id'] = run_id
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 每次运行重写账本，避免文件被保存后在下次运行中继续追加、无限增长
+        _state['file'] = path.open('w', encoding='utf-8')
+
+
+def close_ledger():
+    """Close the ledger file if one is open."""
+    if _state['file'] is not None:
+        _state['file'].close()
+        _state['file'] = None
+
+
+def record(**fields):
+    """Append one API-call record to the ledger."""
+    entry = {
+        'run_id': _state['run_id'],
+        'timestamp': round(time.time(), 3),
+        **fields,
+    }
+    _records.append(entry)
+    if _state['file'] is not None:
+        _state['file'].write(json.dumps(entry, ensure_ascii=False) + '\n')
+        _state['file'].flush()
+
+
+def get_records() -> list[dict]:
+    """Return the records collected during this run."""
+    return list(_records)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of values (fraction between 0 and 1)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(records: list[dict] | None = None) -> dict:
+    """Aggregate latency percentiles, token throughput and the slowest files."""
+    records = _records if records is None else records
+    latencies = [entry['latency_seconds'] for entry in records]
+    completion_tokens = sum(entry.get('completion_tokens', 0) for entry in records)
+
+    # 吞吐量按第一条请求开始到最后一条请求结束的墙钟时间计算，反映并发后的实际速度
+    wall_seconds = 0.0
+    if records:
+        started = min(entry['timestamp'] - entry['latency_seconds'] for entry in records)
+        finished = max(entry['timestamp'] for entry in records)
+        wall_seconds = max(finished - started, 0.0)
+
+    file_latencies = defaultdict(float)
+    for entry in records:
+        file_latencies[entry.get('file') or '-'] += entry['latency_seconds']
+    slowest_files = sorted(file_latencies.items(), key=lambda item: item[1], reverse=True)
+
+    return {
+        'requests': len(records),
+        'errors': sum(1 for entry in records if entry.get('status') != 'ok'),
+        'retries': sum(1 for entry in records if entry.get('attempt', 0) > 0),
+        'p50_latency': percentile(latencies, 0.5),
+        'p95_latency': percentile(latencies, 0.95),
+        'prompt_tokens': sum(entry.get('prompt_tokens', 0) for entry in records),
+        'cached_tokens': sum(entry.get('cached_tokens', 0) for entry in records),
+        'completion_tokens': completion_tokens,
+        'tokens_per_second': completion_tokens / wall_seconds if wall_seconds > 0 else 0.0,
+        'slowest_files': slowest_files[:SLOWEST_FILES_LIMIT],
+    }
@@ -1,11 +1,21 @@
 import os
+import re
+import hashlib
 import logging
+import tempfile
 
 # 环境变量配置
 DOCS_DIR = os.environ.get('DOCS_DIR', '/app/docs')
 
 logger = logging.getLogger('docs-utils')
 
+# 比较新旧内容时忽略的易变行：只有“数据更新于”时间戳变化时不重写文件，避免触发下游重新构建和部署
+VOLATILE_LINE_PATTERNS = (
+    re.compile(r'数据更新于|Data updated at'),
+)
+# 新建文件时使用的权限（临时文件默认只有属主可读写）
+DEFAULT_FILE_MODE = 0o644
+
 def format_file_size(bytes):
     """格式化文件大小"""
     if bytes < 1024:
@@ -17,18 +27,61 @@ def format_file_size(bytes):
     else:
         return f"{bytes/(1024*1024*1024):.2f} GB"
 
-def update_markdown_file(file_path, content):
-    """更新Markdown文件内容"""
+def hash_content(content, volatile_line_patterns=()):
+    """计算内容哈希，匹配易变行规则的行只按占位计入"""
+    digest = hashlib.sha256()
+    for line in content.replace('\r\n', '\n').split('\n'):
+        if any(pattern.search(line) for pattern in volatile_line_patterns):
+            # 保留占位，易变行的增删仍视为内容变化
+            line = '\0volatile'
+        digest.update(line.encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+def write_if_changed(file_path, content, volatile_line_patterns=()):
+    """内容有变化时经临时文件与 os.replace 原子写入，返回是否写入了文件"""
+    file_path = os.fspath(file_path)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            existing_content = f.read()
+        file_mode = os.stat(file_path).st_mode & 0o777
+    except FileNotFoundError:
+        existing_content = None
+        file_mode = DEFAULT_FILE_MODE
+
+    if existing_content is not None and (
+        hash_content(existing_content, volatile_line_patterns) == hash_content(content, volatile_line_patterns)
+    ):
+        return False
+
+    # 临时文件与目标文件位于同一目录，os.replace 才是原子操作；读取方不会看到写了一半的文件
+    directory = os.path.dirname(file_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(file_path)}.', suffix='.tmp')
     try:
-        # 确保目录存在
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # 写入文件
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             f.write(content)
-        
-        logger.info(f"已更新文件 {file_path}")
-        return True
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, file_mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return True
+
+def update_markdown_file(file_path, content, volatile_line_patterns=VOLATILE_LINE_PATTERNS):
+    """更新Markdown文件内容，返回 (是否成功, 是否写入了文件)；内容除易变行外没有变化时不重写文件"""
+    try:
+        changed = write_if_changed(file_path, content, volatile_line_patterns)
+        if changed:
+            logger.info(f"已更新文件 {file_path}")
+        else:
+            logger.info(f"文件内容未变化，跳过写入 {file_path}")
+        return True, changed
     except Exception as e:
         logger.error(f"更新Markdown文件失败: {str(e)}")
-        return False
\ No newline at end of file
+        return False, False
\ No newline at end of file
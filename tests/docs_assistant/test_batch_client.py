@@ -0,0 +1,108 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs_assistant import batch_client
+
+
+def batch_output_line(custom_id, content, finish_reason="stop"):
+    return json.dumps(
+        {
+            "custom_id": custom_id,
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "choices": [{"message": {"content": content}, "finish_reason": finish_reason}],
+                    "usage": {"total_tokens": 10},
+                },
+            },
+            "error": None,
+        }
+    )
+
+
+async def answer_local_batches(directory, translate):
+    """Act as the batch provider: answer every submitted input file once."""
+    answered = set()
+    while True:
+        for input_path in directory.glob("*/input.jsonl"):
+            if input_path.parent in answered:
+                continue
+            lines = [json.loads(line) for line in input_path.read_text(encoding="utf-8").splitlines()]
+            (input_path.parent / "output.jsonl").write_text(
+                "\n".join(
+                    batch_output_line(line["custom_id"], translate(line["body"]))
+                    for line in lines
+                ),
+                encoding="utf-8",
+            )
+            answered.add(input_path.parent)
+        await asyncio.sleep(0.01)
+
+
+class BatchClientTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.temp_dir.name)
+        self.backend_dir = self.work_dir / "local"
+
+    def tearDown(self):
+        batch_client.close()
+        self.temp_dir.cleanup()
+
+    def test_parses_results_and_per_request_errors(self):
+        error_line = json.dumps(
+            {
+                "custom_id": "req-b",
+                "response": {"status_code": 400, "body": {"error": {"message": "bad"}}},
+                "error": None,
+            }
+        )
+
+        results = batch_client.parse_batch_output(
+            batch_output_line("req-a", "# Guide", "length") + "\n\n" + error_line
+        )
+
+        self.assertEqual(results["req-a"].text, "# Guide")
+        self.assertEqual(results["req-a"].finish_reason, "length")
+        self.assertIsInstance(results["req-b"], RuntimeError)
+
+    def test_local_backend_round_trip_deduplicates_identical_requests(self):
+        batch_client.configure(
+            batch_client.make_local_backend(self.backend_dir),
+            self.work_dir,
+            poll_interval=0.01,
+            idle_seconds=0.01,
+        )
+        body = {"model": "test", "messages": [{"role": "user", "content": "你好"}]}
+
+        async def run():
+            dispatcher = asyncio.create_task(batch_client.run_dispatcher())
+            provider = asyncio.create_task(
+                answer_local_batches(self.backend_dir, lambda body: "Hello")
+            )
+            try:
+                return await asyncio.gather(
+                    batch_client.submit_request(body),
+                    batch_client.submit_request(dict(body)),
+                )
+            finally:
+                dispatcher.cancel()
+                provider.cancel()
+
+        first, second = asyncio.run(run())
+
+        self.assertEqual(first.text, "Hello")
+        self.assertEqual(second, first)
+        input_files = list(self.backend_dir.glob("*/input.jsonl"))
+        self.assertEqual(len(input_files), 1)
+        request = json.loads(input_files[0].read_text(encoding="utf-8"))
+        self.assertEqual(request["url"], "/v1/chat/completions")
+        self.assertEqual(request["body"], body)
+        self.assertEqual(batch_client.get_stats()["requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from docs_assistant import concurrency_controller
+
+
+class ConcurrencyControllerTests(unittest.TestCase):
+    def tearDown(self):
+        concurrency_controller.configure(1)
+
+    def test_limit_grows_by_one_after_a_saturated_window_of_successes(self):
+        concurrency_controller.configure(2, maximum=3)
+
+        async def run_window():
+            started = [await concurrency_controller.acquire() for _ in range(2)]
+            for started_at in started:
+                concurrency_controller.release(started_at, 100)
+
+        asyncio.run(run_window())
+        self.assertEqual(concurrency_controller.get_limit(), 3)
+
+        asyncio.run(run_window())
+        self.assertEqual(concurrency_controller.get_limit(), 3)
+
+    def test_overload_halves_the_limit_once_per_wave(self):
+        concurrency_controller.configure(8, maximum=16)
+
+        async def overload_wave():
+            started = [await concurrency_controller.acquire() for _ in range(3)]
+            for started_at in started:
+                concurrency_controller.release(started_at, 100, 'overloaded')
+
+        asyncio.run(overload_wave())
+
+        self.assertEqual(concurrency_controller.get_limit(), 4)
+        self.assertEqual(concurrency_controller.get_stats()["decreases"], 1)
+
+    def test_latency_spike_reduces_the_limit(self):
+        concurrency_controller.configure(4, maximum=16)
+
+        with patch.object(concurrency_controller.time, "monotonic", return_value=10.0):
+            for _ in range(concurrency_controller.LATENCY_WARMUP_SAMPLES):
+                concurrency_controller.release(9.0, 1000)
+            concurrency_controller.release(5.0, 1000)
+
+        self.assertEqual(concurrency_controller.get_limit(), 2)
+
+    def test_requests_beyond_the_limit_wait_for_a_free_slot(self):
+        concurrency_controller.configure(1)
+        order = []
+
+        async def request(name):
+            started_at = await concurrency_controller.acquire()
+            order.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            order.append(f"{name} end")
+            concurrency_controller.release(started_at, 100)
+
+        async def run_both():
+            await asyncio.gather(request("a"), request("b"))
+
+        asyncio.run(run_both())
+
+        self.assertEqual(order, ["a start", "a end", "b start", "b end"])
+
+    def test_higher_priority_waiters_get_the_next_free_slot(self):
+        concurrency_controller.configure(1)
+        order = []
+
+        async def request(name, priority):
+            started_at = await concurrency_controller.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            concurrency_controller.release(started_at, 100)
+
+        async def run_all():
+            await asyncio.gather(request("first", 0), request("small", 10), request("large", 1000))
+
+        asyncio.run(run_all())
+
+        self.assertEqual(order, ["first", "large", "small"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import yaml
+
+from docs_assistant import front_matter
+
+
+class FrontMatterTests(unittest.TestCase):
+    CONTENT = (
+        "---\n"
+        "home: true\n"
+        "title: 首页\n"
+        "# 注释保持不变\n"
+        "actions:\n"
+        "  - text: \"开始使用\"\n"
+        "    link: ./get-started.html\n"
+        "features:\n"
+        "  - title: 多站点\n"
+        "    details: |\n"
+        "      第一行\n"
+        "      第二行\n"
+        "---\n"
+        "\n"
+        "## 介绍\n"
+    )
+
+    def test_only_chinese_string_values_are_collected_by_path(self):
+        parsed = front_matter.parse_front_matter(self.CONTENT)
+
+        self.assertEqual(
+            parsed.leaves,
+            {
+                "title": "首页",
+                "actions[0].text": "开始使用",
+                "features[0].title": "多站点",
+                "features[0].details": "第一行\n第二行\n",
+            },
+        )
+        self.assertEqual(parsed.body, "\n## 介绍\n")
+
+    def test_translated_values_are_written_back_with_safe_quoting(self):
+        parsed = front_matter.parse_front_matter(self.CONTENT)
+
+        rebuilt = front_matter.rebuild_front_matter(
+            parsed,
+            {
+                "title": "Home: #1",
+                "actions[0].text": 'Say "hi"',
+                "features[0].title": "[Multi-site]",
+                "features[0].details": "Line one\nLine two\n",
+            },
+        )
+
+        self.assertIn("# 注释保持不变\n", rebuilt)
+        self.assertIn("    link: ./get-started.html\n", rebuilt)
+        self.assertEqual(
+            yaml.safe_load(rebuilt.strip().strip("-")),
+            {
+                "home": True,
+                "title": "Home: #1",
+                "actions": [{"text": 'Say "hi"', "link": "./get-started.html"}],
+                "features": [{"title": "[Multi-site]", "details": "Line one\nLine two\n"}],
+            },
+        )
+
+    def test_invalid_yaml_is_left_to_the_model(self):
+        self.assertIsNone(front_matter.parse_front_matter("---\ntitle: [未闭合\n---\n正文\n"))
+        self.assertIsNone(front_matter.parse_front_matter("# 没有 Front matter\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
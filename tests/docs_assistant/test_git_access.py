@@ -0,0 +1,104 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from docs_assistant import git_access
+
+
+def git(repo_root, *args):
+    subprocess.run(["git", *args], cwd=repo_root, check=True, capture_output=True)
+
+
+class GitAccessTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_root = Path(self.temp_dir.name)
+        git(self.repo_root, "init", "-q")
+        git(self.repo_root, "config", "user.email", "docs@example.com")
+        git(self.repo_root, "config", "user.name", "docs")
+
+        docs_dir = self.repo_root / "docs"
+        docs_dir.mkdir()
+        (docs_dir / "guide.md").write_text("# 指南\n\n第一段\n", encoding="utf-8")
+        (docs_dir / "旧名称.md").write_text("一\n二\n三\n四\n五\n", encoding="utf-8")
+        (docs_dir / "removed.md").write_text("删除\n", encoding="utf-8")
+        git(self.repo_root, "add", ".")
+        git(self.repo_root, "commit", "-q", "-m", "base")
+
+        (docs_dir / "guide.md").write_text("# 指南\n\n第一段已修改\n", encoding="utf-8")
+        git(self.repo_root, "mv", "docs/旧名称.md", "docs/新 名称.md")
+        (docs_dir / "removed.md").unlink()
+        git(self.repo_root, "add", "-A")
+        git(self.repo_root, "commit", "-q", "-m", "change")
+
+    def tearDown(self):
+        git_access.close()
+        self.temp_dir.cleanup()
+
+    def test_whole_range_is_loaded_once_and_split_per_file(self):
+        with patch.object(git_access.subprocess, "run", wraps=subprocess.run) as run:
+            file_diffs = git_access.load_diff(self.repo_root, "HEAD~1", "HEAD", "docs")
+            guide = git_access.get_file_diff(self.repo_root, "HEAD~1", "HEAD", "docs", "docs/guide.md")
+            unchanged = git_access.get_file_diff(self.repo_root, "HEAD~1", "HEAD", "docs", "docs/other.md")
+
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(
+            sorted((file_diff.status, file_diff.old_path, file_diff.new_path) for file_diff in file_diffs),
+            [
+                ("D", "docs/removed.md", None),
+                ("M", "docs/guide.md", "docs/guide.md"),
+                ("R", "docs/旧名称.md", "docs/新 名称.md"),
+            ],
+        )
+        self.assertTrue(guide.patch.startswith("diff --git a/docs/guide.md b/docs/guide.md"))
+        self.assertIn("+第一段已修改", guide.patch)
+        self.assertNotIn("删除", guide.patch)
+        self.assertIsNone(unchanged)
+
+    def test_blobs_are_served_by_one_cat_file_process(self):
+        with patch.object(git_access.subprocess, "Popen", wraps=subprocess.Popen) as popen:
+            old_guide = git_access.read_blob(self.repo_root, "HEAD~1:docs/guide.md")
+            renamed = git_access.read_blob(self.repo_root, "HEAD:docs/新 名称.md")
+            missing = git_access.read_blob(self.repo_root, "HEAD:docs/removed.md")
+            missing_with_spaces = git_access.read_blob(self.repo_root, "HEAD:docs/不存在 的 文件.md")
+
+        self.assertEqual(popen.call_count, 1)
+        self.assertEqual(old_guide, "# 指南\n\n第一段\n")
+        self.assertEqual(renamed, "一\n二\n三\n四\n五\n")
+        self.assertIsNone(missing)
+        self.assertIsNone(missing_with_spaces)
+
+    def test_last_commits_of_many_paths_come_from_one_log_walk(self):
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=self.repo_root, check=True, capture_output=True, text=True
+        ).stdout.strip()
+        base = subprocess.run(
+            ["git", "rev-parse", "HEAD~1"], cwd=self.repo_root, check=True, capture_output=True, text=True
+        ).stdout.strip()
+        (self.repo_root / "docs" / "untracked.md").write_text("新文件\n", encoding="utf-8")
+        paths = ["docs/guide.md", "docs/新 名称.md", "docs/removed.md", "docs/untracked.md"]
+
+        with patch.object(git_access.subprocess, "run", wraps=subprocess.run) as run:
+            commits = git_access.load_last_commits(self.repo_root, "HEAD", paths)
+            cached = git_access.load_last_commits(self.repo_root, "HEAD", ["docs/guide.md"])
+
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(
+            commits,
+            {"docs/guide.md": head, "docs/新 名称.md": head, "docs/removed.md": head, "docs/untracked.md": None},
+        )
+        self.assertEqual(cached, {"docs/guide.md": head})
+        self.assertEqual(
+            git_access.load_last_commits(self.repo_root, "HEAD~1", ["docs/guide.md"]),
+            {"docs/guide.md": base},
+        )
+
+    def test_invalid_range_raises(self):
+        with self.assertRaisesRegex(RuntimeError, "读取 git diff 失败"):
+            git_access.load_diff(self.repo_root, "no-such-rev", "HEAD", "docs")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs_assistant import glossary
+
+
+class GlossaryTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.glossary_path = Path(self.temp_dir.name) / "glossary.json"
+        self.glossary_path.write_text(
+            json.dumps(
+                [
+                    {"zh": "站点", "en": "Site", "ja": "サイト", "note": ""},
+                    {"zh": "自建站点", "en": "Self-hosted Site", "ja": "セルフホスト型サイト", "note": ""},
+                    {"zh": "API 凭据库", "en": "API Credential Library", "note": ""},
+                ],
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        glossary.load_glossary(self.glossary_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        glossary.load_glossary()
+
+    def test_overlapping_terms_are_found_in_one_pass(self):
+        automaton = glossary.build_automaton(["he", "she", "his", "hers"])
+
+        self.assertEqual(glossary.search(automaton, "ushers"), {0, 1, 3})
+        self.assertEqual(
+            [entry.zh for entry in glossary.find_entries("打开自建站点与API凭据库")],
+            ["站点", "自建站点", "API 凭据库"],
+        )
+
+    def test_missing_target_terms_are_reported_per_language(self):
+        self.assertEqual(
+            glossary.find_missing_terms("添加自建站点。", "Add a self-hosted  site.", "en"),
+            [],
+        )
+        self.assertEqual(
+            [entry.zh for entry in glossary.find_missing_terms("添加自建站点。", "サイトを追加します。", "ja")],
+            ["自建站点"],
+        )
+        # 没有日文译法的术语不做检查
+        self.assertEqual(glossary.find_missing_terms("API 凭据库", "API 資格情報", "ja"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from docs_assistant import image_index, translate
+
+
+class ImageIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.docs_dir = Path(self.temp_dir.name)
+        self.static_image_root = self.docs_dir / "static" / "image"
+        (self.static_image_root / "en" / "guides").mkdir(parents=True)
+        (self.static_image_root / "a.png").write_bytes(b"")
+        (self.static_image_root / "b.png").write_bytes(b"")
+        (self.static_image_root / "en" / "a.png").write_bytes(b"")
+        (self.static_image_root / "en" / "guides" / "unused.png").write_bytes(b"")
+        image_index.build_index(self.static_image_root)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_localized_lookup_uses_index_without_filesystem_calls(self):
+        source_file = self.docs_dir / "guide.md"
+        target_file = self.docs_dir / "en" / "guide.md"
+
+        with (
+            patch.object(translate, "DOCS_DIR", self.docs_dir),
+            patch.object(Path, "exists", side_effect=AssertionError("exists() called")),
+            patch.object(os, "stat", side_effect=AssertionError("stat() called")),
+        ):
+            mapping = translate.collect_image_url_mapping(
+                "![图](./static/image/a.png) ![图](./static/image/b.png?v=2)",
+                source_file=source_file,
+                target_file=target_file,
+                target_language="ja",
+            )
+
+        self.assertEqual(
+            mapping,
+            {
+                "./static/image/a.png": "../static/image/en/a.png",
+                "./static/image/b.png?v=2": "../static/image/b.png?v=2",
+            },
+        )
+
+    def test_refresh_rebuilds_only_after_directory_changes(self):
+        self.assertFalse(image_index.refresh())
+
+        (self.static_image_root / "en" / "guides" / "added.png").write_bytes(b"")
+        os.utime(self.static_image_root / "en" / "guides", ns=(0, 0))
+
+        self.assertTrue(image_index.refresh())
+        self.assertTrue(image_index.has_localized_variant(self.static_image_root, "guides/added.png"))
+
+        (self.static_image_root / "en" / "a.png").unlink()
+        (self.static_image_root / "en" / "setup").mkdir()
+        (self.static_image_root / "en" / "setup" / "step.png").write_bytes(b"")
+        os.utime(self.static_image_root / "en", ns=(0, 0))
+
+        self.assertTrue(image_index.refresh())
+        self.assertFalse(image_index.has_localized_variant(self.static_image_root, "a.png"))
+        self.assertTrue(image_index.has_localized_variant(self.static_image_root, "setup/step.png"))
+        self.assertFalse(image_index.refresh())
+
+    def test_each_file_picks_up_images_added_during_the_run(self):
+        source_file = self.docs_dir / "guide.md"
+        source_file.write_text("![图](./static/image/b.png)\n", encoding="utf-8")
+        (self.static_image_root / "en" / "b.png").write_bytes(b"")
+        os.utime(self.static_image_root / "en", ns=(0, 0))
+        mappings = []
+
+        async def translate_file_language(source_file, content, rel_path, lang_code, *args):
+            mappings.append(translate.collect_image_url_mapping(
+                content,
+                source_file=source_file,
+                target_file=self.docs_dir / lang_code / rel_path,
+                target_language=lang_code,
+            ))
+            return "translated"
+
+        with (
+            patch.object(translate, "DOCS_DIR", self.docs_dir),
+            patch.object(translate, "LANGUAGES", {"en": translate.LANGUAGES["en"]}),
+            patch.object(translate, "translate_file_language", new=translate_file_language),
+        ):
+            self.assertTrue(asyncio.run(translate.translate_file(source_file, source_diff="")))
+
+        self.assertEqual(mappings, [{"./static/image/b.png": "../static/image/en/b.png"}])
+
+    def test_unreferenced_localized_images_are_reported(self):
+        (self.docs_dir / "guide.md").write_text("![图](./static/image/a.png)\n", encoding="utf-8")
+        (self.docs_dir / "en").mkdir()
+        (self.docs_dir / "en" / "guide.md").write_text(
+            "![Figure](../static/image/en/a.png)\n\n`![code](../static/image/en/guides/unused.png)`\n",
+            encoding="utf-8",
+        )
+
+        self.assertEqual(
+            translate.find_unreferenced_localized_images(self.docs_dir),
+            ["guides/unused.png"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+
+from docs_assistant import markdown_blocks
+
+
+SOURCE = """---
+title: "指南"
+---
+
+# 指南
+
+介绍段落，
+第二行。
+
+- 列表一
+  续行
+- 列表二
+
+| 名称 | 说明 |
+|------|------|
+| 渠道 | 接入通道 |
+
+```bash
+# 注释
+```
+
+::: tip 提示
+内容
+:::
+"""
+
+TRANSLATION = """---
+title: "Guide"
+---
+
+# Guide
+
+An introduction,
+second line.
+
+- Item one
+  continued
+- Item two
+
+| Name | Description |
+|------|-------------|
+| Channel | Access path |
+
+```bash
+# 注释
+```
+
+::: tip Tip
+Content
+:::
+"""
+
+
+class MarkdownBlockTests(unittest.TestCase):
+    def test_blocks_round_trip_and_classify_structure(self):
+        blocks = markdown_blocks.split_blocks(SOURCE)
+
+        self.assertEqual(markdown_blocks.join_blocks(blocks), SOURCE)
+        self.assertEqual(
+            [block.kind for block in blocks],
+            [
+                "front_matter",
+                "heading",
+                "paragraph",
+                "list_item",
+                "list_item",
+                "table_row",
+                "table_row",
+                "table_row",
+                "code",
+                "container",
+                "paragraph",
+                "container",
+            ],
+        )
+        self.assertEqual(blocks[3].text, "- 列表一\n  续行")
+
+    def test_translation_memory_pairs_aligned_blocks(self):
+        memory = markdown_blocks.build_translation_memory(SOURCE, TRANSLATION)
+
+        self.assertEqual(memory["# 指南"], "# Guide")
+        self.assertEqual(memory["介绍段落，\n第二行。"], "An introduction,\nsecond line.")
+        self.assertEqual(memory["| 渠道 | 接入通道 |"], "| Channel | Access path |")
+        self.assertEqual(memory['---\ntitle: "指南"\n---'], '---\ntitle: "Guide"\n---')
+        self.assertNotIn("```bash\n# 注释\n```", memory)
+
+    def test_structural_mismatch_only_pairs_matching_runs(self):
+        translation = TRANSLATION.replace("- Item two\n", "- Item two\n- Extra item\n")
+
+        memory = markdown_blocks.build_translation_memory(SOURCE, translation)
+
+        self.assertEqual(memory["# 指南"], "# Guide")
+        self.assertEqual(memory["::: tip 提示"], "::: tip Tip")
+
+    def test_diff_hunks_map_to_whole_blocks_and_aligned_translation(self):
+        new_source = SOURCE.replace("- 列表二\n", "- 列表二\n- 列表三\n")
+        diff = (
+            "@@ -10,6 +10,7 @@\n"
+            " - 列表一\n"
+            "   续行\n"
+            " - 列表二\n"
+            "+- 列表三\n"
+            " \n"
+            " | 名称 | 说明 |\n"
+            " |------|------|\n"
+        )
+
+        self.assertEqual(markdown_blocks.reverse_apply_diff(new_source, diff)[0], SOURCE)
+        regions = markdown_blocks.find_changed_regions(new_source, TRANSLATION, diff)
+
+        self.assertEqual(len(regions), 1)
+        self.assertEqual(regions[0].previous_source, "- 列表二\n\n")
+        self.assertEqual(regions[0].previous_translation, "- Item two\n\n")
+        self.assertEqual(regions[0].source, "- 列表二\n- 列表三\n\n")
+        self.assertEqual(regions[0].context_before, "- Item one\n  continued")
+        updated = markdown_blocks.apply_region_updates(TRANSLATION, regions, ["- Item two\n- Item three"])
+        self.assertEqual(updated, TRANSLATION.replace("- Item two\n", "- Item two\n- Item three\n"))
+
+    def test_diff_that_does_not_match_the_source_cannot_be_mapped(self):
+        diff = "@@ -1,1 +1,1 @@\n-旧标题\n+不存在的行\n"
+
+        self.assertIsNone(markdown_blocks.find_changed_regions(SOURCE, TRANSLATION, diff))
+
+    def test_block_edits_replace_and_delete_by_id(self):
+        content = "# Guide\n\nFirst.\n\nSecond.\n"
+
+        patched = markdown_blocks.apply_block_edits(content, [
+            {"op": "replace", "id": "t1", "text": "First, updated.\n\nInserted."},
+            {"op": "delete", "id": "t2"},
+        ])
+
+        self.assertEqual(patched, "# Guide\n\nFirst, updated.\n\nInserted.\n")
+        with self.assertRaisesRegex(ValueError, "多个编辑操作"):
+            markdown_blocks.apply_block_edits(content, [
+                {"op": "delete", "id": "t1"},
+                {"op": "replace", "id": "t1", "text": "Again."},
+            ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from docs_assistant import markdown_tokens
+
+
+class MarkdownTokenTests(unittest.TestCase):
+    def test_tokenize_records_links_images_attributes_and_skips_code(self):
+        content = (
+            "[指南](./guide.md#安装) ![图](./a.png) [![徽章](badge.svg)](https://ci)\n\n"
+            "<a href=\"/x\" id=\"锚点\"></a><img alt=\"示意\" src=\"./b.png\">\n\n"
+            "`[不是链接](./inline.md)`\n\n"
+            "```md\n[也不是](./fence.md)\n```\n"
+        )
+
+        tokens = markdown_tokens.tokenize(content)
+
+        self.assertEqual(
+            [(token.kind, token.value) for token in tokens],
+            [
+                ('link', './guide.md#安装'),
+                ('image', './a.png'),
+                ('image', 'badge.svg'),
+                ('link', 'https://ci'),
+                ('href', '/x'),
+                ('anchor_id', '锚点'),
+                ('src', './b.png'),
+                ('code', '`[不是链接](./inline.md)`'),
+                ('code', '```md\n[也不是](./fence.md)\n```'),
+            ],
+        )
+        for token in tokens:
+            self.assertEqual(content[token.start:token.end], token.value)
+
+    def test_unclosed_fence_runs_to_end_of_document(self):
+        tokens = markdown_tokens.tokenize("正文\n\n  ~~~\n[链接](./a.md)\n")
+
+        self.assertEqual([token.kind for token in tokens], ['code'])
+
+    def test_splice_applies_replacements_in_one_pass(self):
+        content = "[a](one) [b](two)"
+        tokens = markdown_tokens.tokenize(content)
+
+        spliced = markdown_tokens.splice(
+            content,
+            [(token.start, token.end, token.value.upper()) for token in reversed(tokens)],
+        )
+
+        self.assertEqual(spliced, "[a](ONE) [b](TWO)")
+
+
+if __name__ == '__main__':
+    unittest.main()
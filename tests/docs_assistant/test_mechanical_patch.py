@@ -0,0 +1,37 @@
+import unittest
+
+from docs_assistant import mechanical_patch
+
+
+class MechanicalPatchTests(unittest.TestCase):
+    def test_prose_changes_need_the_model(self):
+        self.assertIsNone(mechanical_patch.find_literal_edits("运行 `make`。\n", "先运行 `make`。\n"))
+        self.assertIsNone(mechanical_patch.find_literal_edits("运行 `make`。\n", "运行 `make` 和 `test`。\n"))
+
+    def test_literals_and_whitespace_changes_are_patched_into_the_translation(self):
+        patched = mechanical_patch.patch_region(
+            "访问 https://old.example.com 并打开[文档](./a.md)，运行  `make`。\n",
+            "Visit https://old.example.com and open the [docs](/en/a), then run `make`.\n",
+            "访问 https://new.example.com 并打开[文档](./b.md)，运行 `make all`。\n",
+        )
+
+        # 链接目标在译文中找不到旧值，留给后处理按源文恢复
+        self.assertEqual(
+            patched,
+            "Visit https://new.example.com and open the [docs](/en/a), then run `make all`.\n",
+        )
+
+    def test_region_with_only_code_takes_the_source_verbatim(self):
+        self.assertEqual(
+            mechanical_patch.patch_region("说明\n", "Notes\n", "```bash\nnpm i\n```\n"),
+            "```bash\nnpm i\n```\n",
+        )
+
+    def test_missing_literal_in_translation_falls_back_to_the_model(self):
+        self.assertIsNone(
+            mechanical_patch.patch_region("版本 1.2.0\n", "Version 1.2\n", "版本 1.3.0\n")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import openai
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from docs_assistant import mock_openai_server, translate
+
+
+class MockOpenAIServerTests(unittest.TestCase):
+    def test_echo_responses_follow_translate_prompts(self):
+        source = "# 指南\n\n第一段\n"
+
+        full = mock_openai_server.synthesize_response(
+            translate.build_messages("en", translate.TASK_FULL, translate.get_translation_prompt("en", source))
+        )
+        segments = mock_openai_server.synthesize_response(
+            translate.build_messages(
+                "ja",
+                translate.TASK_SEGMENTS,
+                translate.get_segments_translation_prompt("ja", {"b1": "第一段"}),
+            )
+        )
+        hunks = mock_openai_server.synthesize_response(
+            translate.build_messages(
+                "en",
+                translate.TASK_HUNKS,
+                translate.get_hunks_translation_prompt(
+                    "en",
+                    {"r1": {"previous_source": "旧", "previous_translation": "Old", "source": "新"}},
+                ),
+            )
+        )
+        edits = mock_openai_server.synthesize_response(
+            translate.build_messages(
+                "en",
+                translate.TASK_EDITS,
+                translate.get_edit_list_prompt("en", source, {"t0": "# Guide", "t1": "Old"}, "@@ -1 +1 @@"),
+            )
+        )
+        continuation = mock_openai_server.synthesize_response([
+            *translate.build_messages("en", translate.TASK_FULL, translate.get_translation_prompt("en", source)),
+            {"role": "assistant", "content": "# 指南"},
+            {"role": "user", "content": translate.get_continuation_prompt()},
+        ])
+
+        self.assertEqual(full, source.rstrip("\n"))
+        self.assertEqual(json.loads(segments), {"b1": "第一段"})
+        self.assertEqual(json.loads(hunks), {"r1": "新"})
+        self.assertEqual(
+            json.loads(edits)["edits"],
+            [{"op": "replace", "id": "t0", "text": source}, {"op": "delete", "id": "t1"}],
+        )
+        self.assertEqual(continuation, "\n\n第一段")
+
+    def test_echo_responses_ignore_the_glossary_note(self):
+        source = "# 指南\n\n配置渠道和分组\n"
+
+        full = mock_openai_server.synthesize_response(
+            translate.build_messages("en", translate.TASK_FULL, translate.get_translation_prompt("en", source))
+        )
+        segments = mock_openai_server.synthesize_response(
+            translate.build_messages(
+                "en",
+                translate.TASK_SEGMENTS,
+                translate.get_segments_translation_prompt("en", {"b1": "配置渠道和分组"}),
+            )
+        )
+        hunks = mock_openai_server.synthesize_response(
+            translate.build_messages(
+                "ja",
+                translate.TASK_HUNKS,
+                translate.get_hunks_translation_prompt(
+                    "ja",
+                    {"r1": {"previous_source": "配置渠道", "previous_translation": "チャネル", "source": "配置渠道和分组"}},
+                ),
+            )
+        )
+
+        self.assertEqual(full, source.rstrip("\n"))
+        self.assertEqual(json.loads(segments), {"b1": "配置渠道和分组"})
+        self.assertEqual(json.loads(hunks), {"r1": "配置渠道和分组"})
+
+    def test_streamed_responses_are_recorded_and_faults_are_reproducible(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cassette_path = Path(temp_dir) / "cassette.jsonl"
+            config = mock_openai_server.MockConfig(
+                latency_median=0.0,
+                tokens_per_second=0.0,
+                rate_limit_ratio=0.5,
+                retry_after=0.0,
+                seed=7,
+            )
+            # 故障由种子和请求内容决定；固定请求内容，提示词措辞调整时本用例的故障序列不变
+            messages = [
+                {"role": "system", "content": "translate"},
+                {
+                    "role": "user",
+                    "content": "任务：整篇翻译为English。\n\n原文：\n<source_markdown>\n# 指南\n\n</source_markdown>\n",
+                },
+            ]
+
+            def run_requests():
+                server = mock_openai_server.start_server()
+                host, port = server.server_address[:2]
+                client = openai.OpenAI(api_key="mock", base_url=f"http://{host}:{port}/v1", max_retries=0)
+                outcomes = []
+                try:
+                    for _ in range(4):
+                        try:
+                            stream = client.chat.completions.create(
+                                model="mock-model",
+                                messages=messages,
+                                stream=True,
+                                stream_options={"include_usage": True},
+                            )
+                            outcomes.append("".join(
+                                chunk.choices[0].delta.content or ""
+                                for chunk in stream
+                                if chunk.choices
+                            ))
+                        except openai.RateLimitError:
+                            outcomes.append(429)
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                return outcomes
+
+            mock_openai_server.configure(config, cassette_path=cassette_path)
+            first_outcomes = run_requests()
+            mock_openai_server.configure(config, cassette_path=cassette_path)
+            second_outcomes = run_requests()
+
+        self.assertEqual(first_outcomes, second_outcomes)
+        self.assertIn(429, first_outcomes)
+        self.assertIn("# 指南", first_outcomes)
+        self.assertEqual(mock_openai_server.get_stats()["cassette_misses"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from docs_assistant import placeholders
+
+
+class PlaceholderTests(unittest.TestCase):
+    def test_masks_code_urls_and_html_attributes_but_not_front_matter(self):
+        source = (
+            "---\n"
+            "title: \"指南 https://example.com\"\n"
+            "---\n\n"
+            "见 https://example.com/docs。以及[同一个](https://example.com/docs)\n\n"
+            "<a id=\"锚点\"></a> <img src=\"./图.png\" alt=\"示意图\">\n\n"
+            "```js\nconst url = 'https://example.com'\n```\n"
+        )
+
+        masked, mapping = placeholders.mask_content(source)
+
+        self.assertIn('title: "指南 https://example.com"', masked)
+        self.assertIn("见 ⟦U1⟧。以及[同一个](⟦U1⟧)", masked)
+        self.assertIn('<a id="⟦A1⟧"></a> <img src="⟦A2⟧" alt="示意图">', masked)
+        self.assertTrue(masked.endswith("⟦C1⟧\n"))
+        self.assertEqual(mapping["⟦U1⟧"], "https://example.com/docs")
+        self.assertEqual(placeholders.restore_content(masked, masked, mapping), source)
+
+    def test_shared_mapping_reuses_placeholders_across_texts(self):
+        mapping = {}
+
+        first, _ = placeholders.mask_content("运行 `make`", mapping)
+        second, _ = placeholders.mask_content("再次运行 `make` 和 `make test`", mapping)
+
+        self.assertEqual(first, "运行 ⟦I1⟧")
+        self.assertEqual(second, "再次运行 ⟦I1⟧ 和 ⟦I2⟧")
+
+    def test_restore_rejects_missing_or_duplicated_placeholders(self):
+        masked, mapping = placeholders.mask_content("运行 `make` 查看 https://example.com")
+
+        with self.assertRaisesRegex(ValueError, "占位符"):
+            placeholders.restore_content("Run ⟦I1⟧.", masked, mapping)
+        with self.assertRaisesRegex(ValueError, "占位符"):
+            placeholders.restore_content("Run ⟦I1⟧ ⟦I1⟧ ⟦U1⟧", masked, mapping)
+
+    def test_content_with_placeholder_characters_is_left_untouched(self):
+        masked, mapping = placeholders.mask_content("符号 ⟦ 与 `code`")
+
+        self.assertEqual(masked, "符号 ⟦ 与 `code`")
+        self.assertEqual(mapping, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+
+from docs_assistant import rate_limiter
+
+
+class RateLimiterTests(unittest.TestCase):
+    def setUp(self):
+        rate_limiter.configure()
+
+    def tearDown(self):
+        rate_limiter.configure()
+
+    def test_parses_provider_reset_durations(self):
+        self.assertEqual(rate_limiter.parse_duration("20ms"), 0.02)
+        self.assertEqual(rate_limiter.parse_duration("1.5s"), 1.5)
+        self.assertEqual(rate_limiter.parse_duration("6m0s"), 360)
+        self.assertEqual(rate_limiter.parse_duration("3"), 3)
+        self.assertIsNone(rate_limiter.parse_duration("Wed, 21 Oct 2015 07:28:00 GMT"))
+
+    def test_token_bucket_delays_requests_beyond_tokens_per_minute(self):
+        rate_limiter.configure(tokens_per_minute=600)
+
+        async def acquire_twice():
+            first = await rate_limiter.acquire(600)
+            second = await rate_limiter.acquire(3)
+            return first, second
+
+        first_wait, second_wait = asyncio.run(acquire_twice())
+
+        self.assertEqual(first_wait, 0)
+        self.assertGreater(second_wait, 0.2)
+
+    def test_exhausted_remaining_requests_pause_every_caller(self):
+        pause = rate_limiter.update_from_headers(
+            {
+                "x-ratelimit-limit-requests": "500",
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "50ms",
+            }
+        )
+
+        waited = asyncio.run(rate_limiter.acquire(1))
+
+        self.assertEqual(pause, 0.05)
+        self.assertGreater(waited, 0.03)
+
+    def test_retry_after_counts_rate_limited_responses(self):
+        pause = rate_limiter.update_from_headers({"retry-after-ms": "30"}, status_code=429)
+
+        self.assertEqual(pause, 0.03)
+        self.assertEqual(rate_limiter.get_stats()["rate_limited"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import subprocess
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from docs_assistant import run_journal
+
+
+class RunJournalTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "journal.jsonl"
+
+    def tearDown(self):
+        run_journal.close_journal()
+        self.temp_dir.cleanup()
+
+    def test_resume_keeps_completed_jobs_and_ignores_torn_line(self):
+        run_journal.open_journal(self.path)
+        run_journal.record_completed("guide.md", "abc", "en", "v1", "# Guide\n")
+        run_journal.close_journal()
+        with self.path.open("a", encoding="utf-8") as journal_file:
+            journal_file.write('{"file": "guide.md", "source_hash": "abc", "language": "ja"')
+
+        with self.assertLogs(run_journal.logger, level="WARNING"):
+            run_journal.open_journal(self.path, resume=True)
+
+        self.assertEqual(run_journal.get_completed("guide.md", "abc", "en", "v1"), "# Guide\n")
+        self.assertIsNone(run_journal.get_completed("guide.md", "abc", "ja", "v1"))
+        self.assertIsNone(run_journal.get_completed("guide.md", "abc", "en", "v2"))
+        self.assertEqual(run_journal.get_stats()["loaded"], 1)
+
+    def test_fresh_run_starts_a_new_journal(self):
+        run_journal.open_journal(self.path)
+        run_journal.record_completed("guide.md", "abc", "en", "v1", "# Guide\n")
+
+        run_journal.open_journal(self.path)
+
+        self.assertIsNone(run_journal.get_completed("guide.md", "abc", "en", "v1"))
+        self.assertEqual(self.path.read_text(encoding="utf-8"), "")
+
+    def test_concurrent_records_from_worker_threads_stay_whole_lines(self):
+        run_journal.open_journal(self.path)
+        translation = "# Guide\n\n" + "段落内容。\n" * 2000
+
+        def record(worker):
+            for index in range(20):
+                run_journal.record_completed(f"doc-{worker}-{index}.md", "abc", "en", "v1", translation)
+
+        workers = [threading.Thread(target=record, args=(worker,)) for worker in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        run_journal.close_journal()
+
+        lines = self.path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(len(lines), 160)
+        self.assertTrue(all(json.loads(line)["translation"] == translation for line in lines))
+        run_journal.open_journal(self.path, resume=True)
+        self.assertEqual(run_journal.get_stats()["loaded"], 160)
+
+    def test_blob_hash_matches_git(self):
+        content = "# 指南\n\n内容\n"
+        self.path.write_text(content, encoding="utf-8")
+
+        result = subprocess.run(
+            ["git", "hash-object", str(self.path)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(run_journal.compute_blob_hash(content), result.stdout.strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
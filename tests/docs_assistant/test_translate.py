@@ -1,15 +1,54 @@
+import asyncio
+import contextlib
+import difflib
+import json
 import os
+import re
 import subprocess
 import sys
 import tempfile
 import unittest
 from pathlib import Path
 from types import SimpleNamespace
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
+
+import openai
 
 os.environ.setdefault("OPENAI_API_KEY", "test-key")
 
-from docs_assistant import translate
+from docs_assistant import mock_openai_server, translate
+
+
+class FakeStream:
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    async def close(self):
+        self.closed = True
+
+
+def raw_completion(content, headers=None, finish_reason="stop", usage=None, error=None):
+    middle = len(content) // 2
+    chunks = [
+        SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=part), finish_reason=reason)],
+            usage=None,
+        )
+        for part, reason in ((content[:middle], None), (content[middle:], finish_reason))
+    ]
+    if usage is not None:
+        chunks.append(SimpleNamespace(choices=[], usage=usage))
+
+    stream = FakeStream(chunks, error)
+    return SimpleNamespace(headers=headers or {}, parse=lambda: stream, stream=stream)
 
 
 class TranslateFailureReportingTests(unittest.TestCase):
@@ -41,7 +80,7 @@ class TranslateFailureReportingTests(unittest.TestCase):
             ),
             patch.object(translate, "translate_content", side_effect=translate_content),
         ):
-            succeeded = translate.translate_file(self.source_file)
+            succeeded = asyncio.run(translate.translate_file(self.source_file))
 
         self.assertFalse(succeeded)
         self.assertFalse((self.docs_dir / "en" / "guide.md").exists())
@@ -70,7 +109,7 @@ class TranslateFailureReportingTests(unittest.TestCase):
                 side_effect=RuntimeError("translation unavailable"),
             ),
         ):
-            succeeded = translate.translate_file(self.source_file)
+            succeeded = asyncio.run(translate.translate_file(self.source_file))
 
         self.assertFalse(succeeded)
         self.assertEqual(
@@ -79,46 +118,86 @@ class TranslateFailureReportingTests(unittest.TestCase):
         )
         self.assertFalse((self.docs_dir / "ja" / "guide.md").exists())
 
-    def test_blank_api_response_is_rejected(self):
-        response = SimpleNamespace(
-            choices=[SimpleNamespace(message=SimpleNamespace(content="   "))]
+    def test_resume_reruns_only_failed_jobs_and_restores_journaled_files(self):
+        journal_path = self.docs_dir / "journal.jsonl"
+        ja_translation = self.docs_dir / "ja" / "guide.md"
+
+        def translate_file_with(translate_content, resume):
+            translate.run_journal.open_journal(journal_path, resume=resume)
+            try:
+                with (
+                    patch.object(translate, "DOCS_DIR", self.docs_dir),
+                    patch.object(translate, "get_source_diff", return_value=""),
+                    patch.object(translate, "collect_image_url_mapping", return_value={}),
+                    patch.object(
+                        translate,
+                        "get_repo_relative_posix_path",
+                        side_effect=lambda path: (
+                            f"docs/docs/{path.relative_to(self.docs_dir).as_posix()}"
+                        ),
+                    ),
+                    patch.object(translate, "translate_content", side_effect=translate_content) as mocked,
+                ):
+                    succeeded = asyncio.run(translate.translate_file(self.source_file))
+            finally:
+                translate.run_journal.close_journal()
+            return succeeded, [call.args[1] for call in mocked.call_args_list]
+
+        def flaky_translate(content, language, **kwargs):
+            if language == "en":
+                raise RuntimeError("translation unavailable")
+            return "# ガイド\n"
+
+        succeeded, languages = translate_file_with(flaky_translate, resume=False)
+        self.assertFalse(succeeded)
+        # 重新检出后上次写入的译文不在工作区中
+        ja_translation.unlink()
+
+        succeeded, languages = translate_file_with(
+            lambda content, language, **kwargs: "# Guide\n",
+            resume=True,
         )
 
+        self.assertTrue(succeeded)
+        self.assertEqual(languages, ["en"])
+        self.assertEqual(ja_translation.read_text(encoding="utf-8"), "# ガイド\n")
+        self.assertEqual((self.docs_dir / "en" / "guide.md").read_text(encoding="utf-8"), "# Guide\n")
+
+    def test_blank_api_response_is_rejected(self):
+        response = raw_completion("   ")
+
         with (
             patch.object(
-                translate.client.chat.completions,
+                translate.client.chat.completions.with_raw_response,
                 "create",
-                return_value=response,
+                new=AsyncMock(return_value=response),
             ),
             patch.object(translate, "MAX_RETRIES", 0),
         ):
             with self.assertRaisesRegex(ValueError, "为空"):
-                translate.translate_content("# 指南\n", "en")
+                asyncio.run(translate.translate_content("# 指南\n", "en"))
 
     def test_outer_code_fence_with_blank_content_is_rejected(self):
-        response = SimpleNamespace(
-            choices=[
-                SimpleNamespace(
-                    message=SimpleNamespace(content="```markdown\n   \n```")
-                )
-            ]
-        )
+        response = raw_completion("```markdown\n   \n```")
 
         with (
             patch.object(
-                translate.client.chat.completions,
+                translate.client.chat.completions.with_raw_response,
                 "create",
-                return_value=response,
+                new=AsyncMock(return_value=response),
             ),
             patch.object(translate, "MAX_RETRIES", 0),
         ):
             with self.assertRaisesRegex(ValueError, "为空"):
-                translate.translate_content("# 指南\n", "en")
+                asyncio.run(translate.translate_content("# 指南\n", "en"))
 
     def test_main_exits_nonzero_when_any_file_fails(self):
         with (
             patch.object(translate, "DOCS_DIR", self.docs_dir),
             patch.object(translate, "MAX_WORKERS", 1),
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "TRANSLATE_LEDGER_PATH", ""),
+            patch.object(translate, "TRANSLATE_JOURNAL_PATH", ""),
             patch.object(translate, "detect_manual_translations", return_value=set()),
             patch.object(translate, "translate_file", return_value=False),
             patch.object(sys, "argv", ["translate.py", str(self.source_file)]),
@@ -128,6 +207,25 @@ class TranslateFailureReportingTests(unittest.TestCase):
 
         self.assertEqual(raised.exception.code, 1)
 
+    def test_unreferenced_image_report_only_runs_with_check_images(self):
+        with (
+            patch.object(translate, "DOCS_DIR", self.docs_dir),
+            patch.object(translate, "MAX_WORKERS", 1),
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "TRANSLATE_LEDGER_PATH", ""),
+            patch.object(translate, "TRANSLATE_JOURNAL_PATH", ""),
+            patch.object(translate, "detect_manual_translations", return_value=set()),
+            patch.object(translate, "translate_file", return_value=True),
+            patch.object(translate, "find_unreferenced_localized_images", return_value=[]) as find_images,
+        ):
+            with patch.object(sys, "argv", ["translate.py", str(self.source_file)]):
+                translate.main()
+            find_images.assert_not_called()
+
+            with patch.object(sys, "argv", ["translate.py", "--check-images"]):
+                translate.main()
+            find_images.assert_called_once_with(self.docs_dir)
+
     def test_manual_translation_detection_rejects_invalid_diff(self):
         failed_diff = subprocess.CompletedProcess(
             args=["git", "diff"],
@@ -136,19 +234,1091 @@ class TranslateFailureReportingTests(unittest.TestCase):
             stderr="bad revision",
         )
 
-        with patch.object(translate.subprocess, "run", return_value=failed_diff):
+        with patch.object(translate.git_access.subprocess, "run", return_value=failed_diff):
             with self.assertRaisesRegex(RuntimeError, "bad revision"):
                 translate.detect_manual_translations()
 
     def test_manual_translation_detection_can_be_disabled(self):
         with (
             patch.object(translate, "TRANSLATE_SKIP_MANUAL", True),
-            patch.object(translate.subprocess, "run") as run_diff,
+            patch.object(translate.git_access.subprocess, "run") as run_diff,
         ):
             self.assertEqual(translate.detect_manual_translations(), set())
 
         run_diff.assert_not_called()
 
 
+class PostProcessingTests(unittest.TestCase):
+    def test_link_targets_and_image_paths_are_fixed_in_one_pass(self):
+        source = (
+            "[指南](./指南.md) ![图](./img/a.png)\n\n"
+            "<a id=\"锚点\" href=\"#锚点\"></a>\n\n"
+            "```md\n[示例](./示例.md)\n```\n"
+        )
+        translated = (
+            "[Guide](./guide.md) ![Figure](./img/a.png)\n\n"
+            "<a id=\"anchor\" href=\"#anchor\"></a>\n\n"
+            "```md\n[Example](./example.md)\n```\n"
+        )
+
+        finalized = translate.finalize_translated_content(
+            source,
+            translated,
+            image_url_mapping={"./img/a.png": "../img/a.png"},
+        )
+
+        self.assertEqual(
+            finalized,
+            "[Guide](./指南.md) ![Figure](../img/a.png)\n\n"
+            "<a id=\"锚点\" href=\"#锚点\"></a>\n\n"
+            "```md\n[Example](./example.md)\n```\n",
+        )
+
+    def test_mismatched_link_count_keeps_translated_links(self):
+        with self.assertLogs(translate.logger, level="WARNING") as logs:
+            finalized = translate.finalize_translated_content(
+                "[一](./a.md) [二](./b.md)",
+                "[One and two](./ab.md)",
+            )
+
+        self.assertEqual(finalized, "[One and two](./ab.md)")
+        self.assertIn("Markdown 链接目标", logs.output[0])
+
+
+class TranslationPlanTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_root = Path(self.temp_dir.name)
+        self.docs_dir = self.repo_root / "docs"
+        (self.docs_dir / "en").mkdir(parents=True)
+        self.small_file = self.docs_dir / "small.md"
+        self.small_file.write_text("# 小\n\n短文。\n", encoding="utf-8")
+        self.large_file = self.docs_dir / "large.md"
+        self.large_file.write_text("# 大\n\n" + "很长的正文。" * 500 + "\n", encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_existing_translation_with_diff_is_planned_as_incremental(self):
+        (self.docs_dir / "en" / "small.md").write_text("# Small\n\nShort.\n", encoding="utf-8")
+        source_diff = "@@ -1 +1 @@\n-# 旧\n+# 小"
+
+        with (
+            patch.object(translate, "REPO_ROOT", self.repo_root),
+            patch.object(translate, "DOCS_DIR", self.docs_dir),
+            patch.object(translate, "FORCE_TRANSLATE", True),
+            patch.object(translate, "TRANSLATE_HUNK_INCREMENTAL", False),
+            patch.object(translate, "TRANSLATE_PATCH_OUTPUT", False),
+            patch.object(translate, "get_source_diff", return_value=source_diff),
+        ):
+            planned_diff, jobs = asyncio.run(translate.plan_file_jobs(self.small_file, set()))
+
+        self.assertEqual(planned_diff, source_diff)
+        self.assertEqual([job.mode for job in jobs], ["incremental", "full"])
+        self.assertEqual(jobs[0].completion_tokens, translate.estimate_tokens("# Small\n\nShort.\n"))
+        # 增量用户消息包含旧译文和 diff，比整篇翻译的用户消息更大；两者的系统提示词各自固定，不参与比较
+        self.assertGreater(
+            jobs[0].prompt_tokens - translate.estimate_tokens(translate.get_system_prompt("en", translate.TASK_INCREMENTAL)),
+            jobs[1].prompt_tokens - translate.estimate_tokens(translate.get_system_prompt("ja", translate.TASK_FULL)),
+        )
+
+    def test_largest_files_are_scheduled_first(self):
+        translate_file = AsyncMock(return_value=True)
+
+        with (
+            patch.object(translate, "REPO_ROOT", self.repo_root),
+            patch.object(translate, "DOCS_DIR", self.docs_dir),
+            patch.object(translate, "get_source_diff", return_value=""),
+            patch.object(translate, "translate_file", new=translate_file),
+        ):
+            asyncio.run(translate.translate_files([self.small_file, self.large_file], set()))
+
+        scheduled = [call.args[0] for call in translate_file.await_args_list]
+        self.assertEqual(scheduled, [self.large_file, self.small_file])
+        large_priorities = translate_file.await_args_list[0].kwargs["job_priorities"]
+        small_priorities = translate_file.await_args_list[1].kwargs["job_priorities"]
+        self.assertGreater(large_priorities["en"], small_priorities["en"])
+
+
+    def test_translation_commits_are_resolved_with_one_batched_query(self):
+        (self.docs_dir / "en" / "small.md").write_text("# Small\n", encoding="utf-8")
+        (self.docs_dir / "en" / "large.md").write_text("# Large\n", encoding="utf-8")
+
+        with (
+            patch.object(translate, "REPO_ROOT", self.repo_root),
+            patch.object(translate, "DOCS_DIR", self.docs_dir),
+            patch.object(translate, "get_source_diff", return_value=""),
+            patch.object(translate, "translate_file", new=AsyncMock(return_value=True)),
+            patch.object(translate.git_access, "load_last_commits", return_value={}) as load_last_commits,
+        ):
+            asyncio.run(translate.translate_files([self.small_file, self.large_file], set()))
+
+        load_last_commits.assert_called_once_with(self.repo_root, "HEAD", ["docs/en/small.md", "docs/en/large.md"])
+
+
+class ChunkedTranslationTests(unittest.TestCase):
+    def test_sections_never_split_inside_front_matter_or_code_fences(self):
+        content = (
+            "---\ntitle: \"指南\"\n---\n"
+            "# 指南\n\n```bash\n# 注释\n## 仍在代码块中\n```\n"
+            "## 安装\n\n步骤\n"
+        )
+
+        sections = translate.split_markdown_sections(content)
+
+        self.assertEqual("".join(sections), content)
+        self.assertEqual(
+            sections,
+            [
+                "---\ntitle: \"指南\"\n---\n",
+                "# 指南\n\n```bash\n# 注释\n## 仍在代码块中\n```\n",
+                "## 安装\n\n步骤\n",
+            ],
+        )
+
+    def test_large_document_is_translated_in_ordered_chunks(self):
+        # 各节之间的空行数量不同，拼接后应与原文一致
+        separators = ["\n\n", "\n\n\n", "\n", "\n"]
+        content = "".join(
+            f"## 第{index}节\n\n[链接](./page-{index}.md){separators[index]}" for index in range(4)
+        )
+        requested_chunks = []
+
+        def translate_content(chunk, language, **kwargs):
+            requested_chunks.append(chunk)
+            self.assertTrue(kwargs["is_fragment"])
+            index = chunk.split("第", 1)[1][0]
+            return f"## Section {index}\n\n[Link](./translated-{index}.md)\n"
+
+        with (
+            patch.object(translate, "TRANSLATE_CHUNK_SIZE", 40),
+            patch.object(translate, "translate_content", side_effect=translate_content),
+        ):
+            translated = asyncio.run(translate.translate_document(content, "en"))
+
+        self.assertEqual(len(requested_chunks), 4)
+        self.assertEqual(
+            translated,
+            "".join(
+                f"## Section {index}\n\n[Link](./page-{index}.md){separators[index]}" for index in range(4)
+            ),
+        )
+
+    def test_front_matter_values_are_translated_separately_from_the_body(self):
+        content = "---\nhome: true\ntitle: 首页\nheroImage: /512.png\n---\n\n## 介绍\n\n正文\n"
+        user_prompts = []
+
+        async def create(**kwargs):
+            user_prompt = kwargs["messages"][1]["content"]
+            user_prompts.append(user_prompt)
+            if '"title"' in user_prompt:
+                return raw_completion('{"title": "Home: start"}')
+            return raw_completion("## Introduction\n\nBody")
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_document(content, "en"))
+
+        self.assertEqual(len(user_prompts), 2)
+        self.assertFalse(any("heroImage" in prompt or "home: true" in prompt for prompt in user_prompts))
+        self.assertEqual(
+            translated,
+            '---\nhome: true\ntitle: "Home: start"\nheroImage: /512.png\n---\n\n## Introduction\n\nBody',
+        )
+
+    def test_chunk_requests_share_the_global_in_flight_limit(self):
+        content = "".join(f"## 第{index}节\n\n正文\n\n" for index in range(6))
+        in_flight = 0
+        peak_in_flight = 0
+
+        async def create(**kwargs):
+            nonlocal in_flight, peak_in_flight
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return raw_completion("## Section")
+
+        with (
+            patch.object(translate, "MAX_WORKERS", 2),
+            patch.object(translate, "TRANSLATE_ADAPTIVE_CONCURRENCY", False),
+            patch.object(translate, "TRANSLATE_CHUNK_SIZE", 20),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translate.configure_concurrency()
+            asyncio.run(translate.translate_document(content, "en"))
+
+        self.assertEqual(peak_in_flight, 2)
+
+    def test_incremental_translation_is_not_chunked(self):
+        with (
+            patch.object(translate, "TRANSLATE_CHUNK_SIZE", 1),
+            patch.object(translate, "TRANSLATE_PATCH_OUTPUT", False),
+            patch.object(
+                translate,
+                "translate_content",
+                return_value="# Guide\n\n## Install\n",
+            ) as translate_content,
+        ):
+            asyncio.run(translate.translate_document(
+                "# 指南\n\n## 安装\n",
+                "en",
+                existing_translation_content="# Guide\n",
+                source_diff="@@ -1 +1,3 @@",
+            ))
+
+        translate_content.assert_called_once()
+
+
+class HunkIncrementalTests(unittest.TestCase):
+    SOURCE = "# 指南\n\n介绍段落。\n\n## 安装\n\n运行新的命令。\n\n## 使用\n\n使用说明。\n"
+    TRANSLATION = "# Guide\n\nIntroduction.\n\n## Install\n\nRun the command.\n\n## Usage\n\nUsage notes.\n"
+    DIFF = (
+        "diff --git a/docs/guide.md b/docs/guide.md\n"
+        "--- a/docs/guide.md\n"
+        "+++ b/docs/guide.md\n"
+        "@@ -5,5 +5,5 @@\n"
+        " ## 安装\n"
+        " \n"
+        "-运行命令。\n"
+        "+运行新的命令。\n"
+        " \n"
+        " ## 使用\n"
+    )
+
+    def test_only_blocks_touched_by_the_diff_are_sent_and_spliced_back(self):
+        create = AsyncMock(return_value=raw_completion('{"h0": "Run the new command."}'))
+
+        with patch.object(translate.client.chat.completions.with_raw_response, "create", new=create):
+            translated = asyncio.run(translate.translate_document(
+                self.SOURCE,
+                "en",
+                existing_translation_content=self.TRANSLATION,
+                source_diff=self.DIFF,
+            ))
+
+        user_prompt = create.await_args.kwargs["messages"][1]["content"]
+        self.assertIn("运行新的命令。", user_prompt)
+        self.assertIn("Run the command.", user_prompt)
+        self.assertNotIn("介绍段落", user_prompt)
+        self.assertNotIn("Usage notes.", user_prompt)
+        self.assertEqual(translated, self.TRANSLATION.replace("Run the command.", "Run the new command."))
+
+    def test_diff_touching_only_code_and_versions_is_applied_without_the_model(self):
+        source = "# 指南\n\n需要 v1.3.0 或更高版本。\n\n```bash\nnpm run build:prod\n```\n"
+        translation = "# Guide\n\nRequires v1.2.0 or later.\n\n```bash\nnpm run build\n```\n"
+        diff = (
+            "@@ -3,5 +3,5 @@\n"
+            "-需要 v1.2.0 或更高版本。\n"
+            "+需要 v1.3.0 或更高版本。\n"
+            " \n"
+            " ```bash\n"
+            "-npm run build\n"
+            "+npm run build:prod\n"
+            " ```\n"
+        )
+        create = AsyncMock(side_effect=AssertionError("model called"))
+
+        with patch.object(translate.client.chat.completions.with_raw_response, "create", new=create):
+            translated = asyncio.run(translate.translate_document(
+                source,
+                "en",
+                existing_translation_content=translation,
+                source_diff=diff,
+            ))
+
+        self.assertEqual(translated, "# Guide\n\nRequires v1.3.0 or later.\n\n```bash\nnpm run build:prod\n```\n")
+        create.assert_not_awaited()
+
+    def test_hunk_prompt_is_planned_smaller_than_whole_document_update(self):
+        source = self.SOURCE + "".join(f"\n## 章节{index}\n\n很长的正文。\n" for index in range(50))
+        translation = self.TRANSLATION + "".join(f"\n## Section {index}\n\nLong text.\n" for index in range(50))
+
+        hunk_tokens = translate.estimate_job_tokens(source, "en", translation, self.DIFF)
+        with (
+            patch.object(translate, "TRANSLATE_HUNK_INCREMENTAL", False),
+            patch.object(translate, "TRANSLATE_PATCH_OUTPUT", False),
+        ):
+            document_tokens = translate.estimate_job_tokens(source, "en", translation, self.DIFF)
+
+        # 只比较随文档变化的用户消息，系统提示词按各自任务类型扣除
+        hunk_system_tokens = translate.estimate_tokens(translate.get_system_prompt("en", translate.TASK_HUNKS))
+        document_system_tokens = translate.estimate_tokens(
+            translate.get_system_prompt("en", translate.TASK_INCREMENTAL)
+        )
+        self.assertLess((hunk_tokens[0] - hunk_system_tokens) * 10, document_tokens[0] - document_system_tokens)
+        self.assertLess(hunk_tokens[1] * 10, document_tokens[1])
+
+
+class IncrementalPathOrderTests(unittest.TestCase):
+    PREVIOUS_SOURCE = HunkIncrementalTests.SOURCE.replace("运行新的命令。", "运行命令。")
+    UPDATED = HunkIncrementalTests.TRANSLATION.replace("Run the command.", "Run the new command.")
+    # 上下文与源文对不上，无法映射到文档块
+    UNMAPPABLE_DIFF = "@@ -1,3 +1,3 @@\n 不存在的上下文\n-旧\n+新\n"
+
+    def run_document(self, source_diff, translation_memory):
+        def respond(**kwargs):
+            system_prompt, user_prompt = (message["content"] for message in kwargs["messages"])
+            if "## 局部增量更新的要求" in system_prompt:
+                return raw_completion('{"h0": "Run the new command."}')
+            if "## 分块翻译的要求" in system_prompt:
+                block_id = re.search(r'"(b\d+)"', user_prompt).group(1)
+                return raw_completion(json.dumps({block_id: "Run the new command."}))
+            return raw_completion(
+                '{"edits": [{"op": "replace", "id": "t3", "text": "Run the new command."}]}'
+            )
+
+        create = AsyncMock(side_effect=respond)
+        arguments = (HunkIncrementalTests.SOURCE, "en", HunkIncrementalTests.TRANSLATION, source_diff)
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_document(*arguments, translation_memory=translation_memory))
+        estimated_prompt_tokens, _ = translate.estimate_job_tokens(*arguments, translation_memory)
+
+        self.assertEqual(translated, self.UPDATED)
+        self.assertEqual(create.await_count, 1)
+        messages = create.await_args.kwargs["messages"]
+        # 计划阶段估算的正是实际发出的请求
+        self.assertEqual(
+            estimated_prompt_tokens,
+            sum(translate.estimate_tokens(message["content"]) for message in messages),
+        )
+        return messages[0]["content"]
+
+    def test_each_incremental_path_is_reached_and_planned_as_it_runs(self):
+        memory = translate.markdown_blocks.build_translation_memory(
+            self.PREVIOUS_SOURCE,
+            HunkIncrementalTests.TRANSLATION,
+        )
+
+        # 改动区域能映射到文档块时，即使有翻译记忆也先做局部增量更新
+        self.assertIn("## 局部增量更新的要求", self.run_document(HunkIncrementalTests.DIFF, memory))
+        self.assertIn("## 分块翻译的要求", self.run_document(self.UNMAPPABLE_DIFF, memory))
+        self.assertIn("## 编辑列表增量更新的要求", self.run_document(self.UNMAPPABLE_DIFF, None))
+
+
+class ChangelogAppendTests(unittest.TestCase):
+    PREVIOUS_SOURCE = "# 更新日志\n\n说明。\n\n## 1.1.0\n- 修复问题。\n\n## 1.0.0\n- 首个版本。\n"
+    TRANSLATION = "# Changelog\n\nNotes.\n\n## 1.1.0\n- Fixed a bug.\n\n## 1.0.0\n-  First release.\n"
+
+    @staticmethod
+    def make_diff(previous, current):
+        return "".join(difflib.unified_diff(previous.splitlines(True), current.splitlines(True), "a", "b"))
+
+    def test_only_added_versions_are_translated_and_prepended(self):
+        source = self.PREVIOUS_SOURCE.replace("## 1.1.0\n", "## 1.2.0\n- 新增[功能](./a.md)。\n\n## 1.1.0\n")
+        create = AsyncMock(return_value=raw_completion("## 1.2.0\n- Added a [feature](⟦U1⟧)."))
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_document(
+                source,
+                "en",
+                existing_translation_content=self.TRANSLATION,
+                source_diff=self.make_diff(self.PREVIOUS_SOURCE, source),
+                append_only=True,
+            ))
+
+        user_prompt = create.await_args.kwargs["messages"][1]["content"]
+        self.assertNotIn("1.1.0", user_prompt)
+        self.assertEqual(
+            translated,
+            self.TRANSLATION.replace("## 1.1.0\n", "## 1.2.0\n- Added a [feature](./a.md).\n\n## 1.1.0\n"),
+        )
+
+    def test_edits_to_existing_versions_are_not_append_only(self):
+        source = self.PREVIOUS_SOURCE.replace(
+            "## 1.1.0\n- 修复问题。", "## 1.2.0\n- 新增功能。\n\n## 1.1.0\n- 修复了问题。"
+        )
+
+        self.assertIsNone(translate.find_added_version_sections(
+            source,
+            self.TRANSLATION,
+            self.make_diff(self.PREVIOUS_SOURCE, source),
+        ))
+
+
+class PatchOutputTests(unittest.TestCase):
+    def setUp(self):
+        self.patches = [patch.object(translate, "TRANSLATE_HUNK_INCREMENTAL", False)]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+
+    def translate(self, create):
+        with patch.object(translate.client.chat.completions.with_raw_response, "create", new=create):
+            return asyncio.run(translate.translate_document(
+                HunkIncrementalTests.SOURCE,
+                "en",
+                existing_translation_content=HunkIncrementalTests.TRANSLATION,
+                source_diff=HunkIncrementalTests.DIFF,
+            ))
+
+    def test_edit_list_is_applied_to_the_previous_translation(self):
+        create = AsyncMock(return_value=raw_completion(
+            '{"edits": [{"op": "replace", "id": "t3", "text": "Run the new command."}]}'
+        ))
+
+        translated = self.translate(create)
+
+        user_prompt = create.await_args.kwargs["messages"][1]["content"]
+        self.assertIn('"t3": "Run the command."', user_prompt)
+        self.assertEqual(
+            translated,
+            HunkIncrementalTests.TRANSLATION.replace("Run the command.", "Run the new command."),
+        )
+
+    def test_invalid_edit_list_falls_back_to_full_document_output(self):
+        updated = HunkIncrementalTests.TRANSLATION.replace("Run the command.", "Run the new command.")
+        create = AsyncMock(side_effect=[
+            raw_completion('{"edits": [{"op": "replace", "id": "t42", "text": "Run the new command."}]}'),
+            raw_completion(updated),
+        ])
+
+        with self.assertLogs(translate.logger, level="WARNING") as logs:
+            translated = self.translate(create)
+
+        self.assertEqual(create.await_count, 2)
+        self.assertIn("<previous_translation_markdown>", create.await_args.kwargs["messages"][1]["content"])
+        self.assertIn("编辑列表未通过校验", logs.output[0])
+        self.assertEqual(translated, updated.strip())
+
+
+class SegmentCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        translate.translation_cache.open_cache(
+            Path(self.temp_dir.name) / "segments.sqlite3",
+            max_bytes=1024 * 1024,
+        )
+
+    def tearDown(self):
+        translate.translation_cache.close_cache()
+        self.temp_dir.cleanup()
+
+    def test_unchanged_segment_is_served_from_cache(self):
+        response = raw_completion("# Guide")
+
+        with patch.object(
+            translate.client.chat.completions.with_raw_response,
+            "create",
+            new=AsyncMock(return_value=response),
+        ) as create:
+            first = asyncio.run(translate.translate_content("# 指南\n", "en"))
+            second = asyncio.run(translate.translate_content("# 指南  \r\n", "en"))
+
+        self.assertEqual(first, "# Guide")
+        self.assertEqual(second, "# Guide")
+        create.assert_called_once()
+        stats = translate.translation_cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_cache_key_tracks_language_model_and_prompt_version(self):
+        key = translate.get_segment_cache_key("# 指南\n", "en")
+
+        self.assertNotEqual(key, translate.get_segment_cache_key("# 指南\n", "ja"))
+        self.assertNotEqual(
+            key,
+            translate.get_segment_cache_key("# 指南\n", "en", is_fragment=True),
+        )
+        with patch.object(translate, "OPENAI_MODEL", "another-model"):
+            self.assertNotEqual(key, translate.get_segment_cache_key("# 指南\n", "en"))
+        with patch.object(translate, "SYSTEM_PROMPT", "changed prompt"):
+            self.assertNotEqual(key, translate.get_segment_cache_key("# 指南\n", "en"))
+
+
+class TranslationMemoryTests(unittest.TestCase):
+    def test_only_changed_blocks_are_sent_to_the_model(self):
+        memory = translate.markdown_blocks.build_translation_memory(
+            "# 指南\n\n旧段落\n\n- 列表\n",
+            "# Guide\n\nOld paragraph\n\n- List\n",
+        )
+
+        with patch.object(
+            translate,
+            "translate_segments",
+            return_value={"b1": "New paragraph"},
+        ) as translate_segments:
+            translated = asyncio.run(translate.translate_document(
+                "# 指南\n\n新段落\n\n- 列表\n",
+                "en",
+                translation_memory=memory,
+            ))
+
+        translate_segments.assert_called_once_with({"b1": "新段落"}, "en")
+        self.assertEqual(translated, "# Guide\n\nNew paragraph\n\n- List\n")
+
+    def test_low_memory_coverage_falls_back_to_full_translation(self):
+        memory = {"# 指南": "# Guide"}
+
+        with (
+            patch.object(translate, "translate_segments") as translate_segments,
+            patch.object(
+                translate,
+                "translate_content",
+                return_value="# Guide\n\nA long new paragraph",
+            ) as translate_content,
+        ):
+            asyncio.run(translate.translate_document(
+                "# 指南\n\n一段很长很长很长的新段落内容\n",
+                "en",
+                translation_memory=memory,
+            ))
+
+        translate_segments.assert_not_called()
+        translate_content.assert_called_once()
+
+    def test_segment_response_must_keep_block_ids(self):
+        response = raw_completion('```json\n{"b9": "Paragraph"}\n```')
+
+        with (
+            patch.object(
+                translate.client.chat.completions.with_raw_response,
+                "create",
+                new=AsyncMock(return_value=response),
+            ),
+            patch.object(translate, "MAX_RETRIES", 0),
+        ):
+            with self.assertRaisesRegex(ValueError, "块编号"):
+                asyncio.run(translate.translate_segments({"b1": "段落"}, "en"))
+
+
+class PromptPrefixCachingTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+
+    def test_requests_of_one_task_share_a_system_prefix_with_only_that_task_rules(self):
+        full_requests = [
+            translate.build_messages("en", translate.TASK_FULL, translate.get_translation_prompt("en", "# 指南\n")),
+            translate.build_messages(
+                "en",
+                translate.TASK_FULL,
+                translate.get_translation_prompt("en", "## 片段\n", is_fragment=True),
+            ),
+        ]
+        self.assertEqual(len({messages[0]["content"] for messages in full_requests}), 1)
+
+        system_prompts = {
+            task: translate.get_system_prompt("en", task)
+            for task in (
+                translate.TASK_FULL,
+                translate.TASK_INCREMENTAL,
+                translate.TASK_EDITS,
+                translate.TASK_HUNKS,
+                translate.TASK_SEGMENTS,
+            )
+        }
+        headings = {
+            translate.TASK_FULL: "## 整篇翻译的要求",
+            translate.TASK_INCREMENTAL: "## 增量更新的要求",
+            translate.TASK_EDITS: "## 编辑列表增量更新的要求",
+            translate.TASK_HUNKS: "## 局部增量更新的要求",
+            translate.TASK_SEGMENTS: "## 分块翻译的要求",
+        }
+        for task, system_prompt in system_prompts.items():
+            self.assertEqual(
+                [heading for heading in headings.values() if heading in system_prompt],
+                [headings[task]],
+            )
+            self.assertEqual("## 占位符" in system_prompt, task in translate.MASKED_TASKS)
+            self.assertNotIn("Self-hosted Site", system_prompt)
+        # Front matter 和分块请求不再为整篇翻译的长规则付费
+        self.assertLess(
+            translate.estimate_tokens(system_prompts[translate.TASK_SEGMENTS]),
+            translate.estimate_tokens(system_prompts[translate.TASK_FULL]),
+        )
+        self.assertNotEqual(system_prompts[translate.TASK_FULL], translate.get_system_prompt("ja", translate.TASK_FULL))
+
+    def test_user_message_carries_only_the_glossary_terms_in_the_content(self):
+        prompt = translate.get_translation_prompt("ja", "在自建站点中配置渠道。\n")
+
+        self.assertIn("| 自建站点 | セルフホスト型サイト |", prompt)
+        self.assertIn("| 渠道 | チャネル |", prompt)
+        self.assertNotIn("倍率", prompt)
+        self.assertNotIn("本次内容涉及的术语", translate.get_translation_prompt("ja", "普通段落。\n"))
+
+    def test_glossary_note_precedes_the_content_in_every_prompt(self):
+        source = "# 指南\n\n配置渠道和分组\n"
+        prompts = [
+            ("<source_markdown>", translate.get_translation_prompt("en", source)),
+            (
+                "<latest_source_markdown>",
+                translate.get_incremental_translation_prompt("en", source, "# Guide\n", "@@"),
+            ),
+            ("<latest_source_markdown>", translate.get_edit_list_prompt("en", source, {"t0": "# Guide"}, "@@")),
+            (
+                "<changed_regions>",
+                translate.get_hunks_translation_prompt(
+                    "en",
+                    {"r1": {"previous_source": "配置渠道", "previous_translation": "Configure channels", "source": source}},
+                ),
+            ),
+            ("<source_blocks>", translate.get_segments_translation_prompt("en", {"b1": "配置渠道和分组"})),
+        ]
+
+        for content_tag, prompt in prompts:
+            self.assertIn("| 渠道 | Channel |", prompt)
+            self.assertLess(prompt.index("| 分组 | Group |"), prompt.index(content_tag))
+
+    def test_cached_prompt_tokens_are_recorded_from_usage(self):
+        usage = SimpleNamespace(
+            prompt_tokens=2000,
+            completion_tokens=300,
+            total_tokens=2300,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=1536),
+        )
+        create = AsyncMock(return_value=raw_completion("# Guide", usage=usage))
+
+        translate.usage_ledger.open_ledger(None, run_id="test")
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            asyncio.run(translate.translate_content("# 指南\n", "en"))
+
+        summary = translate.usage_ledger.summarize()
+        self.assertEqual(
+            (summary["prompt_tokens"], summary["cached_tokens"], summary["completion_tokens"]),
+            (2000, 1536, 300),
+        )
+
+
+class UsageLedgerTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ledger_path = Path(self.temp_dir.name) / "ledger.jsonl"
+
+    def tearDown(self):
+        translate.usage_ledger.close_ledger()
+        self.temp_dir.cleanup()
+
+    def test_each_api_call_is_written_with_job_context_and_retry_count(self):
+        server_error = openai.InternalServerError(
+            "bad gateway",
+            response=SimpleNamespace(request=None, status_code=502, headers={}),
+            body=None,
+        )
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None)
+        create = AsyncMock(side_effect=[server_error, raw_completion("# Guide", usage=usage)])
+        translate.usage_ledger.open_ledger(self.ledger_path, run_id="run-1")
+
+        async def run_job():
+            translate.current_job_file.set("guide.md")
+            return await translate.translate_content("# 指南\n", "en")
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "RETRY_DELAY", 0),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            asyncio.run(run_job())
+        translate.usage_ledger.close_ledger()
+
+        records = [
+            json.loads(line)
+            for line in self.ledger_path.read_text(encoding="utf-8").splitlines()
+        ]
+        self.assertEqual([record["status"] for record in records], ["error", "ok"])
+        self.assertEqual([record["attempt"] for record in records], [0, 1])
+        self.assertEqual(records[1]["file"], "guide.md")
+        self.assertEqual(records[1]["language"], "en")
+        self.assertEqual(records[1]["mode"], "full")
+        self.assertEqual(records[1]["finish_reason"], "stop")
+        self.assertEqual((records[1]["prompt_tokens"], records[1]["completion_tokens"]), (100, 20))
+        self.assertEqual(records[1]["run_id"], "run-1")
+
+
+class PlaceholderMaskingTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+
+    def test_code_and_link_targets_never_reach_the_model(self):
+        source = (
+            "# 安装\n\n"
+            "运行 `npm install` 后打开[文档](./guide.md#安装)。\n\n"
+            "```bash\n# 中文注释\nnpm run build\n```\n"
+        )
+
+        async def create(**kwargs):
+            user_prompt = kwargs["messages"][-1]["content"]
+            self.assertNotIn("npm run build", user_prompt)
+            self.assertNotIn("./guide.md", user_prompt)
+            return raw_completion(
+                "# Install\n\nRun ⟦I1⟧ and then open the [docs](⟦U1⟧).\n\n⟦C1⟧"
+            )
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_content(source, "en"))
+
+        self.assertEqual(
+            translated,
+            "# Install\n\nRun `npm install` and then open the [docs](./guide.md#安装).\n\n"
+            "```bash\n# 中文注释\nnpm run build\n```",
+        )
+
+    def test_dropped_placeholder_is_retried(self):
+        create = AsyncMock(
+            side_effect=[
+                raw_completion("Run the command."),
+                raw_completion("Run ⟦I1⟧."),
+            ]
+        )
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "RETRY_DELAY", 0),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_content("运行 `make`。\n", "en"))
+
+        self.assertEqual(translated, "Run `make`.")
+        self.assertEqual(create.await_count, 2)
+
+
+class StructuralValidationTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+
+    def test_only_the_failing_section_is_retranslated(self):
+        source = "# 指南\n\n简介\n\n## 安装\n\n运行安装程序并按提示完成配置。\n"
+        user_prompts = []
+
+        async def create(**kwargs):
+            user_prompts.append(kwargs["messages"][-1]["content"])
+            if len(user_prompts) == 1:
+                return raw_completion("# Guide\n\nIntro\n\n## 安装\n\n运行安装程序并按提示完成配置。")
+            return raw_completion("## Install\n\nRun the installer and follow the prompts.")
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_content(source, "en"))
+
+        self.assertEqual(len(user_prompts), 2)
+        self.assertIn("## 安装", user_prompts[1])
+        self.assertNotIn("# 指南", user_prompts[1])
+        self.assertEqual(
+            translated,
+            "# Guide\n\nIntro\n\n## Install\n\nRun the installer and follow the prompts.",
+        )
+
+    def test_translation_that_still_fails_validation_is_not_cached(self):
+        source = "# 指南\n\n简介\n\n## 安装\n\n运行安装程序并按提示完成配置。\n"
+        create = AsyncMock(side_effect=lambda **kwargs: raw_completion(
+            "## 安装\n\n运行安装程序并按提示完成配置。"
+            if "连续片段" in kwargs["messages"][-1]["content"]
+            else "# Guide\n\nIntro\n\n## 安装\n\n运行安装程序并按提示完成配置。"
+        ))
+
+        with (
+            tempfile.TemporaryDirectory() as temp_dir,
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translate.translation_cache.open_cache(Path(temp_dir) / "segments.sqlite3", max_bytes=1024 * 1024)
+            try:
+                asyncio.run(translate.translate_content(source, "en"))
+                asyncio.run(translate.translate_content(source, "en"))
+            finally:
+                translate.translation_cache.close_cache()
+
+        # 两次运行都重新请求整篇与出错的章节，未通过校验的译文没有从缓存返回
+        self.assertEqual(create.await_count, 4)
+
+    def test_mismatched_section_counts_retranslate_the_whole_document_once(self):
+        source = "# 指南\n\n简介\n\n## 安装\n\n运行安装程序。\n\n## 配置\n\n填写地址。\n"
+        user_prompts = []
+
+        async def create(**kwargs):
+            user_prompts.append(kwargs["messages"][-1]["content"])
+            if len(user_prompts) == 1:
+                return raw_completion("# Guide\n\nIntro\n\n## Install\n\nRun the installer. Fill in the address.")
+            return raw_completion(
+                "# Guide\n\nIntro\n\n## Install\n\nRun the installer.\n\n## Configure\n\nFill in the address."
+            )
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(translate.translate_content(source, "en"))
+
+        self.assertEqual(len(user_prompts), 2)
+        self.assertNotIn("连续片段", user_prompts[1])
+        self.assertIn("## 配置", user_prompts[1])
+        self.assertTrue(translated.endswith("## Configure\n\nFill in the address."))
+
+
+class StreamingContinuationTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+
+    def test_truncated_output_continues_from_the_last_complete_block(self):
+        create = AsyncMock(
+            side_effect=[
+                raw_completion("# Guide\n\nFirst paragraph.\n\nSecond para", finish_reason="length"),
+                raw_completion("Second paragraph.\n"),
+            ]
+        )
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translated = asyncio.run(
+                translate.translate_content("# 指南\n\n第一段。\n\n第二段。\n", "en")
+            )
+
+        self.assertEqual(translated, "# Guide\n\nFirst paragraph.\n\nSecond paragraph.")
+        self.assertEqual(create.await_count, 2)
+        continuation_messages = create.await_args_list[1].kwargs["messages"]
+        self.assertEqual(
+            continuation_messages[-2],
+            {"role": "assistant", "content": "# Guide\n\nFirst paragraph.\n\n"},
+        )
+        self.assertTrue(create.await_args_list[0].kwargs["stream"])
+
+    def test_output_still_truncated_after_max_continuations_fails(self):
+        create = AsyncMock(
+            side_effect=lambda **kwargs: raw_completion("# Guide\n\nPart\n\nPa", finish_reason="length")
+        )
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "MAX_RETRIES", 0),
+            patch.object(translate, "TRANSLATE_MAX_CONTINUATIONS", 2),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            with self.assertRaisesRegex(ValueError, "仍被截断"):
+                asyncio.run(translate.translate_content("# 指南\n", "en"))
+
+        self.assertEqual(create.await_count, 3)
+
+    def test_stream_options_are_dropped_after_the_provider_rejects_them(self):
+        rejection = openai.BadRequestError(
+            "Unrecognized request argument supplied: stream_options",
+            response=SimpleNamespace(request=None, status_code=400, headers={}),
+            body=None,
+        )
+        create = AsyncMock(side_effect=[rejection, raw_completion("# Guide\n"), raw_completion("# Install\n")])
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "TRANSLATE_VALIDATE", False),
+            patch.dict(translate._state, {"stream_usage_rejected": False}),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            self.assertEqual(asyncio.run(translate.translate_content("# 指南\n", "en")), "# Guide")
+            self.assertEqual(asyncio.run(translate.translate_content("# 安装\n", "en")), "# Install")
+
+        self.assertEqual(
+            [call.kwargs.get("stream_options") for call in create.await_args_list],
+            [{"include_usage": True}, None, None],
+        )
+
+    def test_stream_is_closed_when_reading_fails_midway(self):
+        response = raw_completion("# Guide\n\nFirst paragraph.\n", error=openai.APITimeoutError(request=None))
+        create = AsyncMock(return_value=response)
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "MAX_RETRIES", 0),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            with self.assertRaises(openai.APITimeoutError):
+                asyncio.run(translate.translate_content("# 指南\n", "en"))
+
+        self.assertTrue(response.stream.closed)
+
+
+class BatchModeTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.batch_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        translate.batch_client.close()
+        self.temp_dir.cleanup()
+
+    def test_batch_results_go_through_the_normal_post_processing(self):
+        from tests.docs_assistant.test_batch_client import answer_local_batches
+
+        create = AsyncMock()
+
+        with (
+            patch.object(translate, "TRANSLATE_CACHE", False),
+            patch.object(translate, "TRANSLATE_MASK", False),
+            patch.object(translate, "TRANSLATE_BATCH_BACKEND", "local"),
+            patch.object(translate, "TRANSLATE_BATCH_DIR", self.batch_dir),
+            patch.object(translate, "TRANSLATE_BATCH_POLL_INTERVAL", 0.01),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translate.configure_batch_mode()
+            translate.batch_client._state["idle_seconds"] = 0.01
+
+            async def run():
+                dispatcher = asyncio.create_task(translate.batch_client.run_dispatcher())
+                provider = asyncio.create_task(
+                    answer_local_batches(
+                        self.batch_dir / "local",
+                        lambda body: "```markdown\n# Guide\n\n[Link](./guide.md)\n```",
+                    )
+                )
+                try:
+                    return await translate.translate_document("# 指南\n\n[链接](./guide.md)\n", "en")
+                finally:
+                    dispatcher.cancel()
+                    provider.cancel()
+
+            translated = asyncio.run(run())
+
+        self.assertEqual(translated, "# Guide\n\n[Link](./guide.md)")
+        create.assert_not_awaited()
+        self.assertEqual(len(list(self.batch_dir.glob("batch-*.jsonl"))), 1)
+
+
+@contextlib.contextmanager
+def mock_server_client(config):
+    """Point the module-level client at a local mock server with the given fault config."""
+    mock_openai_server.configure(config)
+    server = mock_openai_server.start_server()
+    host, port = server.server_address[:2]
+    # base_url 是属性，patch.object 无法还原，这里手动保存并恢复
+    base_url = translate.client.base_url
+    translate.client.base_url = f"http://{host}:{port}/v1"
+    try:
+        yield
+    finally:
+        translate.client.base_url = base_url
+        server.shutdown()
+        server.server_close()
+
+
+class SharedRateLimitTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+
+    def test_rate_limited_request_waits_on_the_shared_limiter(self):
+        rate_limit_error = openai.RateLimitError(
+            "rate limited",
+            response=SimpleNamespace(
+                request=None,
+                status_code=429,
+                headers={"retry-after-ms": "20"},
+            ),
+            body=None,
+        )
+        create = AsyncMock(side_effect=[rate_limit_error, raw_completion("# Guide")])
+
+        with (
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+            patch.object(translate, "RETRY_DELAY", 60),
+            patch.object(translate.asyncio, "sleep", wraps=asyncio.sleep) as sleep,
+        ):
+            translated = asyncio.run(translate.translate_content("# 指南\n", "en"))
+
+        self.assertEqual(translated, "# Guide")
+        self.assertEqual(create.await_count, 2)
+        # 等待时长来自 retry-after 头，而不是本地的指数退避
+        self.assertLess(max(call.args[0] for call in sleep.call_args_list), 1)
+        self.assertEqual(translate.rate_limiter.get_stats()["rate_limited"], 1)
+
+    def test_module_client_leaves_every_retry_to_the_shared_limiter(self):
+        config = mock_openai_server.MockConfig(
+            latency_median=0.0,
+            tokens_per_second=0.0,
+            rate_limit_ratio=1.0,
+            retry_after=0.0,
+        )
+        messages = translate.build_messages(
+            "en", translate.TASK_FULL, translate.get_translation_prompt("en", "# 指南\n")
+        )
+        translate.usage_ledger.open_ledger(None, run_id="test")
+
+        with (
+            mock_server_client(config),
+            patch.object(translate, "MAX_RETRIES", 2),
+            patch.object(translate, "RETRY_DELAY", 0),
+        ):
+            with self.assertRaises(openai.RateLimitError):
+                asyncio.run(translate.request_translation(messages, "en", lambda content: content))
+
+        # SDK 不再自行重发：服务端收到的每个请求都经过共享限流器，并记入请求账本
+        self.assertEqual(mock_openai_server.get_stats()["requests"], 3)
+        self.assertEqual(translate.usage_ledger.summarize()["requests"], 3)
+        self.assertEqual(translate.rate_limiter.get_stats()["rate_limited"], 3)
+
+
+class AdaptiveConcurrencyTests(unittest.TestCase):
+    def setUp(self):
+        translate.rate_limiter.configure()
+
+    def tearDown(self):
+        translate.concurrency_controller.configure(1)
+
+    def test_server_errors_halve_the_in_flight_limit(self):
+        server_error = openai.InternalServerError(
+            "bad gateway",
+            response=SimpleNamespace(request=None, status_code=502, headers={}),
+            body=None,
+        )
+        create = AsyncMock(side_effect=[server_error, raw_completion("# Guide")])
+
+        with (
+            patch.object(translate, "MAX_WORKERS", 8),
+            patch.object(translate, "TRANSLATE_ADAPTIVE_CONCURRENCY", True),
+            patch.object(translate, "RETRY_DELAY", 0),
+            patch.object(translate.client.chat.completions.with_raw_response, "create", new=create),
+        ):
+            translate.configure_concurrency()
+            translated = asyncio.run(translate.translate_content("# 指南\n", "en"))
+
+        self.assertEqual(translated, "# Guide")
+        self.assertEqual(translate.concurrency_controller.get_limit(), 4)
+        self.assertEqual(translate.concurrency_controller.get_stats()["decreases"], 1)
+
+    def test_each_rate_limited_attempt_from_the_real_client_shrinks_the_limit(self):
+        config = mock_openai_server.MockConfig(
+            latency_median=0.0,
+            tokens_per_second=0.0,
+            rate_limit_ratio=1.0,
+            retry_after=0.0,
+        )
+        messages = translate.build_messages(
+            "en", translate.TASK_FULL, translate.get_translation_prompt("en", "# 指南\n")
+        )
+
+        with (
+            mock_server_client(config),
+            patch.object(translate, "MAX_WORKERS", 16),
+            patch.object(translate, "TRANSLATE_MIN_WORKERS", 1),
+            patch.object(translate, "TRANSLATE_ADAPTIVE_CONCURRENCY", True),
+            patch.object(translate, "MAX_RETRIES", 2),
+            patch.object(translate, "RETRY_DELAY", 0),
+        ):
+            translate.configure_concurrency()
+            with self.assertRaises(openai.RateLimitError):
+                asyncio.run(translate.request_translation(messages, "en", lambda content: content))
+
+        # 每次 429 都立即报告给并发控制器，三次尝试各减半一次
+        self.assertEqual(mock_openai_server.get_stats()["rate_limited"], 3)
+        self.assertEqual(translate.concurrency_controller.get_stats()["decreases"], 3)
+        self.assertEqual(translate.concurrency_controller.get_limit(), 2)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs_assistant import translation_cache
+
+
+class TranslationCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = Path(self.temp_dir.name) / "cache" / "segments.sqlite3"
+
+    def tearDown(self):
+        translation_cache.close_cache()
+        self.temp_dir.cleanup()
+
+    def test_entries_persist_across_runs(self):
+        key = translation_cache.make_cache_key("# 指南", "en", "model", "v1")
+
+        translation_cache.open_cache(self.cache_path, max_bytes=1024)
+        self.assertIsNone(translation_cache.lookup(key))
+        translation_cache.store(key, "# Guide")
+        translation_cache.close_cache()
+
+        translation_cache.open_cache(self.cache_path, max_bytes=1024)
+        self.assertEqual(translation_cache.lookup(key), "# Guide")
+        self.assertEqual(translation_cache.get_stats()["hits"], 1)
+
+    def test_least_recently_used_entries_are_evicted_over_the_size_limit(self):
+        translation_cache.open_cache(self.cache_path, max_bytes=20)
+
+        translation_cache.store("old", "x" * 8)
+        translation_cache.store("recent", "y" * 8)
+        translation_cache.lookup("old")
+        translation_cache.store("new", "z" * 8)
+
+        self.assertIsNone(translation_cache.lookup("recent"))
+        self.assertEqual(translation_cache.lookup("old"), "x" * 8)
+        self.assertEqual(translation_cache.lookup("new"), "z" * 8)
+        self.assertEqual(translation_cache.get_stats()["evictions"], 1)
+
+    def test_whitespace_only_differences_share_a_key(self):
+        self.assertEqual(
+            translation_cache.make_cache_key("# 指南  \r\n\r\n正文\n", "en"),
+            translation_cache.make_cache_key("# 指南\n\n正文", "en"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from docs_assistant import translation_validator
+
+
+class TranslationValidatorTests(unittest.TestCase):
+    def test_structure_differences_are_reported_per_section(self):
+        source_sections = [
+            "---\ntitle: 指南\n---\n# 指南\n\n见[文档](./a.md)。\n\n",
+            "## 配置\n\n| 名称 | 说明 |\n| --- | --- |\n| a | b |\n\n```bash\nnpm i\n```\n",
+        ]
+        translated_sections = [
+            "---\ntitle: [Guide\n---\n# Guide\n\nSee the docs.\n\n",
+            "## Config\n\n| Name | Description |\n| --- | --- |\n| a |\n\n```bash\nnpm i\n",
+        ]
+
+        problems = translation_validator.validate_sections(source_sections, translated_sections, "en", 0.1)
+
+        self.assertEqual(sorted(problems), [0, 1])
+        self.assertIn("Front matter 无法解析", problems[0])
+        self.assertTrue(any(problem.startswith("链接与锚点数量不一致") for problem in problems[0]))
+        self.assertEqual(problems[1], ["代码围栏未闭合", "表格行数或列数不一致"])
+
+    def test_residual_chinese_ignores_code_links_and_japanese_kanji(self):
+        source = "## 设置\n\n打开[设置页面](./设置.md)，运行 `显示配置` 命令。\n"
+
+        self.assertEqual(
+            translation_validator.find_section_problems(
+                source, "## Settings\n\nOpen the [settings page](./设置.md) and run `显示配置`.\n", "en", 0.1
+            ),
+            [],
+        )
+        self.assertEqual(
+            translation_validator.find_section_problems(
+                source, "## 設定\n\n[設定画面](./设置.md)を開き、`显示配置` コマンドを実行します。\n", "ja", 0.1
+            ),
+            [],
+        )
+        self.assertTrue(
+            translation_validator.find_section_problems(
+                source, "## 设置\n\n打开[设置页面](./设置.md)，运行 `显示配置` 命令。\n", "ja", 0.1
+            )[-1].startswith("残留中文")
+        )
+
+    def test_section_count_mismatch_fails_every_section(self):
+        problems = translation_validator.validate_sections(["# 一\n", "# 二\n"], ["# One\n"], "en", 0.1)
+
+        self.assertEqual(sorted(problems), [0, 1])
+        self.assertTrue(problems[1][0].startswith("章节数量不一致"))
+
+
+if __name__ == "__main__":
+    unittest.main()
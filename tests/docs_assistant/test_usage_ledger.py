@@ -0,0 +1,65 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from docs_assistant import usage_ledger
+
+
+def ledger_record(file, latency, completion_tokens=0, timestamp=100.0, status="ok", attempt=0):
+    return {
+        "file": file,
+        "latency_seconds": latency,
+        "completion_tokens": completion_tokens,
+        "timestamp": timestamp,
+        "status": status,
+        "attempt": attempt,
+    }
+
+
+class UsageLedgerSummaryTests(unittest.TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        values = [float(value) for value in range(1, 21)]
+
+        self.assertEqual(usage_ledger.percentile(values, 0.5), 10)
+        self.assertEqual(usage_ledger.percentile(values, 0.95), 19)
+        self.assertEqual(usage_ledger.percentile([], 0.5), 0)
+
+    def test_summary_reports_throughput_errors_and_slowest_files(self):
+        records = [
+            ledger_record("a.md", 4.0, completion_tokens=200, timestamp=104.0),
+            ledger_record("b.md", 1.0, status="error", timestamp=101.0),
+            ledger_record("b.md", 2.0, completion_tokens=100, timestamp=110.0, attempt=1),
+            ledger_record("c.md", 1.0, completion_tokens=0, timestamp=105.0),
+        ]
+
+        summary = usage_ledger.summarize(records)
+
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["retries"], 1)
+        # 墙钟时间从 100s 到 110s
+        self.assertEqual(summary["tokens_per_second"], 30)
+        self.assertEqual(summary["slowest_files"][0], ("a.md", 4.0))
+        self.assertEqual(summary["slowest_files"][1], ("b.md", 3.0))
+
+
+class UsageLedgerFileTests(unittest.TestCase):
+    def tearDown(self):
+        usage_ledger.close_ledger()
+
+    def test_each_run_rewrites_the_ledger_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ledger_path = Path(temp_dir) / "ledger.jsonl"
+            for run_id in ("run-1", "run-2"):
+                usage_ledger.open_ledger(ledger_path, run_id=run_id)
+                usage_ledger.record(file="a.md", status="ok", latency_seconds=1.0)
+                usage_ledger.close_ledger()
+
+            lines = ledger_path.read_text(encoding="utf-8").splitlines()
+
+        self.assertEqual([json.loads(line)["run_id"] for line in lines], ["run-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from docs_assistant import utils
+
+
+class WriteIfChangedTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.temp_dir.name) / "wiki" / "changelog.md"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_timestamp_only_change_is_not_written(self):
+        first = "# 更新日志\n\n!!! warning \"版本日志信息 · 数据更新于 2026-01-01 00:00:00 (中国时间)\"\n\n## v1\n"
+        second = first.replace("2026-01-01 00:00:00", "2026-01-01 00:30:00")
+
+        self.assertTrue(utils.write_if_changed(self.file_path, first, utils.VOLATILE_LINE_PATTERNS))
+        self.assertFalse(utils.write_if_changed(self.file_path, second, utils.VOLATILE_LINE_PATTERNS))
+        self.assertEqual(self.file_path.read_text(encoding="utf-8"), first)
+
+        self.assertTrue(
+            utils.write_if_changed(self.file_path, second + "\n## v2\n", utils.VOLATILE_LINE_PATTERNS)
+        )
+        self.assertIn("00:30:00", self.file_path.read_text(encoding="utf-8"))
+
+    def test_update_markdown_file_reports_whether_the_page_changed(self):
+        content = "# 特别鸣谢\n\n数据更新于 2026-01-01 00:00:00\n\n- 贡献者\n"
+
+        self.assertEqual(utils.update_markdown_file(self.file_path, content), (True, True))
+        self.assertEqual(utils.update_markdown_file(self.file_path, content), (True, False))
+        self.assertEqual(
+            utils.update_markdown_file(self.file_path, content.replace("00:00:00", "01:00:00")),
+            (True, False),
+        )
+
+        with patch.object(utils, "write_if_changed", side_effect=OSError("disk full")):
+            self.assertEqual(utils.update_markdown_file(self.file_path, content), (False, False))
+
+    def test_failed_replace_keeps_original_file_and_removes_temp_file(self):
+        utils.write_if_changed(self.file_path, "旧内容\n")
+
+        with patch.object(utils.os, "replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                utils.write_if_changed(self.file_path, "新内容\n")
+
+        self.assertEqual(self.file_path.read_text(encoding="utf-8"), "旧内容\n")
+        self.assertEqual(os.listdir(self.file_path.parent), ["changelog.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()